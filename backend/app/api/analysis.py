@@ -1,13 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
-import os
-import time
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
+import json
 from pathlib import Path
 
-from app.models.schemas import AnalysisResult, AnalysisRequest, ImageStats
-from app.services.image_analyzer import ImageAnalyzer
+from app.models.schemas import MAX_HASH_DISTANCE, AnalysisResult, AnalysisRequest, BatchAnalysisRequest
+from app.services.image_analyzer import ImageAnalyzer, near_duplicate_distance
+from app.services.image_catalog import image_catalog
+from app.services.perceptual_hash import near_duplicate_index
 from app.core.config import settings
+from app.core.executor import ExecutorError
 
 router = APIRouter()
 
@@ -19,47 +21,25 @@ async def analyze_image(request: AnalysisRequest):
     """Perform comprehensive analysis on an uploaded image"""
     
     # Find the uploaded file
-    upload_dir = Path(settings.UPLOAD_DIR)
-    matching_files = list(upload_dir.glob(f"{request.image_id}.*"))
+    image_path = image_catalog.find_path(request.image_id)
     
-    if not matching_files:
+    if image_path is None:
         raise HTTPException(
             status_code=404,
             detail="Image not found"
         )
     
-    image_path = str(matching_files[0])
-    
     try:
-        start_time = time.time()
-        
-        # Get image stats
-        image_stats = image_analyzer.get_image_stats(image_path)
-        
-        # Initialize result
-        result = AnalysisResult(
-            id=request.image_id,
-            filename=matching_files[0].name,
+        return await image_analyzer.analyze_image(
+            request.image_id,
+            image_path,
             business_type=request.business_type,
-            upload_time=datetime.fromtimestamp(matching_files[0].stat().st_ctime),
-            image_stats=image_stats,
-            processing_time=0.0
+            analysis_types=request.analysis_types,
+            near_duplicate_distance=near_duplicate_distance(request)
         )
-        
-        # Perform requested analyses
-        if "color" in request.analysis_types:
-            result.color_analysis = await image_analyzer.analyze_colors(image_path)
-        
-        if "text" in request.analysis_types:
-            result.text_detection = await image_analyzer.detect_text(
-                image_path, 
-                request.business_type or "General"
-            )
-        
-        # Calculate processing time
-        result.processing_time = time.time() - start_time
-        
-        return result
+    
+    except ExecutorError:
+        raise
     
     except Exception as e:
         raise HTTPException(
@@ -67,12 +47,102 @@ async def analyze_image(request: AnalysisRequest):
             detail=f"Analysis failed: {str(e)}"
         )
 
+def _confined_path(path: str) -> Optional[Path]:
+    """path resolved (symlinks included) under UPLOAD_DIR, or None if it points outside it"""
+    root = Path(settings.UPLOAD_DIR).resolve()
+    resolved = (root / path).resolve()
+    if resolved != root and root not in resolved.parents:
+        return None
+    return resolved
+
+def _resolve_batch_images(request: BatchAnalysisRequest) -> List[Tuple[str, Optional[str]]]:
+    """Expand a batch request into (image_id, image_path) pairs; unknown ids get no path
+
+    Directories, manifests and manifest paths are relative to UPLOAD_DIR and
+    may not point outside it.
+    """
+    images = [(image_id, image_catalog.find_path(image_id)) for image_id in request.image_ids]
+    
+    if request.directory:
+        directory = _confined_path(request.directory)
+        if directory is None:
+            raise HTTPException(status_code=403, detail=f"Directory is outside the upload directory: {request.directory}")
+        if not directory.is_dir():
+            raise HTTPException(status_code=404, detail=f"Directory not found: {request.directory}")
+        for file_path in sorted(directory.iterdir()):
+            if file_path.is_file() and file_path.suffix.lower() in settings.ALLOWED_IMAGE_EXTENSIONS:
+                images.append((file_path.stem, str(file_path)))
+    
+    if request.manifest:
+        manifest = _confined_path(request.manifest)
+        if manifest is None:
+            raise HTTPException(status_code=403, detail=f"Manifest is outside the upload directory: {request.manifest}")
+        try:
+            with open(manifest) as f:
+                content = f.read()
+        except OSError as e:
+            raise HTTPException(status_code=404, detail=f"Manifest not readable: {e}")
+        try:
+            entries = json.loads(content)
+        except ValueError:
+            entries = content.splitlines()
+        for entry in entries:
+            entry = str(entry).strip()
+            if not entry:
+                continue
+            # Entries are either paths to image files or upload ids
+            path = _confined_path(entry)
+            if path is not None and path.is_file():
+                images.append((path.stem, str(path)))
+            else:
+                images.append((entry, image_catalog.find_path(entry)))
+    
+    return images
+
+@router.post("/analysis/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """Analyze many images, streaming one NDJSON line per image as it finishes"""
+    
+    images = _resolve_batch_images(request)
+    if not images:
+        raise HTTPException(
+            status_code=400,
+            detail="No images to analyze: provide image_ids, directory or manifest"
+        )
+    
+    async def stream_results():
+        async for item in image_analyzer.analyze_batch(
+            images,
+            business_type=request.business_type,
+            analysis_types=request.analysis_types
+        ):
+            yield item.model_dump_json() + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@router.get("/analysis/near-duplicates/{image_id}")
+async def get_near_duplicates(image_id: str, max_distance: Optional[int] = Query(None, ge=0, le=MAX_HASH_DISTANCE)):
+    """Uploads that look like this one, by perceptual hash distance (closest first)"""
+    
+    hashes = near_duplicate_index.get(image_id)
+    if hashes is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Image not found or not hashed yet"
+        )
+    
+    max_distance = settings.NEAR_DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+    matches = near_duplicate_index.find(hashes, max_distance, exclude={image_id})
+    return {
+        "hashes": hashes.hex(),
+        "near_duplicates": [{"image_id": other_id, "distance": distance} for distance, other_id in matches]
+    }
+
 @router.get("/analysis/{image_id}", response_model=AnalysisResult)
 async def get_analysis_result(image_id: str):
     """Retrieve analysis result for a specific image"""
     
-    # For now, we'll re-run the analysis since we're not storing results
-    # In a production app, you'd store these in a database
+    # Served from the result cache when this image was analyzed before
     request = AnalysisRequest(
         image_id=image_id,
         analysis_types=["color", "text"]
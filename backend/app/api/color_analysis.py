@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 import os
 
-from app.models.schemas import ColorAnalysisResult, ColorAnalysisRequest
+from app.models.schemas import ColorAnalysisResult, ColorAnalysisRequest, ColorQuality, DominantColorStrategy
 from app.services.color_analyzer import ColorAnalyzer
+from app.services.image_catalog import image_catalog
+from app.core.executor import ExecutorError
 
 router = APIRouter()
 
@@ -23,10 +25,16 @@ async def analyze_colors(request: ColorAnalysisRequest):
     try:
         result = await color_analyzer.analyze_comprehensive(
             request.image_path,
-            n_colors=request.n_colors
+            n_colors=request.n_colors,
+            strategy=request.strategy,
+            quality=request.quality,
+            max_side=request.max_side
         )
         return result
     
+    except ExecutorError:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -34,27 +42,33 @@ async def analyze_colors(request: ColorAnalysisRequest):
         )
 
 @router.get("/color-analysis/dominant-colors/{image_id}")
-async def get_dominant_colors(image_id: str, n_colors: int = 5):
+async def get_dominant_colors(
+    image_id: str,
+    n_colors: int = 5,
+    quality: Optional[ColorQuality] = None,
+    strategy: Optional[DominantColorStrategy] = None,
+    max_side: Optional[int] = Query(None, ge=0)
+):
     """Get dominant colors for a specific image"""
     
     # Find the uploaded file
-    from pathlib import Path
-    from app.core.config import settings
-    
-    upload_dir = Path(settings.UPLOAD_DIR)
-    matching_files = list(upload_dir.glob(f"{image_id}.*"))
+    image_path = image_catalog.find_path(image_id)
     
-    if not matching_files:
+    if image_path is None:
         raise HTTPException(
             status_code=404,
             detail="Image not found"
         )
     
     try:
-        image_path = str(matching_files[0])
-        dominant_colors = await color_analyzer.extract_dominant_colors_async(image_path, n_colors)
+        dominant_colors = await color_analyzer.extract_dominant_colors_async(
+            image_path, n_colors, strategy=strategy, quality=quality, max_side=max_side
+        )
         return {"dominant_colors": dominant_colors}
     
+    except ExecutorError:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -62,30 +76,28 @@ async def get_dominant_colors(image_id: str, n_colors: int = 5):
         )
 
 @router.get("/color-analysis/temperature/{image_id}")
-async def get_color_temperature(image_id: str):
+async def get_color_temperature(image_id: str, max_side: Optional[int] = Query(None, ge=0)):
     """Get color temperature for a specific image"""
     
     # Find the uploaded file
-    from pathlib import Path
-    from app.core.config import settings
-    
-    upload_dir = Path(settings.UPLOAD_DIR)
-    matching_files = list(upload_dir.glob(f"{image_id}.*"))
+    image_path = image_catalog.find_path(image_id)
     
-    if not matching_files:
+    if image_path is None:
         raise HTTPException(
             status_code=404,
             detail="Image not found"
         )
     
     try:
-        image_path = str(matching_files[0])
-        temperature = await color_analyzer.calculate_color_temperature_async(image_path)
+        temperature = await color_analyzer.calculate_color_temperature_async(image_path, max_side=max_side)
         return {
             "color_temperature": temperature,
             "interpretation": "warm" if temperature > 5500 else "cool"
         }
     
+    except ExecutorError:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=500,
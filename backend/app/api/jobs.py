@@ -0,0 +1,78 @@
+from fastapi import APIRouter, HTTPException
+
+from app.core.config import settings
+from app.models.schemas import AnalysisRequest, AnalysisResult, JobStatus
+from app.services.image_analyzer import ImageAnalyzer, near_duplicate_distance
+from app.services.image_catalog import image_catalog
+from app.services.job_queue import JobQueue, JobQueueFullError, ProgressCallback, create_broker
+
+router = APIRouter()
+
+# Initialize the image analyzer
+image_analyzer = ImageAnalyzer()
+
+async def run_analysis_job(request: AnalysisRequest, progress: ProgressCallback) -> AnalysisResult:
+    """Job handler: full analysis of one uploaded image"""
+    image_path = image_catalog.find_path(request.image_id)
+    if image_path is None:
+        raise FileNotFoundError(f"Image {request.image_id} not found")
+    
+    return await image_analyzer.analyze_image(
+        request.image_id,
+        image_path,
+        business_type=request.business_type,
+        analysis_types=request.analysis_types,
+        progress=progress,
+        near_duplicate_distance=near_duplicate_distance(request)
+    )
+
+job_queue = JobQueue(
+    create_broker(),
+    handler=run_analysis_job,
+    concurrency=settings.JOB_WORKERS,
+    max_retries=settings.JOB_MAX_RETRIES,
+    retry_delay=settings.JOB_RETRY_DELAY,
+    result_ttl=settings.JOB_RESULT_TTL,
+    max_queued=settings.JOB_MAX_QUEUED,
+    stale_after=settings.JOB_STALE_AFTER
+)
+
+@router.on_event("startup")
+async def start_job_workers():
+    await job_queue.start()
+
+@router.on_event("shutdown")
+async def stop_job_workers():
+    await job_queue.stop()
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(request: AnalysisRequest):
+    """Queue an analysis and return its job id immediately"""
+    
+    if image_catalog.find_path(request.image_id) is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Image not found"
+        )
+    
+    try:
+        return await job_queue.submit(request)
+    
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Get status, per-stage progress and (when finished) the result of a job"""
+    
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found or expired"
+        )
+    return job
@@ -0,0 +1,52 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.api.jobs import job_queue
+from app.core.executor import analysis_executor
+from app.core.metrics import metrics, render_counter, render_gauge
+from app.services.model_registry import model_registry
+from app.services.result_cache import result_cache
+
+router = APIRouter()
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request, stage and analysis latency histograms plus queue, cache and model gauges and counters"""
+    executor = analysis_executor.stats()
+    jobs = await job_queue.stats()
+    models = model_registry.stats()
+
+    gauges = []
+    gauges += render_gauge("analysis_executor_queue_depth", "Jobs queued or running on the analysis worker pools", [
+        ({}, executor["queue_depth"]),
+    ])
+    gauges += render_counter("analysis_executor_jobs_total", "Analysis worker pool jobs since startup by outcome", [
+        ({"outcome": outcome}, executor[outcome]) for outcome in ("completed", "rejected", "timed_out")
+    ])
+    gauges += render_gauge("job_queue_depth", "Background analysis jobs waiting for a worker", [
+        ({}, jobs["queued"]),
+    ])
+    gauges += render_gauge("ocr_model_load_seconds", "Time taken to load each OCR model", [
+        ({"engine": model["engine"]}, model["load_time"]) for model in models["models"]
+    ])
+    gauges += render_gauge("ocr_model_memory_bytes", "Resident memory added by loading each OCR model", [
+        ({"engine": model["engine"]}, model["memory_bytes"]) for model in models["models"]
+    ])
+    gauges += render_counter("ocr_model_uses_total", "Calls served by each loaded OCR model", [
+        ({"engine": model["engine"]}, model["use_count"]) for model in models["models"]
+    ])
+    gauges += render_gauge("process_resident_memory_bytes", "Resident set size of the API process", [
+        ({}, models["process_rss_bytes"]),
+    ])
+    tiers = result_cache.stats()["tiers"]
+    gauges += render_counter("result_cache_requests_total", "Result cache lookups by tier and outcome", [
+        ({"tier": tier["backend"], "outcome": outcome}, tier[outcome]) for tier in tiers for outcome in ("hits", "misses")
+    ])
+    gauges += render_counter("result_cache_evictions_total", "Result cache evictions by tier", [
+        ({"tier": tier["backend"]}, tier.get("evictions", 0)) for tier in tiers
+    ])
+
+    return PlainTextResponse(metrics.render(gauges), media_type=CONTENT_TYPE)
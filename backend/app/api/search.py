@@ -0,0 +1,94 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional, Tuple
+import time
+
+from app.core.executor import analysis_executor
+from app.models.schemas import ColorSearchMode, TextSearchSort
+from app.services.color_index import palette_index, palette_vector
+from app.services.text_index import text_index
+
+router = APIRouter()
+
+def _parse_palette(colors: str, weights: Optional[str]) -> Tuple[List[List[int]], List[float]]:
+    """'#1f6feb,ffffff' and optional '70,30' -> RGB colors and their weights"""
+    rgb = []
+    for value in colors.split(","):
+        value = value.strip().lstrip("#")
+        if len(value) != 6:
+            raise ValueError(f"{value!r} is not a #rrggbb color")
+        rgb.append([int(value[i:i + 2], 16) for i in (0, 2, 4)])
+
+    if weights is None:
+        return rgb, [1.0] * len(rgb)
+    percentages = [float(value) for value in weights.split(",")]
+    if len(percentages) != len(rgb) or any(value < 0 for value in percentages) or not sum(percentages) > 0:
+        raise ValueError("weights must be one non-negative number per color, not all zero")
+    return rgb, percentages
+
+@router.get("/search/color")
+async def search_by_color(
+    image_id: Optional[str] = None,
+    colors: Optional[str] = Query(None, description="Comma-separated hex colors, e.g. #1f6feb,ffffff"),
+    weights: Optional[str] = Query(None, description="Comma-separated weights of the colors (equal if omitted)"),
+    k: int = Query(10, ge=1, le=100),
+    mode: ColorSearchMode = "auto",
+    nprobe: Optional[int] = Query(None, ge=1)
+):
+    """Analyzed uploads whose dominant-color palette is closest to an upload's or to given colors
+
+    similarity is 1 for the same palette and 0 for palettes sharing no colors.
+    """
+
+    exclude = None
+    if image_id is not None:
+        query = palette_index.get(image_id)
+        if query is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Image not found or its colors not analyzed yet"
+            )
+        exclude = {image_id}
+    elif colors:
+        try:
+            query = palette_vector(*_parse_palette(colors, weights))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid colors: {e}")
+    else:
+        raise HTTPException(status_code=400, detail="Either image_id or colors is required")
+
+    start_time = time.perf_counter()
+    mode_used, matches = await analysis_executor.run_in_thread(
+        palette_index.search, query, k, mode, nprobe, exclude
+    )
+    return {
+        "mode": mode_used,
+        "search_time": time.perf_counter() - start_time,
+        "matches": [{"image_id": match_id, "similarity": similarity} for match_id, similarity in matches]
+    }
+
+@router.get("/search/text")
+async def search_by_text(
+    q: str = Query(..., min_length=1, description="Words that must all occur in one detected text; word* matches a prefix"),
+    business_type: Optional[str] = None,
+    min_confidence: float = Query(0.0, ge=0.0, le=1.0),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    sort: TextSearchSort = "recent"
+):
+    """Analyzed uploads whose OCR text matches a query, with the matching detections
+
+    Served from the text index alone: no image is opened and no OCR runs.
+    """
+
+    start_time = time.perf_counter()
+    try:
+        results = await analysis_executor.run_in_thread(
+            text_index.search, q, business_type, min_confidence, limit, offset, sort
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {e}")
+    return {
+        "sort": sort,
+        "search_time": time.perf_counter() - start_time,
+        "results": results
+    }
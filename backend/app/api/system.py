@@ -0,0 +1,75 @@
+from fastapi import APIRouter
+
+from app.api.jobs import job_queue
+from app.core.executor import analysis_executor
+from app.services.blob_store import blob_store
+from app.services.color_index import palette_index
+from app.services.model_registry import model_registry
+from app.services.perceptual_hash import near_duplicate_index
+from app.services.result_cache import result_cache
+from app.services.text_index import text_index
+from app.services.text_rules import text_rules
+from app.services.text_scoring import text_scorer
+
+router = APIRouter()
+
+@router.get("/system/models")
+async def get_model_stats():
+    """Get load time, memory and use counts of the shared OCR models"""
+    return model_registry.stats()
+
+@router.get("/system/executor")
+async def get_executor_stats():
+    """Get queue depth and job counters of the analysis worker pools"""
+    return analysis_executor.stats()
+
+@router.get("/system/cache")
+async def get_cache_stats():
+    """Get hit/miss/eviction counters of the analysis result cache"""
+    return result_cache.stats()
+
+@router.get("/system/jobs")
+async def get_job_stats():
+    """Get queue depth and worker count of the background job queue"""
+    return await job_queue.stats()
+
+@router.get("/system/storage")
+async def get_storage_stats():
+    """Get blob count, stored bytes and bytes saved by upload deduplication"""
+    return blob_store.stats()
+
+@router.get("/system/near-duplicates")
+async def get_near_duplicate_stats():
+    """Get the number of uploads in the perceptual hash index"""
+    return near_duplicate_index.stats()
+
+@router.get("/system/color-index")
+async def get_color_index_stats():
+    """Get the size of the palette vector store and the state of its IVF index"""
+    return palette_index.stats()
+
+@router.post("/system/color-index/rebuild")
+async def rebuild_color_index():
+    """Compact the palette vectors and rebuild the IVF index now"""
+    await analysis_executor.run_in_thread(palette_index.rebuild)
+    return palette_index.stats()
+
+@router.get("/system/text-index")
+async def get_text_index_stats():
+    """Get the number of images and OCR detections in the text search index"""
+    return text_index.stats()
+
+@router.get("/system/text-scoring")
+async def get_text_scoring_stats():
+    """Get the source and size of the text quality keyword vocabularies"""
+    return text_scorer.stats()
+
+@router.post("/system/text-scoring/reload")
+async def reload_text_scoring():
+    """Recompile the text quality keywords from TEXT_KEYWORDS_PATH now"""
+    return text_scorer.reload().stats()
+
+@router.get("/system/text-rules")
+async def get_text_rule_stats():
+    """Get OCR cleanup/filter rules, correction dictionary sizes and per-rule hit counts"""
+    return text_rules.stats()
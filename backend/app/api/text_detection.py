@@ -1,15 +1,29 @@
 from fastapi import APIRouter, HTTPException
-from typing import List
+from typing import List, Optional
+import logging
 import os
+import sqlite3
 
-from app.models.schemas import TextDetectionResult, TextDetectionRequest
+from app.models.schemas import OcrEngineStrategy, TextDetectionResult, TextDetectionRequest
 from app.services.text_detector import TextDetector
+from app.services.text_index import text_index
+from app.services.image_catalog import image_catalog
+from app.core.executor import ExecutorError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Initialize text detector
 text_detector = TextDetector()
 
+def _index_text(image_id: str, business_type: str, results: List[TextDetectionResult]):
+    """Make the upload's OCR text findable (/api/search/text)"""
+    try:
+        text_index.add(image_id, business_type, results)
+    except sqlite3.Error as e:
+        logger.warning("Cannot index text of %s: %s", image_id, e)
+
 @router.post("/text-detection", response_model=List[TextDetectionResult])
 async def detect_text(request: TextDetectionRequest):
     """Detect and extract text from an image"""
@@ -23,10 +37,14 @@ async def detect_text(request: TextDetectionRequest):
     try:
         results = await text_detector.detect_text_comprehensive(
             request.image_path,
-            request.business_type
+            request.business_type,
+            strategy=request.engine_strategy
         )
         return results
     
+    except ExecutorError:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -34,26 +52,32 @@ async def detect_text(request: TextDetectionRequest):
         )
 
 @router.get("/text-detection/{image_id}")
-async def detect_text_by_id(image_id: str, business_type: str = "General"):
+async def detect_text_by_id(
+    image_id: str,
+    business_type: str = "General",
+    engine_strategy: Optional[OcrEngineStrategy] = None
+):
     """Detect text in a specific uploaded image"""
     
     # Find the uploaded file
-    from pathlib import Path
-    from app.core.config import settings
-    
-    upload_dir = Path(settings.UPLOAD_DIR)
-    matching_files = list(upload_dir.glob(f"{image_id}.*"))
+    image_path = image_catalog.find_path(image_id)
     
-    if not matching_files:
+    if image_path is None:
         raise HTTPException(
             status_code=404,
             detail="Image not found"
         )
     
     try:
-        image_path = str(matching_files[0])
-        results = await text_detector.detect_text_comprehensive(image_path, business_type)
-        return {"text_results": results}
+        timings = {}
+        results = await text_detector.detect_text_comprehensive(
+            image_path, business_type, timings, strategy=engine_strategy
+        )
+        _index_text(image_id, business_type, results)
+        return {"text_results": results, "timings": timings}
+    
+    except ExecutorError:
+        raise
     
     except Exception as e:
         raise HTTPException(
@@ -66,36 +90,38 @@ async def assess_text_quality(image_id: str, business_type: str = "General"):
     """Assess the quality of detected text"""
     
     # Find the uploaded file
-    from pathlib import Path
-    from app.core.config import settings
-    
-    upload_dir = Path(settings.UPLOAD_DIR)
-    matching_files = list(upload_dir.glob(f"{image_id}.*"))
+    image_path = image_catalog.find_path(image_id)
     
-    if not matching_files:
+    if image_path is None:
         raise HTTPException(
             status_code=404,
             detail="Image not found"
         )
     
     try:
-        image_path = str(matching_files[0])
         
         # First detect text
         text_results = await text_detector.detect_text_comprehensive(image_path, business_type)
+        _index_text(image_id, business_type, text_results)
         
         # Then assess quality for each detected text
-        quality_results = []
-        for text_result in text_results:
-            quality_score = text_detector.calculate_text_quality(text_result.text, business_type)
-            quality_results.append({
+        quality_scores = text_detector.calculate_text_quality_batch(
+            [text_result.text for text_result in text_results], business_type
+        )
+        quality_results = [
+            {
                 "text": text_result.text,
                 "confidence": text_result.confidence,
                 "quality_score": quality_score
-            })
+            }
+            for text_result, quality_score in zip(text_results, quality_scores)
+        ]
         
         return {"quality_results": quality_results}
     
+    except ExecutorError:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,18 +1,39 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import json
+import logging
 import os
-import uuid
-import aiofiles
+import time
 from pathlib import Path
 
 from app.core.config import settings
-from app.models.schemas import UploadResponse, ErrorResponse
+from app.core.executor import ExecutorError, analysis_executor
+from app.models.schemas import ImageRecord, SortOrder, UploadResponse, UploadSort, ErrorResponse
+from app.services.blob_store import blob_store
+from app.services.color_index import palette_index
+from app.services.image_catalog import InvalidCursorError, UnknownFormatError, image_catalog, normalize_format
+from app.services.image_analyzer import ImageAnalyzer
+from app.services.perceptual_hash import hash_image_file, near_duplicate_index
+from app.services.result_cache import result_cache
+from app.services.text_index import text_index
+from app.services.upload_store import UploadRejectedError, UploadTooLargeError, save_upload
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Initialize the image analyzer (used for cache lookups only)
+image_analyzer = ImageAnalyzer()
+
 @router.post("/upload", response_model=UploadResponse)
-async def upload_image(file: UploadFile = File(...)):
-    """Upload an image file for analysis"""
+async def upload_image(file: UploadFile = File(...), business_type: Optional[str] = Form(None)):
+    """Upload an image file for analysis
+    
+    Re-uploading bytes that are already stored returns the earlier upload id in
+    duplicate_of and, when it has been analyzed for this business type, the
+    cached analysis.
+    """
     
     # Validate file extension
     file_extension = Path(file.filename).suffix.lower()
@@ -22,98 +43,176 @@ async def upload_image(file: UploadFile = File(...)):
             detail=f"File type {file_extension} not supported. Allowed types: {settings.ALLOWED_IMAGE_EXTENSIONS}"
         )
     
-    # Check file size
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
+    try:
+        # Stream to disk in chunks, hashing and size-checking as we go
+        stored = await save_upload(file, file_extension)
     
-    if file_size > settings.MAX_UPLOAD_SIZE:
+    except UploadTooLargeError as e:
         raise HTTPException(
-            status_code=400,
-            detail=f"File size {file_size} exceeds maximum allowed size {settings.MAX_UPLOAD_SIZE}"
+            status_code=413,
+            detail=str(e)
         )
     
-    # Generate unique filename
-    file_id = str(uuid.uuid4())
-    filename = f"{file_id}{file_extension}"
-    file_path = os.path.join(settings.UPLOAD_DIR, filename)
-    
-    # Ensure upload directory exists
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    
-    try:
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        return UploadResponse(
-            file_id=file_id,
-            filename=file.filename,
-            file_path=file_path,
-            message="File uploaded successfully"
+    except UploadRejectedError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
         )
     
+    except ExecutorError:
+        # Busy or timed out: answered with 503/504 by the app's handlers
+        raise
+    
     except Exception as e:
-        # Clean up file if it was created
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
         raise HTTPException(
             status_code=500,
             detail=f"Failed to upload file: {str(e)}"
         )
+    
+    # Analyses look the hash up instead of re-reading the file
+    result_cache.remember_hash(stored.path, stored.content_hash)
+    image_catalog.add(ImageRecord(
+        id=stored.file_id,
+        filename=os.path.basename(stored.path),
+        original_filename=file.filename,
+        path=stored.path,
+        size=stored.size,
+        format=stored.format,
+        width=stored.width,
+        height=stored.height,
+        channels=stored.channels,
+        content_hash=stored.content_hash,
+        created=time.time()
+    ))
+    
+    # Perceptual hashes, so resized or re-encoded copies can be matched later
+    try:
+        near_duplicate_index.add(stored.file_id, await analysis_executor.run_in_thread(hash_image_file, stored.path))
+    except (OSError, ValueError, ExecutorError) as e:
+        # The upload itself succeeded; it just can't be matched as a near-duplicate
+        logger.warning("Cannot hash upload %s: %s", stored.file_id, e)
+    
+    analysis = None
+    if stored.duplicate_of is not None:
+        analysis = await image_analyzer.cached_analysis(stored.file_id, stored.path, business_type)
+    
+    return UploadResponse(
+        file_id=stored.file_id,
+        filename=file.filename,
+        file_path=stored.path,
+        message="File uploaded successfully" if stored.duplicate_of is None else "Duplicate of an existing upload",
+        content_hash=stored.content_hash,
+        duplicate_of=stored.duplicate_of,
+        analysis=analysis
+    )
 
 @router.delete("/upload/{file_id}")
 async def delete_uploaded_file(file_id: str):
     """Delete an uploaded file"""
     
-    # Find file with this ID
-    upload_dir = Path(settings.UPLOAD_DIR)
-    matching_files = list(upload_dir.glob(f"{file_id}.*"))
-    
-    if not matching_files:
-        raise HTTPException(
-            status_code=404,
-            detail="File not found"
-        )
+    image_path = image_catalog.find_path(file_id)
     
     try:
-        for file_path in matching_files:
-            os.remove(file_path)
-        
-        return {"message": f"File {file_id} deleted successfully"}
+        # Content-addressed uploads drop a reference; the blob goes with the last one
+        deleted = blob_store.remove(file_id)
+        if not deleted and image_path is not None:
+            # Stored before deduplication
+            os.remove(image_path)
+            deleted = True
+        image_catalog.remove(file_id)
+        near_duplicate_index.remove(file_id)
+        palette_index.remove(file_id)
+        text_index.remove(file_id)
     
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete file: {str(e)}"
         )
+    
+    if not deleted:
+        raise HTTPException(
+            status_code=404,
+            detail="File not found"
+        )
+    
+    return {"message": f"File {file_id} deleted successfully"}
+
+def _listing_entry(record: ImageRecord) -> dict:
+    return {
+        **record.model_dump(exclude={"path"}),
+        "url": f"/uploads/{record.filename}"
+    }
 
 @router.get("/uploads")
-async def list_uploaded_files():
-    """List all uploaded files"""
+async def list_uploaded_files(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: UploadSort = "time",
+    order: SortOrder = "desc",
+    format: Optional[str] = None,
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None
+):
+    """List uploaded files one page at a time; pass next_cursor back to get the next page"""
     
     try:
-        upload_dir = Path(settings.UPLOAD_DIR)
-        if not upload_dir.exists():
-            return {"files": []}
-        
-        files = []
-        for file_path in upload_dir.iterdir():
-            if file_path.is_file():
-                file_id = file_path.stem
-                files.append({
-                    "id": file_id,
-                    "filename": file_path.name,
-                    "size": file_path.stat().st_size,
-                    "created": file_path.stat().st_ctime
-                })
-        
-        return {"files": files}
+        records, next_cursor = image_catalog.list(
+            limit,
+            cursor,
+            sort=sort,
+            order=order,
+            format=format,
+            min_size=min_size,
+            max_size=max_size
+        )
+        return {
+            "files": [_listing_entry(record) for record in records],
+            "next_cursor": next_cursor,
+            "limit": limit
+        }
+    
+    except (InvalidCursorError, UnknownFormatError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to list files: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/uploads/stream")
+async def stream_uploaded_files(
+    sort: UploadSort = "time",
+    order: SortOrder = "desc",
+    format: Optional[str] = None,
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None
+):
+    """Stream every uploaded file as NDJSON, one line per file, in catalog pages"""
+    
+    # Checked up front: once streaming has started there is no status code to change
+    if format:
+        try:
+            format = normalize_format(format)
+        except UnknownFormatError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=str(e)
+            )
+    
+    def stream_files():
+        # A sync generator: Starlette iterates it in a worker thread, off the event loop
+        for record in image_catalog.iter_records(
+            sort=sort,
+            order=order,
+            format=format,
+            min_size=min_size,
+            max_size=max_size
+        ):
+            yield json.dumps(_listing_entry(record)) + "\n"
+    
+    return StreamingResponse(stream_files(), media_type="application/x-ndjson")
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Business Image Analysis Platform"
@@ -11,8 +11,15 @@ class Settings(BaseSettings):
     
     # Upload settings
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024      # Bytes copied (and held in memory) at a time per upload
     ALLOWED_IMAGE_EXTENSIONS: List[str] = [".jpg", ".jpeg", ".png", ".bmp", ".tiff"]
     UPLOAD_DIR: str = "uploads"
+    DATA_DIR: str = "data"  # Databases and caches; must not be under the public UPLOAD_DIR
+    UPLOAD_DB_PATH: str = "data/uploads.sqlite3"  # Upload ids and reference-counted blobs
+    NEAR_DUPLICATE_MAX_DISTANCE: int = 6  # pHash bits (of 64) two uploads may differ in to count as near-duplicates
+    SEARCH_DB_PATH: str = "data/search.sqlite3"  # Search indexes over analysis results (palette vectors, OCR text)
+    COLOR_INDEX_IVF_MIN_VECTORS: int = 50_000  # Indexed palettes before an approximate (IVF) color index is built
+    COLOR_INDEX_NPROBE: int = 8  # IVF lists (of ~sqrt(palettes)) an approximate color search scores
     
     # Business types
     BUSINESS_TYPES: List[str] = ["Retail", "Restaurant", "Salon"]
@@ -28,7 +35,58 @@ class Settings(BaseSettings):
     
     # Analysis settings
     DEFAULT_DOMINANT_COLORS: int = 5
+    DOMINANT_COLOR_STRATEGY: str = "histogram"  # exact, subsample, stratified, minibatch, histogram, median_cut
+    DOMINANT_COLOR_SAMPLE_SIZE: int = 100_000   # Pixels kept by the subsample/stratified/minibatch strategies
+    DOMINANT_COLOR_HISTOGRAM_BITS: int = 5      # 2**bits bins per channel for histogram/median_cut (32^3)
+    COLOR_ANALYSIS_MAX_SIDE: int = 512          # Longest side color statistics run at, 0 = native resolution
+    TILED_MEMORY_BUDGET: int = 256 * 1024 * 1024  # Raw BMP/TIFF larger than this (as RGB) are color-analyzed in tiles
     MAX_TEXT_LENGTH: int = 1000
+    TEXT_KEYWORDS_PATH: Optional[str] = None   # JSON {business type or "General": [keywords]} overriding the built-in lists
+    TEXT_KEYWORDS_RELOAD_INTERVAL: float = 5.0  # Seconds between checks of TEXT_KEYWORDS_PATH for changes, -1 = never
+    TEXT_CORRECTIONS_PATH: Optional[str] = None  # JSON {business type or "General": {word: correction}} applied to OCR text
+    
+    # OCR model settings
+    USE_GPU: bool = True
+    OCR_LANGUAGES: List[str] = ["en"]
+    OCR_WARMUP_ON_STARTUP: bool = False  # Load OCR models at startup instead of on first request
+    OCR_BATCH_SIZE: int = 8                # Images per batched EasyOCR inference call
+    OCR_ROI_ENABLED: bool = True           # Find text regions on a small copy, recognize only those crops
+    OCR_DETECT_MAX_SIDE: int = 960         # Longest side of the image text regions are detected on
+    OCR_ENGINE_STRATEGY: str = "sequential"  # sequential, parallel-fuse or race (EasyOCR and Tesseract)
+    OCR_RACE_MIN_CONFIDENCE: float = 0.6   # race: first engine with a detection this confident wins
+    OCR_FUSE_IOU: float = 0.5              # Boxes overlapping this much are the same text
+    BATCH_MAX_CHUNKS_IN_FLIGHT: int = 2    # OCR_BATCH_SIZE chunks a batch analysis works on at once
+    
+    # Executor settings (CPU-bound analysis runs off the event loop)
+    ANALYSIS_THREAD_WORKERS: Optional[int] = None   # cv2/torch/tesseract work; None = cpu_count + 4
+    ANALYSIS_PROCESS_WORKERS: Optional[int] = None  # sklearn work; None = cpu_count, 0 = use threads
+    ANALYSIS_MAX_QUEUE_DEPTH: int = 64              # Jobs queued or running before returning 503
+    ANALYSIS_JOB_TIMEOUT: float = 120.0             # Seconds per job, 0 = no timeout
+    
+    # Analysis result cache
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_BACKEND: str = "memory"  # memory, sqlite or redis (memory LRU is always in front)
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESULT_CACHE_PERSISTENT_MAX_ENTRIES: int = 100_000
+    RESULT_CACHE_TTL: int = 7 * 24 * 3600  # Seconds, 0 = never expire
+    RESULT_CACHE_SQLITE_PATH: str = "data/analysis_cache.sqlite3"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    
+    # Background analysis jobs
+    JOB_BROKER: str = "memory"        # memory (in-process) or redis
+    JOB_WORKERS: int = 2              # Jobs analyzed concurrently per API process
+    JOB_MAX_QUEUED: int = 1000        # Waiting jobs before POST /api/jobs returns 503
+    JOB_MAX_RETRIES: int = 2
+    JOB_RETRY_DELAY: float = 2.0      # Seconds, multiplied by the attempt number
+    JOB_RESULT_TTL: int = 24 * 3600   # Seconds a job and its result are kept
+    JOB_STALE_AFTER: float = 600.0    # Seconds without progress before a running job is taken over at startup
+    
+    # Logging
+    LOG_LEVEL: str = "INFO"           # Per-token OCR diagnostics are logged at DEBUG
+    LOG_FORMAT: str = "text"          # text or json (one object per line)
+    LOG_QUEUE: bool = False           # Hand records to a background thread instead of writing inline
+    LOG_TRACE_SAMPLE_RATE: float = 0.0  # Fraction of OCR calls traced per token at INFO, 0 = never
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,169 @@
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+
+class ExecutorError(Exception):
+    """Base class for errors raised by the analysis executor"""
+
+
+class ExecutorBusyError(ExecutorError):
+    """Raised when the job queue is full; mapped to HTTP 503"""
+
+
+class ExecutorTimeoutError(ExecutorError):
+    """Raised when a job exceeds its timeout; mapped to HTTP 504"""
+
+
+def _process_context():
+    """Start method for the process pool: never fork
+
+    The pool is created on first use, when this process already runs the
+    thread pool, the event loop and loaded OCR models; a forked child would
+    inherit their locks mid-state (and copies of the models). forkserver
+    starts workers from a clean single-threaded server process.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+class AnalysisExecutor:
+    def __init__(
+        self,
+        thread_workers: int,
+        process_workers: int,
+        max_queue_depth: int,
+        job_timeout: float,
+    ):
+        """Initialize the executor; pools are created lazily on first use"""
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.max_queue_depth = max_queue_depth
+        self.job_timeout = job_timeout
+
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            with self._lock:
+                if self._thread_pool is None:
+                    self._thread_pool = ThreadPoolExecutor(
+                        max_workers=self.thread_workers,
+                        thread_name_prefix="analysis",
+                    )
+        return self._thread_pool
+
+    def _get_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.process_workers <= 0:
+            return None
+        if self._process_pool is None:
+            with self._lock:
+                if self._process_pool is None:
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.process_workers,
+                        mp_context=_process_context(),
+                    )
+        return self._process_pool
+
+    def _acquire_slot(self):
+        with self._lock:
+            if self._pending >= self.max_queue_depth:
+                self._rejected += 1
+                raise ExecutorBusyError(
+                    f"Analysis queue is full ({self._pending}/{self.max_queue_depth} jobs)"
+                )
+            self._pending += 1
+
+    def _release_slot(self, future=None):
+        # Failed, cancelled and timed-out jobs (even one that ran on after its
+        # caller gave up) are not completed ones
+        completed = (
+            future is not None and not future.cancelled()
+            and not getattr(future, "timed_out", False) and future.exception() is None
+        )
+        with self._lock:
+            self._pending -= 1
+            if completed:
+                self._completed += 1
+
+    async def _run(self, pool, func: Callable, args, kwargs, timeout: Optional[float]) -> Any:
+        self._acquire_slot()
+        try:
+            if isinstance(pool, ThreadPoolExecutor):
+                # Carry the request's context (log correlation id) into the worker thread
+                future = pool.submit(contextvars.copy_context().run, func, *args, **kwargs)
+            else:
+                future = pool.submit(func, *args, **kwargs)
+        except BaseException:
+            self._release_slot()
+            raise
+        # The slot is held until the job really finishes, even if the caller
+        # stops waiting, so queue depth reflects actual work in the pools
+        future.add_done_callback(self._release_slot)
+
+        timeout = self.job_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout or None)
+        except asyncio.TimeoutError:
+            future.timed_out = True
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise ExecutorTimeoutError(f"{getattr(func, '__name__', 'job')} timed out after {timeout}s")
+
+    async def run_in_thread(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run GIL-releasing work (cv2, torch, tesseract) on the thread pool"""
+        return await self._run(self._get_thread_pool(), func, args, kwargs, timeout)
+
+    async def run_in_process(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run GIL-bound work (sklearn, pure Python) on the process pool
+
+        func and its arguments must be picklable. Falls back to the thread pool
+        when ANALYSIS_PROCESS_WORKERS is 0.
+        """
+        pool = self._get_process_pool() or self._get_thread_pool()
+        return await self._run(pool, func, args, kwargs, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._pending,
+            "max_queue_depth": self.max_queue_depth,
+            "thread_workers": self.thread_workers,
+            "process_workers": self.process_workers,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+        }
+
+    def shutdown(self):
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+
+analysis_executor = AnalysisExecutor(
+    thread_workers=settings.ANALYSIS_THREAD_WORKERS or min(32, (os.cpu_count() or 1) + 4),
+    process_workers=(
+        os.cpu_count() or 1
+        if settings.ANALYSIS_PROCESS_WORKERS is None
+        else settings.ANALYSIS_PROCESS_WORKERS
+    ),
+    max_queue_depth=settings.ANALYSIS_MAX_QUEUE_DEPTH,
+    job_timeout=settings.ANALYSIS_JOB_TIMEOUT,
+)
@@ -0,0 +1,107 @@
+"""Logging setup: level gating, request correlation ids and an optional queue handler.
+
+Modules log through ``logging.getLogger(__name__)`` with %-style arguments,
+so messages below the configured level are never formatted. Every record
+carries the id of the request (or background job) it was emitted for, taken
+from ``request_id_var``; ``RequestIdMiddleware`` sets it per HTTP request and
+the analysis executor copies it into its worker threads.
+
+With LOG_QUEUE enabled, handlers run on a listener thread and callers only
+pay for putting the record on a queue.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from typing import Optional
+
+from app.core.config import settings
+
+# Correlation id of the request or job being handled ("-" outside of one)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp each record with the current correlation id"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def trace_level(logger: logging.Logger) -> Optional[int]:
+    """Level to emit per-item diagnostics at for one unit of work, or None to skip them
+
+    DEBUG when the logger is at debug level; otherwise a LOG_TRACE_SAMPLE_RATE
+    fraction of calls are traced at INFO so production logs carry occasional
+    full traces without the cost of tracing everything.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        return logging.DEBUG
+    if settings.LOG_TRACE_SAMPLE_RATE > 0 and random.random() < settings.LOG_TRACE_SAMPLE_RATE:
+        return logging.INFO
+    return None
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging():
+    """Install the app's handler on the root logger (idempotent)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    handler = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    elif settings.LOG_FORMAT == "text":
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    else:
+        raise ValueError(f"Unknown LOG_FORMAT {settings.LOG_FORMAT!r}, expected 'text' or 'json'")
+
+    if settings.LOG_QUEUE:
+        _listener = logging.handlers.QueueListener(queue.SimpleQueue(), handler, respect_handler_level=True)
+        _listener.start()
+        handler = logging.handlers.QueueHandler(_listener.queue)
+
+    # The filter runs on the emitting side, where the request's context is current
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if getattr(h, "_app_handler", False)]:
+        root.removeHandler(existing)
+    handler._app_handler = True
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+
+def shutdown_logging():
+    """Flush records still waiting on the queue"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,154 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are updated where the work happens: request
+latency by route in ``MetricsMiddleware``, stage latency in ``timed``,
+whole-image analysis latency by image size in ``ImageAnalyzer``. Values
+that already live elsewhere (queue depths, cache counters, model load
+times) are read at scrape time and rendered as gauges by ``/metrics``.
+
+Only the API process is measured: work run in the process pool is timed
+by the caller around the submitted job.
+"""
+
+import bisect
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds: 5 ms up to 2 minutes (OCR of a large image on CPU)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Upper bounds in megapixels of the image size classes used as a label
+SIZE_CLASSES = ((0.5, "lt_0.5mp"), (2.0, "0.5_2mp"), (8.0, "2_8mp"), (32.0, "8_32mp"))
+
+
+def size_class(width: int, height: int) -> str:
+    """Bounded label for an image size, so histograms don't get one series per resolution"""
+    megapixels = width * height / 1e6
+    for limit, label in SIZE_CLASSES:
+        if megapixels < limit:
+            return label
+    return "ge_32mp"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+def _render_samples(name: str, help: str, type: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return lines
+
+
+def render_gauge(name: str, help: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Gauge lines for values read at scrape time: samples are (labels, value) pairs"""
+    return _render_samples(name, help, "gauge", samples)
+
+
+def render_counter(name: str, help: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Counter lines for running totals kept elsewhere and read at scrape time
+
+    name should end in ``_total``; the values must only ever go up (until a restart).
+    """
+    return _render_samples(name, help, "counter", samples)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, labels, buckets))
+
+    def render(self, extra: Optional[Iterable[str]] = None) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        lines.extend(extra or [])
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
+
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+stage_seconds = metrics.histogram(
+    "analysis_stage_seconds", "Time spent per analysis stage (decode, color_*, ocr_*, ...)", ("stage",)
+)
+image_analysis_seconds = metrics.histogram(
+    "image_analysis_duration_seconds", "Whole-image analysis latency by image size class", ("size", "cached")
+)
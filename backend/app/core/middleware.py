@@ -0,0 +1,131 @@
+import json
+import time
+import uuid
+from typing import Iterable
+
+from fastapi import HTTPException
+
+from app.core.log import request_id_var
+from app.core.metrics import http_request_seconds
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies over a byte limit before they are spooled
+
+    A Content-Length over the limit is answered with 413 without reading the
+    body. Bodies without one (chunked uploads) are counted as they stream in
+    and cut off with a 413 as soon as they cross the limit.
+    """
+
+    def __init__(self, app, max_body_size: int, paths: Iterable[str]):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds maximum allowed size {self.max_body_size}"
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_body_size:
+                await self._reject(send, detail)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # Raised inside the route, so FastAPI turns it into the response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class MetricsMiddleware:
+    """Observe every HTTP request's latency by method, route template and status
+
+    Routes are labelled by their template (``/api/analysis/{image_id}``), not
+    the concrete path, so the number of series stays bounded; requests that
+    match no route share the label ``unmatched``. Streaming responses are
+    timed until their last body chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+
+
+class RequestIdMiddleware:
+    """Give each request a correlation id for its log records
+
+    A client-supplied ``X-Request-ID`` is reused (truncated to 64 characters),
+    otherwise a new id is generated. The id is echoed in the response headers.
+    """
+
+    header = b"x-request-id"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope["headers"]).get(self.header, b"").decode("latin-1")[:64]
+        request_id = request_id or uuid.uuid4().hex[:16]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (self.header, request_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
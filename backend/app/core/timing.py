@@ -0,0 +1,22 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.core.metrics import stage_seconds
+
+
+@contextmanager
+def timed(timings: Optional[Dict[str, float]], stage: str):
+    """Add the monotonic seconds spent in the block to timings[stage] and the stage histogram
+
+    timings may be None when the caller doesn't want a per-request breakdown;
+    the histogram behind /metrics is updated either way.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
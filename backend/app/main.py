@@ -1,10 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import os
 
-from app.api import upload, analysis, color_analysis, text_detection
+from app.api import upload, analysis, color_analysis, text_detection, jobs, search, system, metrics
 from app.core.config import settings
+from app.core.executor import ExecutorBusyError, ExecutorTimeoutError, analysis_executor
+from app.core.log import configure_logging, shutdown_logging
+from app.core.middleware import BodySizeLimitMiddleware, MetricsMiddleware, RequestIdMiddleware
+from app.services.color_index import palette_index
+from app.services.image_catalog import image_catalog
+from app.services.model_registry import model_registry
+from app.services.perceptual_hash import near_duplicate_index
+
+configure_logging()
 
 app = FastAPI(
     title="Business Image Analysis API",
@@ -12,6 +23,19 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Cut off oversized uploads before they are spooled (multipart framing gets a small allowance)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=settings.MAX_UPLOAD_SIZE + 64 * 1024,
+    paths=[f"{settings.API_V1_STR}/upload"]
+)
+
+# Request latency by route for /metrics (wraps the size limit, so rejected uploads are counted too)
+app.add_middleware(MetricsMiddleware)
+
+# Correlation id on every log record emitted while handling a request
+app.add_middleware(RequestIdMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -30,6 +54,47 @@ app.include_router(upload.router, prefix="/api", tags=["upload"])
 app.include_router(analysis.router, prefix="/api", tags=["analysis"])
 app.include_router(color_analysis.router, prefix="/api", tags=["color-analysis"])
 app.include_router(text_detection.router, prefix="/api", tags=["text-detection"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+app.include_router(search.router, prefix="/api", tags=["search"])
+app.include_router(system.router, prefix="/api", tags=["system"])
+app.include_router(metrics.router, tags=["metrics"])
+
+@app.exception_handler(ExecutorBusyError)
+async def executor_busy_handler(request: Request, exc: ExecutorBusyError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Server busy: {exc}"},
+        headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(ExecutorTimeoutError)
+async def executor_timeout_handler(request: Request, exc: ExecutorTimeoutError):
+    return JSONResponse(status_code=504, content={"detail": f"Analysis timed out: {exc}"})
+
+@app.on_event("startup")
+async def warm_up_models():
+    if settings.OCR_WARMUP_ON_STARTUP:
+        # Load in a worker thread so the event loop can keep serving /health
+        asyncio.get_running_loop().run_in_executor(None, model_registry.warm_up)
+
+def _backfill_indexes():
+    image_catalog.backfill()
+    near_duplicate_index.backfill(image_catalog.iter_records())
+    # Build the approximate color index over the palettes loaded from disk, if there are enough
+    palette_index.rebuild(force=False)
+
+@app.on_event("startup")
+async def backfill_image_catalog():
+    # Index uploads that predate the catalog (and perceptual hashing) without holding up startup
+    asyncio.get_running_loop().run_in_executor(None, _backfill_indexes)
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    analysis_executor.shutdown()
+
+@app.on_event("shutdown")
+async def flush_logs():
+    shutdown_logging()
 
 @app.get("/")
 async def root():
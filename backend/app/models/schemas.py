@@ -1,7 +1,29 @@
-from pydantic import BaseModel
-from typing import List, Dict, Optional, Any
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional, Any, Literal
 from datetime import datetime
 
+# Dominant color clustering backends, and the quality presets that map onto them
+DominantColorStrategy = Literal["exact", "subsample", "stratified", "minibatch", "histogram", "median_cut"]
+ColorQuality = Literal["exact", "high", "balanced", "fast"]
+
+# How EasyOCR and Tesseract are combined (see text_detector.ENGINE_STRATEGIES)
+OcrEngineStrategy = Literal["sequential", "parallel-fuse", "race"]
+
+# Largest pHash distance a near-duplicate lookup accepts: beyond it the
+# multi-index hash would flip more than 3 bits per 16-bit substring and
+# enumerate more candidates than a linear scan
+MAX_HASH_DISTANCE = 15
+
+# Orderings of the upload listing (see image_catalog.SORT_KEYS)
+UploadSort = Literal["time", "size", "format"]
+SortOrder = Literal["asc", "desc"]
+
+# Nearest-neighbour search of the color index (see color_index.PaletteIndex.search)
+ColorSearchMode = Literal["auto", "exact", "approximate"]
+
+# Orderings of OCR text search results (see text_index.TextIndex.search)
+TextSearchSort = Literal["recent", "relevance"]
+
 class BusinessType(BaseModel):
     name: str
     description: str
@@ -15,9 +37,11 @@ class ColorAnalysisResult(BaseModel):
     dominant_colors: List[ColorInfo]
     color_temperature: float
     color_harmony_score: float
+    delta_e_harmony_score: Optional[float] = None  # 1 - weighted mean CIELAB deltaE between dominant colors / 100
     brightness: float
     contrast: float
     saturation: float
+    analysis_resolution: Optional[List[int]] = None  # [width, height] the statistics were computed at
 
 class TextDetectionResult(BaseModel):
     text: str
@@ -31,6 +55,19 @@ class ImageStats(BaseModel):
     file_size: int
     format: str
 
+class ImageRecord(BaseModel):
+    id: str
+    filename: str                             # Stored file name in UPLOAD_DIR
+    original_filename: Optional[str] = None   # Name the client uploaded it as
+    path: str
+    size: int
+    format: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    channels: Optional[int] = None
+    content_hash: Optional[str] = None
+    created: float  # Upload time (unix timestamp)
+
 class AnalysisResult(BaseModel):
     id: str
     filename: str
@@ -40,12 +77,24 @@ class AnalysisResult(BaseModel):
     color_analysis: Optional[ColorAnalysisResult] = None
     text_detection: Optional[List[TextDetectionResult]] = None
     processing_time: float
+    timings: Optional[Dict[str, float]] = None  # Seconds per stage (decode, color, text, ocr_detect, ...)
+    near_duplicate_of: Optional[str] = None  # Image whose cached analysis was reused (perceptual hash match)
+    hash_distance: Optional[int] = None      # pHash Hamming distance to that image
+
+class BatchAnalysisItem(BaseModel):
+    image_id: str
+    status: Literal["completed", "failed"]
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
 
 class UploadResponse(BaseModel):
     file_id: str
     filename: str
     file_path: str
     message: str
+    content_hash: Optional[str] = None  # SHA-256 of the uploaded bytes
+    duplicate_of: Optional[str] = None  # Earlier upload with identical bytes (stored once)
+    analysis: Optional[AnalysisResult] = None  # Cached analysis of identical content, if any
 
 class ErrorResponse(BaseModel):
     error: str
@@ -55,11 +104,35 @@ class AnalysisRequest(BaseModel):
     image_id: str
     business_type: Optional[str] = None
     analysis_types: List[str] = ["color", "text"]  # Types of analysis to perform
+    reuse_near_duplicates: bool = False  # Serve the cached analysis of a visually near-identical upload
+    max_hash_distance: Optional[int] = Field(None, ge=0, le=MAX_HASH_DISTANCE)  # pHash bits that may differ; defaults to NEAR_DUPLICATE_MAX_DISTANCE
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+    request: AnalysisRequest
+    progress: Dict[str, str] = {}  # Stage (decode / color / text) -> pending, running, done or skipped
+    attempts: int = 0
+    created_at: float
+    updated_at: float
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+class BatchAnalysisRequest(BaseModel):
+    image_ids: List[str] = []
+    directory: Optional[str] = None  # Analyze every image file in this directory (under UPLOAD_DIR)
+    manifest: Optional[str] = None   # File under UPLOAD_DIR listing image ids or paths (JSON list or one per line)
+    business_type: Optional[str] = None
+    analysis_types: List[str] = ["color", "text"]
 
 class ColorAnalysisRequest(BaseModel):
     image_path: str
     n_colors: int = 5
+    quality: Optional[ColorQuality] = None  # Speed/accuracy trade-off; defaults to DOMINANT_COLOR_STRATEGY
+    strategy: Optional[DominantColorStrategy] = None  # Explicit backend, overrides quality
+    max_side: Optional[int] = Field(None, ge=0)  # Analysis resolution; defaults to COLOR_ANALYSIS_MAX_SIDE, 0 = native
 
 class TextDetectionRequest(BaseModel):
     image_path: str
-    business_type: str = "General"
\ No newline at end of file
+    business_type: str = "General"
+    engine_strategy: Optional[OcrEngineStrategy] = None  # Defaults to OCR_ENGINE_STRATEGY
\ No newline at end of file
@@ -0,0 +1,136 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+
+class BlobStore:
+    def __init__(self, upload_dir: str, db_path: str):
+        """Content-addressed upload storage with reference counts
+
+        Each distinct file is stored once under UPLOAD_DIR/.blobs/ by its
+        SHA-256. Every upload id gets an alias UPLOAD_DIR/<file_id><ext>
+        (a hard link, so it costs no space), which keeps existing paths and
+        the /uploads static route working. A blob is deleted when its last
+        alias is.
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.upload_dir = upload_dir
+        self.blob_dir = os.path.join(upload_dir, ".blobs")
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "content_hash TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, "
+            "refs INTEGER NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS aliases ("
+            "file_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, path TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS aliases_hash ON aliases (content_hash)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def blob_path(self, content_hash: str, extension: str) -> str:
+        return os.path.join(self.blob_dir, content_hash[:2], f"{content_hash}{extension}")
+
+    def add(self, file_id: str, temp_path: str, content_hash: str, extension: str) -> Tuple[str, Optional[str]]:
+        """Store a fully received upload; returns (alias path, file_id of an earlier identical upload)"""
+        alias_path = os.path.join(self.upload_dir, f"{file_id}{extension}")
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT path, refs FROM blobs WHERE content_hash = ?", (content_hash,)
+                ).fetchone()
+                duplicate_of = None
+                if row is not None and os.path.exists(row[0]):
+                    # Already stored: drop the new copy instead of writing it again
+                    blob_path = row[0]
+                    os.remove(temp_path)
+                    duplicate = self._conn.execute(
+                        "SELECT file_id FROM aliases WHERE content_hash = ? ORDER BY created LIMIT 1", (content_hash,)
+                    ).fetchone()
+                    duplicate_of = duplicate[0] if duplicate else None
+                    self._conn.execute("UPDATE blobs SET refs = refs + 1 WHERE content_hash = ?", (content_hash,))
+                else:
+                    # New content (or a blob lost from disk, which this copy restores)
+                    blob_path = self.blob_path(content_hash, extension)
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(temp_path, blob_path)
+                    refs = (row[1] if row is not None else 0) + 1
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO blobs (content_hash, path, size, refs, created) VALUES (?, ?, ?, ?, ?)",
+                        (content_hash, blob_path, os.path.getsize(blob_path), refs, now),
+                    )
+
+                _link(blob_path, alias_path)
+                self._conn.execute(
+                    "INSERT INTO aliases (file_id, content_hash, path, created) VALUES (?, ?, ?, ?)",
+                    (file_id, content_hash, alias_path, now),
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return alias_path, duplicate_of
+
+    def remove(self, file_id: str) -> bool:
+        """Delete an upload id; the blob goes with its last reference. False if the id is unknown"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, path FROM aliases WHERE file_id = ?", (file_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            content_hash, alias_path = row
+            if os.path.lexists(alias_path):
+                os.remove(alias_path)
+            self._conn.execute("DELETE FROM aliases WHERE file_id = ?", (file_id,))
+            self._conn.execute("UPDATE blobs SET refs = refs - 1 WHERE content_hash = ?", (content_hash,))
+
+            blob = self._conn.execute(
+                "SELECT path, refs FROM blobs WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+            if blob is not None and blob[1] <= 0:
+                if os.path.exists(blob[0]):
+                    os.remove(blob[0])
+                self._conn.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+            self._conn.commit()
+        return True
+
+    def stats(self):
+        with self._lock:
+            blobs, blob_bytes, uploads, saved = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refs), 0), "
+                "COALESCE(SUM(size * (refs - 1)), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "blobs": blobs,
+            "blob_bytes": blob_bytes,
+            "uploads": uploads,
+            "bytes_saved": saved,
+        }
+
+
+def _link(source: str, alias: str):
+    """Hard link, falling back to a relative symlink, then to a copy"""
+    try:
+        os.link(source, alias)
+        return
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.relpath(source, os.path.dirname(alias)), alias)
+        return
+    except OSError:
+        pass
+    shutil.copyfile(source, alias)
+
+
+blob_store = BlobStore(settings.UPLOAD_DIR, settings.UPLOAD_DB_PATH)
@@ -1,86 +1,141 @@
 import numpy as np
 import cv2
-from PIL import Image, ImageStat
-from sklearn.cluster import KMeans
-from typing import List
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple, Union
 
+from app.core.config import settings
+from app.core.executor import ExecutorError, analysis_executor
+from app.core.timing import timed
 from app.models.schemas import ColorAnalysisResult, ColorInfo
+from app.services.color_stats import ColorStats, ColorStatsAccumulator
+from app.services.decoded_image import DecodedImage, decode_async
+from app.services.dominant_colors import (
+    HISTOGRAM_STRATEGIES,
+    ColorHistogram,
+    cluster_colors,
+    extract_palette,
+    reduce_pixels,
+    resolve_strategy,
+)
+from app.services.palette_analytics import pack_palettes, palette_hex, score_palettes
+from app.services.tiled_image import TiledImage
+
+logger = logging.getLogger(__name__)
 
 class ColorAnalyzer:
     def __init__(self):
         """Initialize color analyzer"""
         pass
     
+    def _analysis_max_side(self, max_side: Optional[int]) -> int:
+        """Per-request override of COLOR_ANALYSIS_MAX_SIDE (0 = native resolution)"""
+        return settings.COLOR_ANALYSIS_MAX_SIDE if max_side is None else max_side
+    
+    def compute_color_stats(self, image) -> ColorStats:
+        """Channel and saturation histograms, from one pass over the pixels (cached on the image)"""
+        return DecodedImage.ensure(image).color_stats
+    
     def analyze_basic_stats(self, image):
         """Analyze basic color statistics"""
-        stat = ImageStat.Stat(image)
-        mean = stat.mean  # Average RGB values
-        stddev = stat.stddev  # Standard deviation of RGB
-        
-        brightness = np.mean(mean)
-        contrast = np.mean(stddev)
-        
-        # Calculate saturation from RGB values
-        image_np = np.array(image)
-        saturation = self._calculate_saturation(image_np)
+        return self._basic_stats(self.compute_color_stats(image))
+    
+    def _basic_stats(self, stats: ColorStats):
+        # Per-band mean/stddev from 256-bin histograms, as PIL's ImageStat does
+        brightness = np.mean(stats.channel_means)
+        contrast = np.mean(stats.channel_stddevs)
         
-        return brightness, contrast, saturation
+        return brightness, contrast, stats.saturation
     
-    def _calculate_saturation(self, image_np):
+    def _calculate_saturation(self, image):
         """Calculate average saturation of image"""
-        # Convert to HSV to get saturation values
-        hsv = cv2.cvtColor(image_np, cv2.COLOR_RGB2HSV)
-        saturation = np.mean(hsv[:, :, 1]) / 255.0  # Normalize to 0-1
-        return saturation
+        return self.compute_color_stats(image).saturation
     
-    def extract_dominant_colors(self, image, n_colors=5):
-        """Extract dominant colors using K-means clustering"""
+    def extract_dominant_colors(self, image, n_colors=5, strategy: Optional[str] = None, quality: Optional[str] = None):
+        """Extract dominant colors with the selected clustering strategy"""
+        strategy = resolve_strategy(strategy, quality)
         try:
-            # Convert image to numpy array and reshape
-            image_np = np.array(image)
-            pixels = image_np.reshape(-1, 3)
-            
-            # Apply K-means clustering
-            kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-            kmeans.fit(pixels)
-            
-            # Get cluster centers (dominant colors) and labels
-            colors = kmeans.cluster_centers_.astype(int)
-            labels = kmeans.labels_
-            
-            # Count pixels in each cluster
-            unique_labels, counts = np.unique(labels, return_counts=True)
-            
-            # Calculate percentages
-            total_pixels = len(pixels)
-            percentages = (counts / total_pixels) * 100
-            
-            # Sort by percentage
-            sorted_indices = np.argsort(percentages)[::-1]
-            
-            dominant_colors = []
-            for i in sorted_indices:
-                dominant_colors.append(ColorInfo(
-                    rgb=colors[i].tolist(),
-                    hex='#{:02x}{:02x}{:02x}'.format(colors[i][0], colors[i][1], colors[i][2]),
-                    percentage=float(percentages[i])
-                ))
-            
-            return dominant_colors
+            colors, percentages = extract_palette(
+                DecodedImage.ensure(image).rgb,
+                n_colors,
+                strategy,
+                max_samples=settings.DOMINANT_COLOR_SAMPLE_SIZE,
+                histogram_bits=settings.DOMINANT_COLOR_HISTOGRAM_BITS
+            )
+            return self._build_color_infos(colors, percentages)
             
         except Exception as e:
-            print(f"Error in dominant color extraction: {e}")
+            logger.warning("Dominant color extraction failed: %s", e)
+            return []
+    
+    async def _extract_dominant_colors(
+        self,
+        image: DecodedImage,
+        n_colors: int,
+        strategy: str,
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[ColorInfo]:
+        """Reduce pixels on a thread, then cluster the small point set in a worker process"""
+        try:
+            with timed(timings, "color_reduce"):
+                points, weights = await analysis_executor.run_in_thread(
+                    reduce_pixels,
+                    image.rgb,
+                    strategy,
+                    settings.DOMINANT_COLOR_SAMPLE_SIZE,
+                    settings.DOMINANT_COLOR_HISTOGRAM_BITS
+                )
+        
+        except ExecutorError:
+            raise
+        
+        except Exception as e:
+            logger.warning("Dominant color extraction failed: %s", e)
+            return []
+        
+        return await self._cluster_dominant_colors(points, weights, n_colors, strategy, timings)
+    
+    async def _cluster_dominant_colors(
+        self,
+        points,
+        weights,
+        n_colors: int,
+        strategy: str,
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[ColorInfo]:
+        try:
+            with timed(timings, "color_cluster"):
+                colors, percentages = await analysis_executor.run_in_process(
+                    cluster_colors, points, weights, n_colors, strategy
+                )
+            return self._build_color_infos(colors, percentages)
+        
+        except ExecutorError:
+            raise
+        
+        except Exception as e:
+            logger.warning("Dominant color extraction failed: %s", e)
             return []
     
+    def _build_color_infos(self, colors, percentages) -> List[ColorInfo]:
+        """Turn cluster centers and percentages into ColorInfo, most common first"""
+        # Sort by percentage, then convert the whole palette at once
+        order = np.argsort(percentages)[::-1]
+        colors = np.asarray(colors).astype(int)[order]
+        percentages = np.asarray(percentages, dtype=float)[order]
+        
+        return [
+            ColorInfo(rgb=rgb, hex=hex_code, percentage=percentage)
+            for rgb, hex_code, percentage in zip(colors.tolist(), palette_hex(colors), percentages.tolist())
+        ]
+    
     def calculate_color_temperature(self, image):
         """Calculate approximate color temperature"""
-        # Convert to numpy array
-        image_np = np.array(image)
-        
-        # Calculate average RGB values
-        avg_r = np.mean(image_np[:, :, 0])
-        avg_g = np.mean(image_np[:, :, 1])
-        avg_b = np.mean(image_np[:, :, 2])
+        return self._color_temperature(self.compute_color_stats(image))
+    
+    def _color_temperature(self, stats: ColorStats) -> float:
+        # Average RGB values
+        avg_r, avg_g, avg_b = stats.channel_means
         
         # Simple color temperature estimation
         # Warmer images have higher red/yellow content
@@ -92,84 +147,146 @@ class ColorAnalyzer:
         
         return float(temperature)
     
+    def calculate_palette_harmony(self, dominant_colors: List[ColorInfo]) -> Dict[str, float]:
+        """Hue- and CIELAB deltaE-based harmony of the most common dominant colors"""
+        colors, weights, mask = pack_palettes(
+            [[color.rgb for color in dominant_colors]],
+            [[color.percentage for color in dominant_colors]]
+        )
+        return {name: float(values[0]) for name, values in score_palettes(colors, weights, mask).items()}
+    
     def calculate_color_harmony(self, dominant_colors):
         """Calculate color harmony metrics"""
-        if len(dominant_colors) < 2:
-            return 0.0
-        
-        # Extract RGB values
-        colors_rgb = [color.rgb for color in dominant_colors[:5]]
-        
-        # Convert to HSV for better color analysis
-        colors_hsv = []
-        for rgb in colors_rgb:
-            rgb_norm = np.array(rgb) / 255.0
-            hsv = cv2.cvtColor(np.uint8([[[rgb[0], rgb[1], rgb[2]]]]), cv2.COLOR_RGB2HSV)[0][0]
-            colors_hsv.append(hsv)
-        
-        # Calculate hue differences
-        hues = [hsv[0] for hsv in colors_hsv]
-        hue_diffs = []
-        
-        for i in range(len(hues)):
-            for j in range(i+1, len(hues)):
-                diff = abs(hues[i] - hues[j])
-                diff = min(diff, 180 - diff)  # Circular distance on hue wheel
-                hue_diffs.append(diff)
-        
-        if not hue_diffs:
-            return 0.5
-        
-        avg_hue_diff = np.mean(hue_diffs)
-        
-        # Determine harmony score (0-1 scale)
-        if avg_hue_diff < 30:
-            harmony_score = 0.9  # Monochromatic
-        elif avg_hue_diff < 60:
-            harmony_score = 0.85  # Analogous
-        elif 60 <= avg_hue_diff <= 90:
-            harmony_score = 0.8  # Triadic
-        elif 120 <= avg_hue_diff <= 180:
-            harmony_score = 0.75  # Complementary
+        return self.calculate_palette_harmony(dominant_colors)["hue_harmony"]
+    
+    def _open_tiled(self, image: Union[str, DecodedImage], max_side: int) -> Optional[TiledImage]:
+        """A tiled reader when a raw BMP/TIFF at this resolution would not fit in TILED_MEMORY_BUDGET"""
+        if not isinstance(image, str):
+            return None
+        return TiledImage.open_over_budget(image, max_side)
+    
+    def _scan_tiles(
+        self,
+        tiled: TiledImage,
+        strategy: Optional[str] = None
+    ) -> Tuple[ColorStats, Optional[Tuple[np.ndarray, np.ndarray]]]:
+        """One pass over the image's bands: color statistics, plus the color histogram for histogram strategies"""
+        stats = ColorStatsAccumulator()
+        histogram = ColorHistogram(settings.DOMINANT_COLOR_HISTOGRAM_BITS) if strategy in HISTOGRAM_STRATEGIES else None
+        for _, band in tiled.bands():
+            stats.update(band)
+            if histogram is not None:
+                histogram.update(band.reshape(-1, 3))
+        return stats.result(), histogram.points_and_weights() if histogram is not None else None
+    
+    async def _analyze_tiles(
+        self,
+        tiled: TiledImage,
+        n_colors: int,
+        strategy: str,
+        timings: Optional[Dict[str, float]] = None
+    ) -> Tuple[ColorStats, List[ColorInfo]]:
+        """Color statistics and dominant colors at native resolution, without holding the image in memory"""
+        with timed(timings, "color_scan_tiles"):
+            stats, reduced = await analysis_executor.run_in_thread(self._scan_tiles, tiled, strategy)
+        if reduced is not None:
+            dominant_colors = await self._cluster_dominant_colors(*reduced, n_colors, strategy, timings)
         else:
-            harmony_score = 0.6  # Complex
-        
-        return float(harmony_score)
+            # Sampling strategies need a pixel buffer: use the largest copy that fits the budget
+            with timed(timings, "color_read_tiles"):
+                rgb = await analysis_executor.run_in_thread(tiled.read, tiled.max_side_within())
+            image = DecodedImage(
+                rgb,
+                path=tiled.path,
+                format=tiled.format,
+                channels=tiled.channels,
+                original_size=(tiled.width, tiled.height)
+            )
+            dominant_colors = await self._extract_dominant_colors(image, n_colors, strategy, timings)
+        return stats, dominant_colors
     
-    async def analyze_comprehensive(self, image_path: str, n_colors: int = 5) -> ColorAnalysisResult:
-        """Comprehensive color analysis of an image"""
-        try:
-            image = Image.open(image_path).convert('RGB')
-        except Exception as e:
-            raise Exception(f"Cannot open image {image_path}: {e}")
-        
-        # Basic statistics
-        brightness, contrast, saturation = self.analyze_basic_stats(image)
+    async def _compute_color_stats_async(self, image: DecodedImage, timings: Optional[Dict[str, float]] = None) -> ColorStats:
+        with timed(timings, "color_stats"):
+            return await analysis_executor.run_in_thread(self.compute_color_stats, image)
+    
+    async def analyze_comprehensive(
+        self,
+        image: Union[str, DecodedImage],
+        n_colors: int = 5,
+        strategy: Optional[str] = None,
+        quality: Optional[str] = None,
+        max_side: Optional[int] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> ColorAnalysisResult:
+        """Comprehensive color analysis of an image (path or already-decoded image)
+
+        When a timings dict is passed, seconds spent per color stage are added to it.
+        """
+        strategy = resolve_strategy(strategy, quality)
+        max_side = self._analysis_max_side(max_side)
         
-        # Dominant colors
-        dominant_colors = self.extract_dominant_colors(image, n_colors)
+        tiled = await analysis_executor.run_in_thread(self._open_tiled, image, max_side)
+        if tiled is not None:
+            stats, dominant_colors = await self._analyze_tiles(tiled, n_colors, strategy, timings)
+            resolution = [tiled.width, tiled.height]
+        else:
+            # Color statistics are stable well below camera resolution
+            with timed(timings, "color_decode"):
+                image = await decode_async(image, max_side)
+            
+            # Color statistics (one pass over the pixels) and dominant colors (K-means)
+            # are independent, so run them concurrently off the event loop
+            stats, dominant_colors = await asyncio.gather(
+                self._compute_color_stats_async(image, timings),
+                self._extract_dominant_colors(image, n_colors, strategy, timings),
+            )
+            resolution = [image.width, image.height]
         
-        # Color temperature
-        color_temperature = self.calculate_color_temperature(image)
+        # Basic statistics and color temperature come from the histograms
+        brightness, contrast, saturation = self._basic_stats(stats)
+        color_temperature = self._color_temperature(stats)
         
         # Color harmony
-        color_harmony_score = self.calculate_color_harmony(dominant_colors)
+        harmony = self.calculate_palette_harmony(dominant_colors)
         
         return ColorAnalysisResult(
             dominant_colors=dominant_colors,
             color_temperature=color_temperature,
-            color_harmony_score=color_harmony_score,
+            color_harmony_score=harmony["hue_harmony"],
+            delta_e_harmony_score=harmony["delta_e_harmony"],
             brightness=float(brightness),
             contrast=float(contrast),
-            saturation=saturation
+            saturation=saturation,
+            analysis_resolution=resolution
         )
     
-    async def extract_dominant_colors_async(self, image_path: str, n_colors: int) -> List[ColorInfo]:
+    async def extract_dominant_colors_async(
+        self,
+        image: Union[str, DecodedImage],
+        n_colors: int,
+        strategy: Optional[str] = None,
+        quality: Optional[str] = None,
+        max_side: Optional[int] = None
+    ) -> List[ColorInfo]:
         """Async wrapper for dominant color extraction"""
-        image = Image.open(image_path).convert('RGB')
-        return self.extract_dominant_colors(image, n_colors)
+        strategy = resolve_strategy(strategy, quality)
+        max_side = self._analysis_max_side(max_side)
+        tiled = await analysis_executor.run_in_thread(self._open_tiled, image, max_side)
+        if tiled is not None:
+            return (await self._analyze_tiles(tiled, n_colors, strategy))[1]
+        image = await decode_async(image, max_side)
+        return await self._extract_dominant_colors(image, n_colors, strategy)
     
-    async def calculate_color_temperature_async(self, image_path: str) -> float:
+    async def calculate_color_temperature_async(
+        self,
+        image: Union[str, DecodedImage],
+        max_side: Optional[int] = None
+    ) -> float:
         """Async wrapper for color temperature calculation"""
-        image = Image.open(image_path).convert('RGB')
-        return self.calculate_color_temperature(image)
\ No newline at end of file
+        max_side = self._analysis_max_side(max_side)
+        tiled = await analysis_executor.run_in_thread(self._open_tiled, image, max_side)
+        if tiled is not None:
+            stats, _ = await analysis_executor.run_in_thread(self._scan_tiles, tiled)
+            return self._color_temperature(stats)
+        image = await decode_async(image, max_side)
+        return await analysis_executor.run_in_thread(self.calculate_color_temperature, image)
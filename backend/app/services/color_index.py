@@ -0,0 +1,412 @@
+"""Palette feature vectors and a nearest-neighbour index for color-similarity search.
+
+Every analyzed upload's dominant colors and their percentages become one
+fixed-length vector (``palette_vectors``): each color spreads its share over
+a grid of CIELAB bin centres with a Gaussian kernel, so two near-identical
+colors on either side of a bin edge still overlap, and the vector is the
+square root of the resulting color distribution. Vectors are unit length and
+the dot product of two of them is the Bhattacharyya coefficient of their
+distributions - 1 for the same palette, 0 for palettes sharing no colors.
+
+``PaletteIndex`` keeps the vectors in one contiguous float32 array (256
+bytes per image with the default 4x4x4 grid, 256 MB at 1M images) and
+answers top-k queries
+
+* exactly - one matrix-vector product over every vector and an
+  ``argpartition``, bound by reading the array once;
+* approximately - through an inverted file (IVF): the vectors are clustered
+  into about sqrt(N) lists with k-means and a query only scores the lists of
+  the ``nprobe`` centroids nearest to it (a few thousand vectors at 1M
+  images, instead of all of them).
+
+The IVF is built on a background thread once COLOR_INDEX_IVF_MIN_VECTORS
+images are indexed, and rebuilt when the images added since grow past a
+quarter of those it covers; images added in between are scored exhaustively
+next to the probed lists, so they are found as soon as they are indexed.
+Vectors are persisted in SEARCH_DB_PATH and reloaded at startup.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+from app.core.config import settings
+from app.models.schemas import ColorAnalysisResult
+from app.services.palette_analytics import pack_palettes, to_lab
+
+logger = logging.getLogger(__name__)
+
+# CIELAB bins per axis (L, a, b); vectors have their product of dimensions
+PALETTE_BINS = (4, 4, 4)
+# Width (in CIELAB units) of the kernel spreading a color over neighbouring bins
+PALETTE_SIGMA = 20.0
+# Range of the a and b bin centres; saturated colors fall outside and use the outermost bins
+AB_RANGE = 60.0
+
+# k-means is trained on at most this many vectors per IVF list
+IVF_TRAIN_POINTS_PER_LIST = 64
+# Vectors assigned to their IVF list per matrix product when building
+IVF_ASSIGN_CHUNK = 8192
+RANDOM_STATE = 42
+
+LOAD_CHUNK = 65536
+
+
+def _bin_centres() -> np.ndarray:
+    l_bins, a_bins, b_bins = PALETTE_BINS
+    lightness = (np.arange(l_bins) + 0.5) * 100.0 / l_bins
+    a = np.linspace(-AB_RANGE, AB_RANGE, a_bins)
+    b = np.linspace(-AB_RANGE, AB_RANGE, b_bins)
+    grid = np.stack(np.meshgrid(lightness, a, b, indexing="ij"), axis=-1)
+    return grid.reshape(-1, 3).astype(np.float32)
+
+
+_BIN_CENTRES = _bin_centres()
+VECTOR_DIM = len(_BIN_CENTRES)
+
+
+def palette_vectors(colors: np.ndarray, weights: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """(P, K, 3) RGB palettes with (P, K) percentages -> (P, VECTOR_DIM) unit float32 vectors
+
+    Takes the output of ``pack_palettes``. A palette without colors maps to
+    the zero vector, which matches nothing.
+    """
+    lab = to_lab(colors)
+    sq_distances = ((lab[..., None, :] - _BIN_CENTRES) ** 2).sum(axis=-1)  # (P, K, D)
+    # Relative to each color's nearest bin, so the kernel never underflows to all zeros
+    sq_distances -= sq_distances.min(axis=-1, keepdims=True)
+    kernel = np.exp(-sq_distances / (2 * PALETTE_SIGMA ** 2))
+    kernel /= kernel.sum(axis=-1, keepdims=True)
+
+    weights = np.where(mask, weights, 0.0)
+    totals = weights.sum(axis=-1, keepdims=True)
+    weights = weights / np.where(totals > 0, totals, 1.0)
+
+    distribution = np.einsum("pk,pkd->pd", weights, kernel)
+    return np.sqrt(distribution).astype(np.float32)
+
+
+def palette_vector(rgb: Sequence[Sequence[int]], percentages: Sequence[float]) -> np.ndarray:
+    """Feature vector of one palette"""
+    colors, weights, mask = pack_palettes([rgb], [percentages], max_colors=max(len(rgb), 1))
+    return palette_vectors(colors, weights, mask)[0]
+
+
+def analysis_vector(analysis: ColorAnalysisResult) -> np.ndarray:
+    """Feature vector of a color analysis' dominant colors"""
+    return palette_vector(
+        [color.rgb for color in analysis.dominant_colors],
+        [color.percentage for color in analysis.dominant_colors]
+    )
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, highest first"""
+    if k < len(scores):
+        top = np.argpartition(-scores, k)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class _InvertedFile(NamedTuple):
+    centroids: np.ndarray     # (lists, D)
+    centroid_sq: np.ndarray   # (lists,) squared norms
+    offsets: np.ndarray       # (lists + 1,) list i is rows[offsets[i]:offsets[i + 1]]
+    rows: np.ndarray          # Row numbers grouped by list
+    size: int                 # Rows below this were assigned to lists
+    built_at: float
+    build_seconds: float
+
+    def nearest_lists(self, vectors: np.ndarray, count: int = 1) -> np.ndarray:
+        """(N, count) lists whose centroids are nearest to (N, D) vectors"""
+        distances = self.centroid_sq - 2 * vectors @ self.centroids.T
+        if count >= len(self.centroids):
+            return np.broadcast_to(np.arange(len(self.centroids)), (len(vectors), len(self.centroids)))
+        if count == 1:
+            return distances.argmin(axis=1)[:, None]
+        return np.argpartition(distances, count - 1, axis=1)[:, :count]
+
+    def candidates(self, query: np.ndarray, nprobe: int, size: int) -> np.ndarray:
+        """Rows in the nprobe lists nearest to the query, plus rows added since the build"""
+        lists = self.nearest_lists(query[None], nprobe)[0]
+        parts = [self.rows[self.offsets[index]:self.offsets[index + 1]] for index in lists.tolist()]
+        parts.append(np.arange(self.size, size))
+        return np.concatenate(parts)
+
+
+class PaletteIndex:
+    def __init__(self, db_path: str, ivf_min_vectors: int, nprobe: int):
+        """Palette vectors of analyzed uploads, persisted, with exact and IVF top-k search"""
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS palette_vectors (id TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+        self.ivf_min_vectors = ivf_min_vectors
+        self.nprobe = nprobe
+
+        # Rows are append-only: removing or changing an image's vector
+        # tombstones its row, and rebuilding the IVF compacts them away
+        self._vectors = np.zeros((0, VECTOR_DIM), np.float32)
+        self._alive = np.zeros(0, bool)
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        self._dead = 0
+        self._ivf: Optional[_InvertedFile] = None
+        self._building = False
+
+        self._load()
+
+    def _load(self):
+        expected = VECTOR_DIM * np.dtype(np.float32).itemsize
+        skipped = 0
+        cursor = self._conn.execute("SELECT id, vector FROM palette_vectors")
+        while True:
+            batch = cursor.fetchmany(LOAD_CHUNK)
+            if not batch:
+                break
+            # Vectors of another PALETTE_BINS grid are re-added when their images are analyzed again
+            rows = [(image_id, vector) for image_id, vector in batch if len(vector) == expected]
+            skipped += len(batch) - len(rows)
+            if rows:
+                vectors = np.frombuffer(b"".join(vector for _, vector in rows), np.float32)
+                self._append([image_id for image_id, _ in rows], vectors.reshape(-1, VECTOR_DIM))
+        if skipped:
+            logger.warning("Color index: skipped %d stored vectors of another dimension", skipped)
+        if self._size:
+            logger.info("Color index: loaded %d palette vectors", self._size)
+
+    def _append(self, image_ids: List[str], vectors: np.ndarray):
+        needed = self._size + len(image_ids)
+        if needed > len(self._vectors):
+            # Searches in flight keep the arrays they started with
+            capacity = max(needed, 2 * len(self._vectors), 1024)
+            grown = np.zeros((capacity, VECTOR_DIM), np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            alive = np.zeros(capacity, bool)
+            alive[:self._size] = self._alive[:self._size]
+            self._vectors, self._alive = grown, alive
+        self._vectors[self._size:needed] = vectors
+        self._alive[self._size:needed] = True
+        for row, image_id in enumerate(image_ids, self._size):
+            self._rows[image_id] = row
+        self._ids.extend(image_ids)
+        self._size = needed
+
+    def _tombstone(self, image_id: str) -> bool:
+        row = self._rows.pop(image_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        self._ids[row] = None
+        self._dead += 1
+        return True
+
+    def _needs_build(self) -> bool:
+        live = self._size - self._dead
+        if live < max(self.ivf_min_vectors, 1):
+            return False
+        if self._ivf is None:
+            return True
+        return self._size - self._ivf.size > self._ivf.size // 4 or self._dead > live // 4
+
+    def add(self, image_id: str, vector: np.ndarray):
+        self.add_many([image_id], np.asarray(vector, np.float32).reshape(1, VECTOR_DIM))
+
+    def add_many(self, image_ids: Sequence[str], vectors: np.ndarray):
+        """Index (N, VECTOR_DIM) vectors in one transaction; unchanged vectors are skipped"""
+        vectors = np.asarray(vectors, np.float32).reshape(len(image_ids), VECTOR_DIM)
+        with self._lock:
+            changed = {}
+            for image_id, vector in zip(image_ids, vectors):
+                row = self._rows.get(image_id)
+                if row is None or not np.array_equal(self._vectors[row], vector):
+                    changed[image_id] = vector
+            if not changed:
+                return
+            for image_id in changed:
+                self._tombstone(image_id)
+            self._append(list(changed), np.stack(list(changed.values())))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO palette_vectors (id, vector) VALUES (?, ?)",
+                [(image_id, vector.tobytes()) for image_id, vector in changed.items()]
+            )
+            self._conn.commit()
+            build = not self._building and self._needs_build()
+            if build:
+                self._building = True
+        if build:
+            threading.Thread(target=self._build_in_background, name="palette-ivf", daemon=True).start()
+
+    def get(self, image_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(image_id)
+            return None if row is None else self._vectors[row].copy()
+
+    def remove(self, image_id: str) -> bool:
+        with self._lock:
+            if not self._tombstone(image_id):
+                return False
+            self._conn.execute("DELETE FROM palette_vectors WHERE id = ?", (image_id,))
+            self._conn.commit()
+        return True
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        mode: str = "auto",
+        nprobe: Optional[int] = None,
+        exclude: Optional[Set[str]] = None
+    ) -> Tuple[str, List[Tuple[str, float]]]:
+        """(mode used, [(image id, similarity)]) of the k most similar palettes
+
+        ``mode`` is ``exact``, ``approximate`` (IVF; exact until one has been
+        built) or ``auto`` (approximate when an IVF exists).
+        """
+        query = np.asarray(query, np.float32).reshape(VECTOR_DIM)
+        with self._lock:
+            vectors, alive, ids, size, ivf = self._vectors, self._alive, self._ids, self._size, self._ivf
+
+        if mode != "exact" and ivf is not None:
+            mode = "approximate"
+            rows = ivf.candidates(query, max(1, nprobe or self.nprobe), size)
+            scores = vectors[rows] @ query
+            scores[~alive[rows]] = -np.inf
+        else:
+            mode = "exact"
+            rows = None
+            scores = vectors[:size] @ query
+            scores[~alive[:size]] = -np.inf
+
+        top = _top_k(scores, k + len(exclude or ()))
+        matches = []
+        for index, score in zip(top.tolist(), scores[top].tolist()):
+            if score == -np.inf:
+                break
+            image_id = ids[index if rows is None else int(rows[index])]
+            if image_id is None or (exclude and image_id in exclude):
+                continue
+            matches.append((image_id, score))
+            if len(matches) == k:
+                break
+        return mode, matches
+
+    def rebuild(self, force: bool = True) -> bool:
+        """Compact the vectors and rebuild the IVF (only when due, unless force)
+
+        Returns False when a build is already running or none was due.
+        """
+        with self._lock:
+            if self._building or not (force or self._needs_build()):
+                return False
+            self._building = True
+        self._build()
+        return True
+
+    def _build_in_background(self):
+        try:
+            self._build()
+        except Exception:
+            logger.exception("Color index: IVF build failed")
+
+    def _build(self):
+        try:
+            start = time.perf_counter()
+            with self._lock:
+                if self._dead:
+                    self._compact()
+                # Rows below size are never written again until the next compaction
+                vectors, size = self._vectors[:self._size], self._size
+
+            ivf = None
+            if size:
+                rng = np.random.default_rng(RANDOM_STATE)
+                n_lists = max(1, int(np.sqrt(size)))
+                train = vectors
+                if size > n_lists * IVF_TRAIN_POINTS_PER_LIST:
+                    train = vectors[np.sort(rng.choice(size, n_lists * IVF_TRAIN_POINTS_PER_LIST, replace=False))]
+                model = MiniBatchKMeans(
+                    n_clusters=n_lists,
+                    random_state=RANDOM_STATE,
+                    n_init=1,
+                    batch_size=4096,
+                    init_size=min(len(train), max(3 * n_lists, 3 * 4096)),
+                    max_no_improvement=20,
+                )
+                model.fit(train)
+                centroids = model.cluster_centers_.astype(np.float32)
+                ivf = _InvertedFile(centroids, (centroids ** 2).sum(axis=1), None, None, size, 0.0, 0.0)
+
+                labels = np.empty(size, np.int64)
+                for offset in range(0, size, IVF_ASSIGN_CHUNK):
+                    labels[offset:offset + IVF_ASSIGN_CHUNK] = ivf.nearest_lists(
+                        vectors[offset:offset + IVF_ASSIGN_CHUNK]
+                    )[:, 0]
+                order = np.argsort(labels, kind="stable")
+                offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+                ivf = ivf._replace(
+                    offsets=offsets,
+                    rows=order,
+                    built_at=time.time(),
+                    build_seconds=time.perf_counter() - start
+                )
+                logger.info(
+                    "Color index: built IVF with %d lists over %d vectors in %.1fs",
+                    n_lists, size, ivf.build_seconds
+                )
+
+            with self._lock:
+                self._ivf = ivf
+        finally:
+            with self._lock:
+                self._building = False
+
+    def _compact(self):
+        """Drop tombstoned rows (lock held). Invalidates the IVF, whose rows move."""
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._vectors = self._vectors[keep]
+        self._alive = np.ones(len(keep), bool)
+        self._ids = [self._ids[row] for row in keep.tolist()]
+        self._rows = {image_id: row for row, image_id in enumerate(self._ids)}
+        self._size = len(keep)
+        self._dead = 0
+        self._ivf = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            ivf = self._ivf
+            stats = {
+                "images": self._size - self._dead,
+                "dimensions": VECTOR_DIM,
+                "rows": self._size,
+                "tombstoned_rows": self._dead,
+                "vector_bytes": self._vectors.nbytes,
+                "building": self._building,
+                "ivf_min_vectors": self.ivf_min_vectors,
+                "nprobe": self.nprobe,
+            }
+        stats["ivf"] = None if ivf is None else {
+            "lists": len(ivf.centroids),
+            "indexed_rows": ivf.size,
+            "unindexed_rows": stats["rows"] - ivf.size,
+            "built_at": ivf.built_at,
+            "build_seconds": ivf.build_seconds,
+        }
+        return stats
+
+
+# Process-wide index of analyzed uploads' palettes
+palette_index = PaletteIndex(settings.SEARCH_DB_PATH, settings.COLOR_INDEX_IVF_MIN_VECTORS, settings.COLOR_INDEX_NPROBE)
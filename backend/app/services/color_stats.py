@@ -0,0 +1,80 @@
+"""Single-pass color statistics.
+
+Brightness, contrast, saturation and color temperature used to walk the
+full pixel buffer separately: three per-channel histograms, a full-frame
+HSV conversion (one more image-sized buffer) and three channel means, eight
+passes over an image-sized array in all. ``ColorStatsAccumulator`` reads the
+image once, a slab of rows at a time small enough to stay in cache, and
+keeps only per-channel and saturation histograms. Every statistic is
+derived from those histograms, so it is exact (integer counts), and the
+accumulator can be fed tiles from any source - not only a decoded buffer.
+
+``benchmarks/bench_color_stats.py`` compares it with the separate passes.
+"""
+
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+# Pixels per tile: 64K RGB pixels (192 KB) plus its HSV copy fit in L2
+TILE_PIXELS = 64 * 1024
+
+_LEVELS = np.arange(256, dtype=np.float64)
+
+
+class ColorStats(NamedTuple):
+    histograms: np.ndarray  # (3, 256) pixel counts per RGB channel
+    saturation_histogram: np.ndarray  # (256,) pixel counts per HSV saturation level
+    pixels: int
+
+    @property
+    def channel_means(self) -> np.ndarray:
+        return (self.histograms @ _LEVELS) / max(self.pixels, 1)
+
+    @property
+    def channel_stddevs(self) -> np.ndarray:
+        means = self.channel_means
+        variance = (self.histograms @ (_LEVELS * _LEVELS)) / max(self.pixels, 1) - means ** 2
+        return np.sqrt(np.maximum(variance, 0.0))
+
+    @property
+    def saturation(self) -> float:
+        """Mean HSV saturation, 0-1"""
+        return float(self.saturation_histogram @ _LEVELS) / max(self.pixels, 1) / 255.0
+
+
+class ColorStatsAccumulator:
+    """Histograms of RGB channels and HSV saturation, updated block by block (e.g. bands of a TiledImage)"""
+
+    def __init__(self):
+        self.histograms = np.zeros((3, 256), np.int64)
+        self.saturation_histogram = np.zeros(256, np.int64)
+        self.pixels = 0
+
+    def update(self, rgb: np.ndarray, tile_pixels: int = TILE_PIXELS):
+        """Add an (H, W, 3) or (N, 3) uint8 RGB block, read in cache-sized slabs of rows"""
+        if rgb.ndim == 2:
+            rgb = rgb.reshape(-1, 1, 3)
+        rows = max(1, tile_pixels // max(rgb.shape[1], 1))
+        for y in range(0, rgb.shape[0], rows):
+            self._update_tile(rgb[y:y + rows])
+
+    def _update_tile(self, tile: np.ndarray):
+        if tile.size == 0:
+            return
+        for channel in range(3):
+            self.histograms[channel] += cv2.calcHist([tile], [channel], None, [256], [0, 256]).ravel().astype(np.int64)
+        hsv = cv2.cvtColor(tile, cv2.COLOR_RGB2HSV)
+        self.saturation_histogram += cv2.calcHist([hsv], [1], None, [256], [0, 256]).ravel().astype(np.int64)
+        self.pixels += tile.shape[0] * tile.shape[1]
+
+    def result(self) -> ColorStats:
+        return ColorStats(self.histograms.copy(), self.saturation_histogram.copy(), self.pixels)
+
+
+def color_stats(rgb: np.ndarray, tile_pixels: int = TILE_PIXELS) -> ColorStats:
+    """Statistics of an (H, W, 3) uint8 RGB buffer, read once in row slabs"""
+    accumulator = ColorStatsAccumulator()
+    accumulator.update(rgb, tile_pixels)
+    return accumulator.result()
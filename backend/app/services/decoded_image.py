@@ -0,0 +1,187 @@
+import os
+from functools import cached_property
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.core.executor import analysis_executor
+from app.services.color_stats import ColorStats, color_stats
+
+_VIEW_CACHE = ("hsv", "bgr", "gray", "_scaled")
+
+
+def fit_size(size: Tuple[int, int], max_side: Optional[int]) -> Tuple[int, int]:
+    """(width, height) scaled so the longest side is at most max_side"""
+    width, height = size
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    scale = max_side / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class DecodedImage:
+    """An image decoded once per request and shared by every analyzer
+
+    ``rgb`` is a single contiguous, read-only uint8 (H, W, 3) array. Derived
+    color-space views are computed on first access and cached.
+
+    The buffer may be smaller than the file (see ``max_side``);
+    ``original_size`` always holds the file's own dimensions.
+    """
+
+    def __init__(
+        self,
+        rgb: np.ndarray,
+        path: Optional[str] = None,
+        format: Optional[str] = None,
+        file_size: int = 0,
+        channels: int = 3,
+        original_size: Optional[Tuple[int, int]] = None,
+    ):
+        # Freeze a view so the caller's own array stays writable
+        rgb = np.ascontiguousarray(rgb, dtype=np.uint8).view()
+        rgb.setflags(write=False)
+        self.rgb = rgb
+        self.path = path
+        self.format = format
+        self.file_size = file_size
+        self.channels = channels  # Bands of the source file, before RGB conversion
+        self.original_size = original_size or (self.width, self.height)
+
+    @classmethod
+    def from_path(cls, image_path: str, max_side: Optional[int] = None) -> "DecodedImage":
+        """Decode an image file into RGB pixels, optionally no larger than max_side"""
+        from app.services.tiled_image import TiledImage
+
+        # Raw BMP/TIFF rows are read from a memory map: no full-size PIL copy
+        tiled = TiledImage.open(image_path)
+        if tiled is not None:
+            return cls(
+                tiled.read(max_side),
+                path=image_path,
+                format=tiled.format,
+                file_size=os.path.getsize(image_path),
+                channels=tiled.channels,
+                original_size=(tiled.width, tiled.height),
+            )
+
+        try:
+            with Image.open(image_path) as img:
+                format = img.format
+                channels = len(img.getbands())
+                original_size = img.size
+                target = fit_size(img.size, max_side)
+                if target != img.size:
+                    # JPEG decodes straight to 1/2, 1/4 or 1/8 scale in the DCT
+                    # domain (no-op for other formats); area-average the rest
+                    img.draft('RGB', target)
+                    img = img.convert('RGB')
+                    if img.size != target:
+                        img = img.resize(target, Image.Resampling.BOX)
+                rgb = np.asarray(img.convert('RGB'))
+        except Exception as e:
+            raise Exception(f"Cannot open image {image_path}: {e}")
+
+        return cls(
+            rgb,
+            path=image_path,
+            format=format,
+            file_size=os.path.getsize(image_path),
+            channels=channels,
+            original_size=original_size,
+        )
+
+    @classmethod
+    def from_pil(cls, image: Image.Image) -> "DecodedImage":
+        return cls(
+            np.asarray(image.convert('RGB')),
+            format=image.format,
+            channels=len(image.getbands()),
+        )
+
+    @classmethod
+    def ensure(
+        cls,
+        image: Union["DecodedImage", Image.Image, np.ndarray, str],
+        max_side: Optional[int] = None,
+    ) -> "DecodedImage":
+        """Accept a path, PIL image, RGB array or DecodedImage, optionally downscaled"""
+        if isinstance(image, DecodedImage):
+            return image.downscaled(max_side)
+        if isinstance(image, Image.Image):
+            return cls.from_pil(image).downscaled(max_side)
+        if isinstance(image, np.ndarray):
+            return cls(image).downscaled(max_side)
+        return cls.from_path(str(image), max_side)
+
+    @property
+    def width(self) -> int:
+        return self.rgb.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.rgb.shape[0]
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """(N, 3) view of the RGB buffer, without copying"""
+        return self.rgb.reshape(-1, 3)
+
+    def needs_downscale(self, max_side: Optional[int]) -> bool:
+        return fit_size((self.width, self.height), max_side) != (self.width, self.height)
+
+    def downscaled(self, max_side: Optional[int]) -> "DecodedImage":
+        """Area-resampled copy no larger than max_side (self if already small enough)"""
+        if not self.needs_downscale(max_side):
+            return self
+        scaled = self.__dict__.setdefault("_scaled", {})
+        if max_side not in scaled:
+            rgb = cv2.resize(self.rgb, fit_size((self.width, self.height), max_side), interpolation=cv2.INTER_AREA)
+            scaled[max_side] = DecodedImage(
+                rgb,
+                path=self.path,
+                format=self.format,
+                file_size=self.file_size,
+                channels=self.channels,
+                original_size=self.original_size,
+            )
+        return scaled[max_side]
+
+    @cached_property
+    def hsv(self) -> np.ndarray:
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2HSV)
+
+    @cached_property
+    def bgr(self) -> np.ndarray:
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2BGR)
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+
+    @cached_property
+    def color_stats(self) -> ColorStats:
+        return color_stats(self.rgb)
+
+    def __getstate__(self):
+        # Derived views are cheap to rebuild; don't ship them to worker processes
+        state = self.__dict__.copy()
+        for name in _VIEW_CACHE:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.rgb.setflags(write=False)
+
+
+async def decode_async(
+    image: Union[DecodedImage, Image.Image, np.ndarray, str],
+    max_side: Optional[int] = None,
+) -> DecodedImage:
+    """Decode (and downscale) on the executor's thread pool unless there is nothing to do"""
+    if isinstance(image, DecodedImage) and not image.needs_downscale(max_side):
+        return image
+    return await analysis_executor.run_in_thread(DecodedImage.ensure, image, max_side)
@@ -0,0 +1,235 @@
+"""Dominant color extraction backends.
+
+Extraction is split into two steps so the expensive part can be shipped to
+a worker process cheaply:
+
+* ``reduce_pixels`` turns the full (H, W, 3) buffer into a small weighted
+  point set (a pixel sample or a color histogram). It is plain NumPy and
+  runs on a thread.
+* ``cluster_colors`` clusters that point set into ``n_colors`` centers and
+  their pixel percentages.
+
+Strategies and their accuracy against the ``exact`` path (full-image
+``KMeans(n_init=10)``), measured with ``benchmarks/bench_dominant_colors.py``
+on six synthetic photos at 640x480 and 1600x1200. deltaE is the
+percentage-weighted CIE76 distance between each exact palette color and its
+closest match; time is per image at 1600x1200 (exact: ~5.7s).
+
+============  ========================================  ========  =========  ========
+strategy      method                                    mean dE   worst dE   time
+============  ========================================  ========  =========  ========
+exact         KMeans on every pixel                     0         0          1x
+subsample     KMeans on 100k random pixels              0.3       0.7        ~25x
+stratified    KMeans on a jittered pixel grid           0.3       0.7        ~35x
+minibatch     MiniBatchKMeans on 100k random pixels     2.8       10         ~35x
+histogram     weighted KMeans on 32^3 histogram bins    0.2       0.6        ~115x
+median_cut    median cut on 32^3 bins + Lloyd steps     5.2       14         ~185x
+============  ========================================  ========  =========  ========
+
+A deltaE below ~2.3 is generally not noticeable side by side. ``histogram``
+is the default; ``minibatch`` and ``median_cut`` trade accuracy for speed
+and can land in a different local optimum on some images.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+STRATEGIES = ("exact", "subsample", "stratified", "minibatch", "histogram", "median_cut")
+
+# Strategies that cluster a ColorHistogram, which can be built tile by tile
+HISTOGRAM_STRATEGIES = ("histogram", "median_cut")
+
+# Quality/speed knob exposed on the API, mapped to a strategy
+QUALITY_PRESETS = {
+    "exact": "exact",
+    "high": "subsample",
+    "balanced": "histogram",
+    "fast": "median_cut",
+}
+
+RANDOM_STATE = 42
+
+# Pixels converted to wider dtypes at a time, to bound temporaries
+_CHUNK_PIXELS = 1 << 20
+
+
+def resolve_strategy(strategy: Optional[str] = None, quality: Optional[str] = None) -> str:
+    """Pick a strategy from an explicit name, a quality preset, or the configured default"""
+    from app.core.config import settings
+
+    if strategy is None and quality is not None:
+        if quality not in QUALITY_PRESETS:
+            raise ValueError(f"Unknown quality {quality!r}, expected one of {list(QUALITY_PRESETS)}")
+        strategy = QUALITY_PRESETS[quality]
+    strategy = strategy or settings.DOMINANT_COLOR_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown dominant color strategy {strategy!r}, expected one of {list(STRATEGIES)}")
+    return strategy
+
+
+class ColorHistogram:
+    """Incremental 3D color histogram with per-bin color sums
+
+    Bins are ``2**bits`` per channel. Keeping the per-bin sums means each bin
+    is represented by the mean color of its pixels instead of the bin center.
+    Histograms can be updated chunk by chunk (or tile by tile).
+    """
+
+    def __init__(self, bits: int = 5):
+        self.bits = bits
+        self.n_bins = 1 << (3 * bits)
+        self.counts = np.zeros(self.n_bins, dtype=np.int64)
+        self.sums = np.zeros((self.n_bins, 3), dtype=np.float64)
+
+    def update(self, pixels: np.ndarray):
+        """Add an (N, 3) uint8 block of RGB pixels"""
+        shift = 8 - self.bits
+        for start in range(0, len(pixels), _CHUNK_PIXELS):
+            chunk = pixels[start:start + _CHUNK_PIXELS]
+            q = (chunk >> shift).astype(np.int32)
+            idx = (q[:, 0] << (2 * self.bits)) | (q[:, 1] << self.bits) | q[:, 2]
+            self.counts += np.bincount(idx, minlength=self.n_bins)
+            for channel in range(3):
+                self.sums[:, channel] += np.bincount(idx, weights=chunk[:, channel], minlength=self.n_bins)
+
+    def points_and_weights(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean color and pixel count of every non-empty bin"""
+        occupied = np.nonzero(self.counts)[0]
+        counts = self.counts[occupied]
+        points = self.sums[occupied] / counts[:, None]
+        return points.astype(np.float32), counts.astype(np.float64)
+
+
+def _random_sample(pixels: np.ndarray, n_samples: int, rng: np.random.Generator) -> np.ndarray:
+    if len(pixels) <= n_samples:
+        return pixels
+    # Sampling with replacement avoids permuting millions of indices
+    return pixels[rng.integers(0, len(pixels), n_samples)]
+
+
+def _stratified_sample(rgb: np.ndarray, n_samples: int, rng: np.random.Generator) -> np.ndarray:
+    height, width = rgb.shape[:2]
+    if height * width <= n_samples:
+        return rgb.reshape(-1, 3)
+    # One pixel per grid cell, jittered within the cell, so every region of
+    # the image contributes in proportion to its area
+    step = int(np.ceil(np.sqrt(height * width / n_samples)))
+    ys = np.arange(0, height, step)
+    xs = np.arange(0, width, step)
+    ys = np.minimum(ys + rng.integers(0, step, len(ys)), height - 1)
+    xs = np.minimum(xs + rng.integers(0, step, len(xs)), width - 1)
+    return rgb[np.ix_(ys, xs)].reshape(-1, 3)
+
+
+def reduce_pixels(
+    rgb: np.ndarray,
+    strategy: str,
+    max_samples: int = 100_000,
+    histogram_bits: int = 5,
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Reduce an (H, W, 3) uint8 image to the weighted point set a strategy clusters"""
+    rng = np.random.default_rng(RANDOM_STATE)
+    pixels = rgb.reshape(-1, 3)
+
+    if strategy == "exact":
+        return pixels, None
+    if strategy in ("subsample", "minibatch"):
+        return _random_sample(pixels, max_samples, rng), None
+    if strategy == "stratified":
+        return _stratified_sample(rgb, max_samples, rng), None
+    if strategy in HISTOGRAM_STRATEGIES:
+        histogram = ColorHistogram(histogram_bits)
+        histogram.update(pixels)
+        return histogram.points_and_weights()
+    raise ValueError(f"Unknown dominant color strategy {strategy!r}")
+
+
+def _median_cut(
+    points: np.ndarray,
+    weights: np.ndarray,
+    n_colors: int,
+    refine_steps: int = 5,
+) -> Tuple[np.ndarray, np.ndarray]:
+    boxes = [np.arange(len(points))]
+    while len(boxes) < n_colors:
+        # Split the box whose widest channel range, weighted by its pixel
+        # count, is largest
+        best, best_score, best_channel = -1, 0.0, 0
+        for i, box in enumerate(boxes):
+            if len(box) < 2:
+                continue
+            ranges = np.ptp(points[box], axis=0)
+            channel = int(np.argmax(ranges))
+            score = ranges[channel] * weights[box].sum()
+            if score > best_score:
+                best, best_score, best_channel = i, score, channel
+        if best < 0:
+            break
+
+        box = boxes.pop(best)
+        order = box[np.argsort(points[box, best_channel], kind="stable")]
+        cumulative = np.cumsum(weights[order])
+        split = int(np.searchsorted(cumulative, cumulative[-1] / 2))
+        split = min(max(split, 1), len(order) - 1)
+        boxes.extend([order[:split], order[split:]])
+
+    centers = np.array([np.average(points[box], axis=0, weights=weights[box]) for box in boxes])
+
+    # A few weighted Lloyd steps pull the box means onto the clusters k-means
+    # would find, at a fraction of the cost of a full k-means run
+    for _ in range(refine_steps):
+        distances = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        totals = np.bincount(labels, weights=weights, minlength=len(centers))
+        for channel in range(3):
+            sums = np.bincount(labels, weights=weights * points[:, channel], minlength=len(centers))
+            centers[:, channel] = np.where(totals > 0, sums / np.maximum(totals, 1e-12), centers[:, channel])
+
+    distances = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    totals = np.bincount(distances.argmin(axis=1), weights=weights, minlength=len(centers))
+    return centers, totals / totals.sum() * 100
+
+
+def cluster_colors(
+    points: np.ndarray,
+    weights: Optional[np.ndarray],
+    n_colors: int,
+    strategy: str,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Cluster a (weighted) point set into colors and percentages (0-100)"""
+    n_clusters = min(n_colors, len(points))
+
+    if strategy == "median_cut":
+        if weights is None:
+            weights = np.ones(len(points))
+        return _median_cut(points.astype(np.float64), weights, n_clusters)
+
+    if strategy == "minibatch":
+        model = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            random_state=RANDOM_STATE,
+            n_init=5,
+            batch_size=2048,
+            init_size=min(len(points), 30_000),
+            max_no_improvement=30,
+        )
+    else:
+        model = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=10)
+    model.fit(points, sample_weight=weights)
+
+    totals = np.bincount(model.labels_, weights=weights, minlength=n_clusters)
+    return model.cluster_centers_, totals / totals.sum() * 100
+
+
+def extract_palette(
+    rgb: np.ndarray,
+    n_colors: int,
+    strategy: str = "exact",
+    max_samples: int = 100_000,
+    histogram_bits: int = 5,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce and cluster in one call"""
+    points, weights = reduce_pixels(rgb, strategy, max_samples, histogram_bits)
+    return cluster_colors(points, weights, n_colors, strategy)
@@ -1,31 +1,437 @@
-from app.models.schemas import ImageStats, ColorAnalysisResult, TextDetectionResult
+from app.core.config import settings
+from app.core.executor import analysis_executor
+from app.core.metrics import image_analysis_seconds, size_class
+from app.core.timing import timed
+from app.models.schemas import AnalysisRequest, AnalysisResult, BatchAnalysisItem, ImageStats, ColorAnalysisResult, TextDetectionResult
 from app.services.color_analyzer import ColorAnalyzer
+from app.services.color_index import analysis_vector, palette_index
+from app.services.decoded_image import DecodedImage, decode_async
+from app.services.image_catalog import image_catalog, image_stats
+from app.services.perceptual_hash import hash_image_file, near_duplicate_index
+from app.services.result_cache import result_cache
 from app.services.text_detector import TextDetector
-from typing import List
+from app.services.text_index import text_index
+from app.services.tiled_image import TiledImage
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import asyncio
+import logging
 import os
+import sqlite3
+import time
 from PIL import Image
 
+logger = logging.getLogger(__name__)
+
+# Cached results of at most this many near-duplicates are looked up per analysis
+NEAR_DUPLICATE_CANDIDATES = 8
+
+# Called with (stage, state) as an analysis moves through decode, color and text
+ProgressCallback = Callable[[str, str], Awaitable[None]]
+
+async def _report(progress: Optional[ProgressCallback], stage: str, state: str):
+    if progress is not None:
+        await progress(stage, state)
+
+def near_duplicate_distance(request: AnalysisRequest) -> Optional[int]:
+    """Hash distance to reuse near-duplicate results within, None if the request didn't opt in"""
+    if not request.reuse_near_duplicates:
+        return None
+    return settings.NEAR_DUPLICATE_MAX_DISTANCE if request.max_hash_distance is None else request.max_hash_distance
+
 class ImageAnalyzer:
     def __init__(self):
         """Initialize image analyzer with color and text analysis services"""
         self.color_analyzer = ColorAnalyzer()
         self.text_detector = TextDetector()
-    
-    def get_image_stats(self, image_path: str) -> ImageStats:
+
+    def get_image_stats(self, image: Union[str, DecodedImage]) -> ImageStats:
         """Get basic image statistics"""
-        with Image.open(image_path) as img:
+        if isinstance(image, DecodedImage):
+            # Already decoded for this request: no need to reopen the file
+            width, height = image.original_size
+            return ImageStats(
+                width=width,
+                height=height,
+                channels=image.channels,
+                file_size=image.file_size,
+                format=image.format
+            )
+
+        with Image.open(image) as img:
             return ImageStats(
                 width=img.width,
                 height=img.height,
                 channels=len(img.getbands()),
-                file_size=os.path.getsize(image_path),
+                file_size=os.path.getsize(image),
                 format=img.format
             )
-    
-    async def analyze_colors(self, image_path: str, n_colors: int = 5) -> ColorAnalysisResult:
+
+    async def analyze_colors(
+        self,
+        image: Union[str, DecodedImage],
+        n_colors: int = 5,
+        timings: Optional[Dict[str, float]] = None
+    ) -> ColorAnalysisResult:
         """Perform comprehensive color analysis"""
-        return await self.color_analyzer.analyze_comprehensive(image_path, n_colors)
-    
-    async def detect_text(self, image_path: str, business_type: str = "General") -> List[TextDetectionResult]:
+        return await self.color_analyzer.analyze_comprehensive(image, n_colors, timings=timings)
+
+    async def detect_text(
+        self,
+        image: Union[str, DecodedImage],
+        business_type: str = "General",
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[TextDetectionResult]:
         """Perform comprehensive text detection and OCR"""
-        return await self.text_detector.detect_text_comprehensive(image_path, business_type)
\ No newline at end of file
+        return await self.text_detector.detect_text_comprehensive(image, business_type, timings)
+
+    def _decode_max_side(self, analysis_types: Sequence[str]) -> Optional[int]:
+        """OCR needs native resolution; color-only analysis can decode straight to a small size"""
+        return None if "text" in analysis_types else settings.COLOR_ANALYSIS_MAX_SIDE
+
+    async def _decode(self, image_path: str, analysis_types: Sequence[str]) -> Union[str, DecodedImage]:
+        """Decode for the requested analyses
+
+        Color-only analysis of a raw BMP/TIFF too large for TILED_MEMORY_BUDGET
+        is left on disk; the color analyzer reads it in tiles.
+        """
+        max_side = self._decode_max_side(analysis_types)
+        if "text" not in analysis_types:
+            tiled = await analysis_executor.run_in_thread(TiledImage.open_over_budget, image_path, max_side)
+            if tiled is not None:
+                return image_path
+        return await decode_async(image_path, max_side)
+
+    def _image_info(self, image_id: str, image_path: str, business_type: Optional[str]) -> Dict[str, Any]:
+        """Per-upload fields of an AnalysisResult (never cached)"""
+        record = image_catalog.get(image_id)
+        if record is not None and record.path == image_path:
+            created = record.created
+        else:
+            created = os.stat(image_path).st_ctime
+        return dict(
+            id=image_id,
+            filename=os.path.basename(image_path),
+            business_type=business_type,
+            upload_time=datetime.fromtimestamp(created),
+            processing_time=0.0
+        )
+
+    def _catalog_stats(self, image_id: str, image_path: str) -> Optional[ImageStats]:
+        """Stats recorded at upload, so stats-only requests don't reopen the file"""
+        record = image_catalog.get(image_id)
+        if record is None or record.path != image_path or record.width is None or record.format is None:
+            return None
+        return image_stats(record)
+
+    async def _cache_key(self, image_path: str, business_type: Optional[str], analysis_types: Sequence[str]) -> str:
+        content_hash = await analysis_executor.run_in_thread(result_cache.content_hash, image_path)
+        return self._content_key(content_hash, business_type, analysis_types)
+
+    def _content_key(self, content_hash: str, business_type: Optional[str], analysis_types: Sequence[str]) -> str:
+        return result_cache.analysis_key(
+            content_hash,
+            n_colors=settings.DEFAULT_DOMINANT_COLORS,
+            business_type=business_type or "General",
+            analysis_types=list(analysis_types)
+        )
+
+    def _store(self, cache_key: str, result: AnalysisResult):
+        result_cache.set(cache_key, result.model_dump(
+            mode="json",
+            include={"image_stats", "color_analysis", "text_detection"}
+        ))
+
+    async def cached_analysis(
+        self,
+        image_id: str,
+        image_path: str,
+        business_type: Optional[str] = None,
+        analysis_types: Sequence[str] = ("color", "text")
+    ) -> Optional[AnalysisResult]:
+        """The cached full analysis of this image's content, without analyzing it if there is none"""
+        cached = result_cache.get(await self._cache_key(image_path, business_type, analysis_types))
+        if cached is None:
+            return None
+        return AnalysisResult(**self._image_info(image_id, image_path, business_type), **cached)
+
+    async def _near_duplicate_result(
+        self,
+        image_id: str,
+        image_path: str,
+        business_type: Optional[str],
+        analysis_types: Sequence[str],
+        max_distance: int
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[int]]:
+        """Cached analysis of the closest visually near-identical upload: (result, its id, distance)"""
+        hashes = near_duplicate_index.get(image_id)
+        if hashes is None:
+            # Uploaded before hashing, or not an upload at all
+            try:
+                hashes = await analysis_executor.run_in_thread(hash_image_file, image_path)
+            except (OSError, ValueError):
+                return None, None, None
+            if image_catalog.get(image_id) is not None:
+                near_duplicate_index.add(image_id, hashes)
+
+        matches = near_duplicate_index.find(hashes, max_distance, exclude={image_id})
+        for distance, other_id in matches[:NEAR_DUPLICATE_CANDIDATES]:
+            record = image_catalog.get(other_id)
+            if record is None:
+                continue
+            content_hash = record.content_hash
+            if content_hash is None:
+                try:
+                    content_hash = await analysis_executor.run_in_thread(result_cache.content_hash, record.path)
+                except OSError:
+                    continue
+            cached = result_cache.get(self._content_key(content_hash, business_type, analysis_types))
+            if cached is not None:
+                return cached, other_id, distance
+        return None, None, None
+
+    def _index_palette(self, image_id: str, color_analysis: Optional[ColorAnalysisResult]):
+        """Make an analyzed upload findable by color similarity (/api/search/color)"""
+        if color_analysis is None or not color_analysis.dominant_colors or image_catalog.get(image_id) is None:
+            return
+        try:
+            palette_index.add(image_id, analysis_vector(color_analysis))
+        except sqlite3.Error as e:
+            # The analysis itself succeeded; the image just isn't searchable yet
+            logger.warning("Cannot index palette of %s: %s", image_id, e)
+
+    def _index_text(self, image_id: str, business_type: Optional[str], text_detection: Optional[List[TextDetectionResult]]):
+        """Make an analyzed upload's OCR text findable (/api/search/text)"""
+        if text_detection is None or image_catalog.get(image_id) is None:
+            return
+        try:
+            text_index.add(image_id, business_type or "General", text_detection)
+        except sqlite3.Error as e:
+            logger.warning("Cannot index text of %s: %s", image_id, e)
+
+    def _observe(self, result: AnalysisResult, cached: bool):
+        """Record the analysis latency in the /metrics histogram, by image size class"""
+        stats = result.image_stats
+        size = size_class(stats.width, stats.height) if stats.width and stats.height else "unknown"
+        image_analysis_seconds.observe(result.processing_time, size=size, cached=str(cached).lower())
+
+    async def analyze_image(
+        self,
+        image_id: str,
+        image_path: str,
+        business_type: Optional[str] = None,
+        analysis_types: Sequence[str] = ("color", "text"),
+        progress: Optional[ProgressCallback] = None,
+        near_duplicate_distance: Optional[int] = None
+    ) -> AnalysisResult:
+        """Full analysis of one uploaded image, served from the result cache when possible
+
+        With near_duplicate_distance set, an image with no cached result of its
+        own is served the cached result of an upload whose perceptual hash is
+        within that many bits (a resized or re-encoded copy), if there is one.
+        """
+        start_time = time.perf_counter()
+        timings: Dict[str, float] = {}
+        image_info = self._image_info(image_id, image_path, business_type)
+
+        # Identical image content analyzed with the same parameters is served from cache
+        with timed(timings, "cache_lookup"):
+            cache_key = await self._cache_key(image_path, business_type, analysis_types)
+            cached = result_cache.get(cache_key)
+
+        near_duplicate_of = hash_distance = None
+        if cached is None and near_duplicate_distance is not None:
+            with timed(timings, "near_duplicate_lookup"):
+                cached, near_duplicate_of, hash_distance = await self._near_duplicate_result(
+                    image_id, image_path, business_type, analysis_types, near_duplicate_distance
+                )
+
+        if cached is not None:
+            result = AnalysisResult(**image_info, **cached)
+            if near_duplicate_of is not None:
+                # Colors and text carry over; the file itself is a different one
+                stats = self._catalog_stats(image_id, image_path)
+                if stats is None:
+                    stats = await analysis_executor.run_in_thread(self.get_image_stats, image_path)
+                result.image_stats = stats
+                result.near_duplicate_of = near_duplicate_of
+                result.hash_distance = hash_distance
+            for stage in ("decode", "color", "text"):
+                await _report(progress, stage, "done")
+        else:
+            # Decode once and share the pixel buffer across all analyzers
+            image = image_path
+            if "color" in analysis_types or "text" in analysis_types:
+                await _report(progress, "decode", "running")
+                with timed(timings, "decode"):
+                    image = await self._decode(image_path, analysis_types)
+            await _report(progress, "decode", "done")
+
+            # Get image stats
+            stats = None if isinstance(image, DecodedImage) else self._catalog_stats(image_id, image_path)
+            if stats is None:
+                stats = await analysis_executor.run_in_thread(self.get_image_stats, image)
+            result = AnalysisResult(**image_info, image_stats=stats)
+
+            # Perform requested analyses
+            if "color" in analysis_types:
+                await _report(progress, "color", "running")
+                with timed(timings, "color"):
+                    result.color_analysis = await self.analyze_colors(image, settings.DEFAULT_DOMINANT_COLORS, timings)
+                await _report(progress, "color", "done")
+            else:
+                await _report(progress, "color", "skipped")
+
+            if "text" in analysis_types:
+                await _report(progress, "text", "running")
+                with timed(timings, "text"):
+                    result.text_detection = await self.detect_text(image, business_type or "General", timings)
+                await _report(progress, "text", "done")
+            else:
+                await _report(progress, "text", "skipped")
+
+            self._store(cache_key, result)
+
+        self._index_palette(image_id, result.color_analysis)
+        self._index_text(image_id, business_type, result.text_detection)
+
+        # Calculate processing time
+        result.processing_time = time.perf_counter() - start_time
+        result.timings = timings
+        self._observe(result, cached is not None)
+        return result
+
+    async def analyze_batch(
+        self,
+        images: Sequence[Tuple[str, Optional[str]]],
+        business_type: Optional[str] = None,
+        analysis_types: Sequence[str] = ("color", "text")
+    ) -> AsyncIterator[BatchAnalysisItem]:
+        """Analyze many (image_id, image_path) pairs, yielding each result as it finishes
+
+        Images are processed in chunks of OCR_BATCH_SIZE: text detection for a
+        chunk is one batched OCR call, while color analysis for every image in
+        the chunk fans out over the worker pools. A missing path yields a
+        failed item instead of aborting the batch.
+        """
+        images = list(images)
+        chunk_size = max(1, settings.OCR_BATCH_SIZE)
+        chunks = [images[i:i + chunk_size] for i in range(0, len(images), chunk_size)]
+
+        queue: asyncio.Queue = asyncio.Queue()
+        in_flight = asyncio.Semaphore(max(1, settings.BATCH_MAX_CHUNKS_IN_FLIGHT))
+
+        async def run_chunk(chunk):
+            emitted = Counter()
+
+            def emit(item: BatchAnalysisItem):
+                emitted[item.image_id] += 1
+                queue.put_nowait(item)
+
+            async with in_flight:
+                try:
+                    await self._analyze_chunk(chunk, business_type, analysis_types, emit)
+                except Exception as e:
+                    # Every image must produce exactly one item or the stream never ends
+                    missing = Counter(image_id for image_id, _ in chunk) - emitted
+                    for image_id in missing.elements():
+                        emit(BatchAnalysisItem(image_id=image_id, status="failed", error=str(e)))
+
+        tasks = [asyncio.create_task(run_chunk(chunk)) for chunk in chunks]
+        try:
+            for _ in range(len(images)):
+                yield await queue.get()
+        finally:
+            # The client may stop reading early; don't leave work running
+            for task in tasks:
+                task.cancel()
+
+    async def _analyze_chunk(self, chunk, business_type, analysis_types, emit):
+        start_time = time.perf_counter()
+        pending = []
+
+        for image_id, image_path in chunk:
+            try:
+                if image_path is None:
+                    raise FileNotFoundError("Image not found")
+                image_info = self._image_info(image_id, image_path, business_type)
+                cache_key = await self._cache_key(image_path, business_type, analysis_types)
+                cached = result_cache.get(cache_key)
+                if cached is not None:
+                    result = AnalysisResult(**image_info, **cached)
+                    self._index_palette(image_id, result.color_analysis)
+                    self._index_text(image_id, business_type, result.text_detection)
+                    result.processing_time = time.perf_counter() - start_time
+                    self._observe(result, True)
+                    emit(BatchAnalysisItem(image_id=image_id, status="completed", result=result))
+                else:
+                    pending.append((image_id, image_path, image_info, cache_key))
+            except Exception as e:
+                emit(BatchAnalysisItem(image_id=image_id, status="failed", error=str(e)))
+
+        if not pending:
+            return
+
+        decoded = await asyncio.gather(
+            *[self._decode(image_path, analysis_types) for _, image_path, _, _ in pending],
+            return_exceptions=True
+        )
+        ready = []
+        for item, image in zip(pending, decoded):
+            if isinstance(image, BaseException):
+                emit(BatchAnalysisItem(image_id=item[0], status="failed", error=str(image)))
+            else:
+                ready.append((item, image))
+
+        # Color analysis of every image runs concurrently on the worker pools
+        color_tasks = []
+        for _, image in ready:
+            if "color" in analysis_types:
+                color_tasks.append(asyncio.create_task(
+                    self.analyze_colors(image, settings.DEFAULT_DOMINANT_COLORS)
+                ))
+            else:
+                color_tasks.append(None)
+
+        try:
+            # Text detection for the whole chunk is one batched OCR call
+            text_results: List[Any] = [None] * len(ready)
+            if "text" in analysis_types and ready:
+                try:
+                    text_results = await self.text_detector.detect_text_batch(
+                        [image for _, image in ready], business_type or "General"
+                    )
+                except Exception as e:
+                    text_results = [e] * len(ready)
+
+            for ((image_id, _, image_info, cache_key), image), color_task, text in zip(ready, color_tasks, text_results):
+                try:
+                    color_analysis = await color_task if color_task is not None else None
+                    if isinstance(text, BaseException):
+                        raise text
+                    # A tiled image is still a path here; don't open it on the event loop
+                    stats = None if isinstance(image, DecodedImage) else self._catalog_stats(image_id, image)
+                    if stats is None:
+                        stats = await analysis_executor.run_in_thread(self.get_image_stats, image)
+                    result = AnalysisResult(
+                        **image_info,
+                        image_stats=stats,
+                        color_analysis=color_analysis,
+                        text_detection=text
+                    )
+                    self._store(cache_key, result)
+                    self._index_palette(image_id, result.color_analysis)
+                    self._index_text(image_id, business_type, result.text_detection)
+                    result.processing_time = time.perf_counter() - start_time
+                    self._observe(result, False)
+                    emit(BatchAnalysisItem(image_id=image_id, status="completed", result=result))
+                except Exception as e:
+                    emit(BatchAnalysisItem(image_id=image_id, status="failed", error=str(e)))
+        finally:
+            # If the chunk is cancelled or fails part-way, don't leave color
+            # analyses running, or their errors unretrieved
+            leftover = [task for task in color_tasks if task is not None]
+            for task in leftover:
+                task.cancel()
+            await asyncio.gather(*leftover, return_exceptions=True)
@@ -0,0 +1,251 @@
+import base64
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from app.core.config import settings
+from app.models.schemas import ImageRecord, ImageStats
+from app.services.upload_store import EXTENSION_FORMATS
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = "id, filename, original_filename, path, size, format, width, height, channels, content_hash, created"
+
+# Listing order -> column; each has an index on (column, id) so a page is one index range scan
+SORT_KEYS = {
+    "time": "created",
+    "size": "size",
+    "format": "format",
+}
+
+
+class InvalidCursorError(ValueError):
+    """A listing cursor that is malformed or was issued for a different ordering"""
+
+
+class UnknownFormatError(ValueError):
+    """A listing format filter that names no accepted image format"""
+
+
+def normalize_format(format: str) -> str:
+    """Format filter -> the PIL format name stored in the catalog ('jpg', '.JPG' and 'jpeg' -> 'JPEG')"""
+    value = format.strip().lower().lstrip(".")
+    formats = set(EXTENSION_FORMATS.values())
+    if value.upper() in formats:
+        return value.upper()
+    if "." + value in EXTENSION_FORMATS:
+        return EXTENSION_FORMATS["." + value]
+    raise UnknownFormatError(f"Unknown format {format!r}, expected one of {sorted(formats)}")
+
+
+class ImageCatalog:
+    def __init__(self, db_path: str, upload_dir: str):
+        """Index of uploaded images, written at ingest
+
+        Replaces globbing UPLOAD_DIR for every lookup: finding an image by id
+        is one primary-key read, and listings are paginated queries. Files
+        uploaded before the catalog existed are picked up by ``backfill``;
+        until that has run, lookups that miss fall back to a glob.
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.upload_dir = upload_dir
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "id TEXT PRIMARY KEY, filename TEXT NOT NULL, original_filename TEXT, path TEXT NOT NULL, "
+            "size INTEGER NOT NULL, format TEXT NOT NULL, width INTEGER, height INTEGER, channels INTEGER, "
+            "content_hash TEXT, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS images_by_time ON images (created, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS images_by_size ON images (size, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS images_by_format ON images (format, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS images_hash ON images (content_hash)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._backfilled = False
+
+    def add(self, record: ImageRecord):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO images ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                _row(record),
+            )
+            self._conn.commit()
+
+    def get(self, image_id: str) -> Optional[ImageRecord]:
+        """Catalog entry for an id, or None"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM images WHERE id = ?", (image_id,)).fetchone()
+        return _record(row) if row is not None else None
+
+    def find_path(self, image_id: str) -> Optional[str]:
+        """Path of an uploaded image, or None if there is no such upload"""
+        record = self.get(image_id)
+        if record is None and not self._backfilled:
+            record = self._index_legacy_file(image_id)
+        if record is None or not os.path.exists(record.path):
+            return None
+        return record.path
+
+    def remove(self, image_id: str) -> bool:
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM images WHERE id = ?", (image_id,)).rowcount
+            self._conn.commit()
+        return removed > 0
+
+    def list(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        sort: str = "time",
+        order: str = "desc",
+        format: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ) -> Tuple[List[ImageRecord], Optional[str]]:
+        """A page of images and the cursor of the next page (None on the last one)
+
+        Pages are keyset-paginated on (sort key, id): each one starts where
+        the cursor left off instead of counting past an offset, so the cost
+        of a page depends on ``limit`` and not on how many images there are.
+        """
+        key = SORT_KEYS[sort]
+        descending = order == "desc"
+        where, params = [], []
+        if format:
+            where.append("format = ?")
+            params.append(normalize_format(format))
+        if min_size is not None:
+            where.append("size >= ?")
+            params.append(min_size)
+        if max_size is not None:
+            where.append("size <= ?")
+            params.append(max_size)
+        if cursor is not None:
+            value, last_id = _decode_cursor(cursor, sort, order)
+            op = "<" if descending else ">"
+            where.append(f"({key}, id) {op} (?, ?)")
+            params.extend([value, last_id])
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        direction = "DESC" if descending else "ASC"
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS}, {key} FROM images {clause} ORDER BY {key} {direction}, id {direction} LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+
+        # One extra row tells whether there is a next page without counting
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(sort, order, rows[-1][-1], rows[-1][0])
+        return [_record(row[:-1]) for row in rows], next_cursor
+
+    def iter_records(self, page_size: int = 500, **filters) -> Iterator[ImageRecord]:
+        """Every image matching ``filters`` (see ``list``), read one page at a time"""
+        cursor = None
+        while True:
+            records, cursor = self.list(page_size, cursor, **filters)
+            yield from records
+            if cursor is None:
+                return
+
+    def backfill(self) -> int:
+        """Index files in UPLOAD_DIR that are not in the catalog yet (one directory scan)"""
+        upload_dir = Path(self.upload_dir)
+        added = 0
+        if upload_dir.exists():
+            with self._lock:
+                known = {row[0] for row in self._conn.execute("SELECT id FROM images")}
+            for file_path in upload_dir.iterdir():
+                if file_path.is_file() and file_path.stem not in known:
+                    record = record_from_file(str(file_path))
+                    if record is not None:
+                        self.add(record)
+                        added += 1
+        self._backfilled = True
+        if added:
+            logger.info("Image catalog: indexed %d existing uploads", added)
+        return added
+
+    def _index_legacy_file(self, image_id: str) -> Optional[ImageRecord]:
+        matching_files = list(Path(self.upload_dir).glob(f"{image_id}.*"))
+        if not matching_files:
+            return None
+        record = record_from_file(str(matching_files[0]))
+        if record is not None:
+            self.add(record)
+        return record
+
+
+def record_from_file(path: str, image_id: Optional[str] = None) -> Optional[ImageRecord]:
+    """Catalog entry for an image file on disk, reading only its header"""
+    try:
+        stat = os.stat(path)
+        with Image.open(path) as img:
+            format, (width, height), channels = img.format, img.size, len(img.getbands())
+    except Exception:
+        return None
+    return ImageRecord(
+        id=image_id or Path(path).stem,
+        filename=os.path.basename(path),
+        path=path,
+        size=stat.st_size,
+        format=format,
+        width=width,
+        height=height,
+        channels=channels,
+        created=stat.st_ctime,
+    )
+
+
+def image_stats(record: ImageRecord) -> ImageStats:
+    """ImageStats straight from the catalog, without opening the file"""
+    return ImageStats(
+        width=record.width,
+        height=record.height,
+        channels=record.channels,
+        file_size=record.size,
+        format=record.format,
+    )
+
+
+def _encode_cursor(sort: str, order: str, value, image_id: str) -> str:
+    payload = json.dumps([sort, order, value, image_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, order: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, image_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise InvalidCursorError("Malformed cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise InvalidCursorError(f"Cursor was issued for sort={cursor_sort}&order={cursor_order}")
+    return value, image_id
+
+
+def _row(record: ImageRecord):
+    return (
+        # Unknown formats are stored as "" so the format ordering is a plain index range
+        record.id, record.filename, record.original_filename, record.path, record.size, record.format or "",
+        record.width, record.height, record.channels, record.content_hash, record.created,
+    )
+
+
+def _record(row) -> ImageRecord:
+    fields = dict(zip([column.strip() for column in _COLUMNS.split(",")], row))
+    fields["format"] = fields["format"] or None
+    return ImageRecord(**fields)
+
+
+image_catalog = ImageCatalog(settings.UPLOAD_DB_PATH, settings.UPLOAD_DIR)
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+from app.core.config import settings
+from app.core.executor import ExecutorBusyError, ExecutorTimeoutError
+from app.core.log import request_id_var
+from app.models.schemas import AnalysisRequest, AnalysisResult, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JOB_STAGES = ("decode", "color", "text")
+
+# Seconds a worker waits after a broker error before polling again
+WORKER_ERROR_BACKOFF = 1.0
+
+# Failures worth another attempt; anything else (a missing or corrupt image,
+# a bad request) would fail the same way again
+TRANSIENT_ERRORS = (ExecutorBusyError, ExecutorTimeoutError)
+if REDIS_AVAILABLE:
+    TRANSIENT_ERRORS += (RedisConnectionError, RedisTimeoutError)
+
+ProgressCallback = Callable[[str, str], Awaitable[None]]
+JobHandler = Callable[[AnalysisRequest, ProgressCallback], Awaitable[AnalysisResult]]
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are waiting; mapped to HTTP 503"""
+
+
+class InProcessBroker:
+    def __init__(self):
+        """Queue and job store living in this worker process"""
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._jobs: Dict[str, JobStatus] = {}
+        self._expires: Dict[str, float] = {}
+        self._timers: set = set()
+
+    async def enqueue(self, job_id: str):
+        self._queue.put_nowait(job_id)
+
+    async def enqueue_later(self, job_id: str, delay: float):
+        # Jobs live in this process, so a timer is as durable as they are
+        async def requeue():
+            await asyncio.sleep(delay)
+            self._queue.put_nowait(job_id)
+
+        task = asyncio.create_task(requeue())
+        self._timers.add(task)
+        task.add_done_callback(self._timers.discard)
+
+    async def dequeue(self) -> str:
+        return await self._queue.get()
+
+    async def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def save(self, job: JobStatus, ttl: Optional[int] = None):
+        self._jobs[job.job_id] = job
+        if ttl:
+            self._expires[job.job_id] = time.time() + ttl
+        self._purge_expired()
+
+    async def load(self, job_id: str) -> Optional[JobStatus]:
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    async def running(self) -> List[JobStatus]:
+        self._purge_expired()
+        return [job for job in self._jobs.values() if job.status == "running"]
+
+    def _purge_expired(self):
+        now = time.time()
+        for job_id in [job_id for job_id, expires in self._expires.items() if expires <= now]:
+            self._jobs.pop(job_id, None)
+            del self._expires[job_id]
+
+    async def close(self):
+        for task in self._timers:
+            task.cancel()
+        await asyncio.gather(*self._timers, return_exceptions=True)
+        self._timers = set()
+
+
+class RedisBroker:
+    def __init__(self, url: str, prefix: str = "jobs:"):
+        """Queue and job store on Redis, shared by every API worker
+
+        Retries waiting out their delay are kept in a sorted set scored by
+        the time they are due, so they survive a restart of the worker that
+        scheduled them; any worker moves due ones onto the queue.
+        """
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("JOB_BROKER=redis requires the 'redis' package")
+        self._client = aioredis.Redis.from_url(url)
+        self._queue_key = prefix + "queue"
+        self._delayed_key = prefix + "delayed"
+        self._job_prefix = prefix + "job:"
+
+    async def enqueue(self, job_id: str):
+        await self._client.lpush(self._queue_key, job_id)
+
+    async def enqueue_later(self, job_id: str, delay: float):
+        await self._client.zadd(self._delayed_key, {job_id: time.time() + delay})
+
+    async def _promote_due(self):
+        for job_id in await self._client.zrangebyscore(self._delayed_key, "-inf", time.time()):
+            # Only the worker whose ZREM removes the entry enqueues it
+            if await self._client.zrem(self._delayed_key, job_id):
+                await self._client.lpush(self._queue_key, job_id)
+
+    async def dequeue(self) -> str:
+        while True:
+            await self._promote_due()
+            item = await self._client.brpop(self._queue_key, timeout=1)
+            if item is not None:
+                return item[1].decode()
+
+    async def depth(self) -> int:
+        return await self._client.llen(self._queue_key) + await self._client.zcard(self._delayed_key)
+
+    async def save(self, job: JobStatus, ttl: Optional[int] = None):
+        await self._client.set(self._job_prefix + job.job_id, job.model_dump_json(), ex=ttl or None)
+
+    async def load(self, job_id: str) -> Optional[JobStatus]:
+        value = await self._client.get(self._job_prefix + job_id)
+        return JobStatus.model_validate_json(value) if value is not None else None
+
+    async def running(self) -> List[JobStatus]:
+        jobs = []
+        async for key in self._client.scan_iter(match=self._job_prefix + "*", count=500):
+            value = await self._client.get(key)
+            if value is not None:
+                job = JobStatus.model_validate_json(value)
+                if job.status == "running":
+                    jobs.append(job)
+        return jobs
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def create_broker():
+    if settings.JOB_BROKER == "redis":
+        return RedisBroker(settings.REDIS_URL)
+    if settings.JOB_BROKER != "memory":
+        raise ValueError(f"Unknown JOB_BROKER {settings.JOB_BROKER!r}")
+    return InProcessBroker()
+
+
+class JobQueue:
+    def __init__(
+        self,
+        broker,
+        handler: JobHandler,
+        concurrency: int,
+        max_retries: int,
+        retry_delay: float,
+        result_ttl: int,
+        max_queued: int,
+        stale_after: float,
+    ):
+        """Run analysis requests in the background with bounded concurrency and retries"""
+        self.broker = broker
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.result_ttl = result_ttl
+        self.max_queued = max_queued
+        self.stale_after = stale_after
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        if not self._workers:
+            try:
+                await self._recover_stale()
+            except Exception as e:
+                logger.warning("Cannot recover jobs left running: %s", e)
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def _recover_stale(self):
+        """Requeue (or fail, out of retries) jobs whose worker died mid-run
+
+        A job still running elsewhere saves progress as it goes, so only jobs
+        not updated for stale_after seconds are taken over.
+        """
+        cutoff = time.time() - self.stale_after
+        for job in await self.broker.running():
+            if job.updated_at > cutoff:
+                continue
+            error = "Worker stopped while the job was running"
+            if job.attempts <= self.max_retries:
+                logger.warning("Requeueing job %s left running since %s", job.job_id, job.updated_at)
+                await self._update(job, status="queued", error=error)
+                await self.broker.enqueue(job.job_id)
+            else:
+                logger.warning("Failing job %s left running since %s", job.job_id, job.updated_at)
+                await self._update(job, status="failed", error=error)
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.broker.close()
+
+    async def submit(self, request: AnalysisRequest) -> JobStatus:
+        if await self.broker.depth() >= self.max_queued:
+            raise JobQueueFullError(f"Job queue is full ({self.max_queued} jobs waiting)")
+
+        now = time.time()
+        job = JobStatus(
+            job_id=uuid.uuid4().hex,
+            status="queued",
+            request=request,
+            progress={stage: "pending" for stage in JOB_STAGES},
+            created_at=now,
+            updated_at=now,
+        )
+        await self.broker.save(job, self.result_ttl)
+        await self.broker.enqueue(job.job_id)
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobStatus]:
+        return await self.broker.load(job_id)
+
+    async def _update(self, job: JobStatus, **changes):
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+        await self.broker.save(job, self.result_ttl)
+
+    async def _worker(self):
+        while True:
+            job_id = None
+            try:
+                job_id = await self.broker.dequeue()
+                job = await self.broker.load(job_id)
+                if job is None or job.status in ("completed", "failed"):
+                    continue  # Expired or already handled
+                # Log records emitted while analyzing carry the job id
+                request_id_var.set(job_id)
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A broker outage must not end the worker; wait and poll again
+                logger.warning("Job worker error (job %s): %s", job_id, e)
+                await asyncio.sleep(WORKER_ERROR_BACKOFF)
+
+    async def _run(self, job: JobStatus):
+        await self._update(job, status="running", attempts=job.attempts + 1)
+
+        async def progress(stage: str, state: str):
+            job.progress[stage] = state
+            await self._update(job)
+
+        try:
+            result = await self.handler(job.request, progress)
+        except Exception as e:
+            for stage, state in job.progress.items():
+                if state == "running":
+                    job.progress[stage] = "failed"
+            if isinstance(e, TRANSIENT_ERRORS) and job.attempts <= self.max_retries:
+                await self._update(job, status="queued", error=str(e))
+                await self.broker.enqueue_later(job.job_id, self.retry_delay * job.attempts)
+            else:
+                await self._update(job, status="failed", error=str(e))
+            return
+
+        await self._update(job, status="completed", result=result, error=None)
+
+    async def stats(self) -> Dict[str, int]:
+        return {
+            "queued": await self.broker.depth(),
+            "max_queued": self.max_queued,
+            "workers": len(self._workers),
+        }
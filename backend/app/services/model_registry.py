@@ -0,0 +1,144 @@
+import importlib
+import importlib.util
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+EASYOCR_AVAILABLE = importlib.util.find_spec("easyocr") is not None
+
+logger = logging.getLogger(__name__)
+
+
+def _current_rss() -> int:
+    """Return the resident set size of this process in bytes (0 if unknown)"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process(os.getpid()).memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class ModelEntry:
+    """A loaded model plus its load/usage bookkeeping"""
+
+    def __init__(self, key: Tuple, model: Any, load_time: float, memory_bytes: int):
+        self.key = key
+        self.model = model
+        self.load_time = load_time
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+        self.use_count = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        engine, *params = self.key
+        return {
+            "engine": engine,
+            "params": [list(p) if isinstance(p, tuple) else p for p in params],
+            "load_time": self.load_time,
+            "memory_bytes": self.memory_bytes,
+            "loaded_at": self.loaded_at,
+            "use_count": self.use_count,
+        }
+
+
+class ModelRegistry:
+    def __init__(self):
+        """Initialize an empty, process-wide model registry"""
+        self._entries: Dict[Tuple, ModelEntry] = {}
+        self._failures: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+
+    def _get_or_load(self, key: Tuple, loader: Callable[[], Any]) -> Optional[Any]:
+        """Return the model for key, loading it exactly once on first use"""
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            # Only callers asking for the same model wait on each other
+            with key_lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    if key in self._failures:
+                        return None
+                    rss_before = _current_rss()
+                    start = time.perf_counter()
+                    try:
+                        model = loader()
+                    except Exception as e:
+                        logger.warning("%s initialization failed: %s", key[0], e)
+                        self._failures[key] = str(e)
+                        return None
+                    entry = ModelEntry(
+                        key,
+                        model,
+                        load_time=time.perf_counter() - start,
+                        memory_bytes=max(0, _current_rss() - rss_before),
+                    )
+                    self._entries[key] = entry
+                    logger.info("%s loaded in %.2fs", key[0], entry.load_time)
+        entry.use_count += 1
+        return entry.model
+
+    def resolve_gpu(self, use_gpu: bool) -> bool:
+        """Only request the GPU when torch can actually see one"""
+        if not use_gpu:
+            return False
+        try:
+            torch = importlib.import_module("torch")
+        except ImportError:
+            return False
+        return bool(torch.cuda.is_available())
+
+    def get_easyocr_reader(self, languages: Optional[List[str]] = None, use_gpu: Optional[bool] = None):
+        """Get the shared EasyOCR reader for a language set, loading it if needed"""
+        from app.core.config import settings
+
+        if not EASYOCR_AVAILABLE:
+            return None
+
+        languages = tuple(sorted(languages or settings.OCR_LANGUAGES))
+        gpu = self.resolve_gpu(settings.USE_GPU if use_gpu is None else use_gpu)
+
+        def load():
+            # Fix PIL compatibility issue for EasyOCR
+            import PIL.Image
+            if not hasattr(PIL.Image, 'ANTIALIAS'):
+                PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
+
+            easyocr = importlib.import_module("easyocr")
+            return easyocr.Reader(list(languages), gpu=gpu, verbose=False)
+
+        return self._get_or_load(("easyocr", languages, gpu), load)
+
+    def warm_up(self):
+        """Eagerly load the default OCR models, e.g. at application startup"""
+        self.get_easyocr_reader()
+
+    def is_loaded(self, engine: str) -> bool:
+        return any(key[0] == engine for key in self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Load time, memory and use counts for every model loaded so far"""
+        return {
+            "models": [entry.to_dict() for entry in self._entries.values()],
+            "failed": [
+                {"engine": key[0], "error": error}
+                for key, error in self._failures.items()
+            ],
+            "process_rss_bytes": _current_rss(),
+        }
+
+
+# Process-wide registry shared by every router and service
+model_registry = ModelRegistry()
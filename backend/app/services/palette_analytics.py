@@ -0,0 +1,175 @@
+"""Vectorized palette math: color space conversion, pairwise distances and harmony scores.
+
+Every function takes palettes as a (..., K, 3) RGB array in 0-255, so one
+palette (K, 3) and a batch of P palettes (P, K, 3) go through the same
+array ops: a palette batch is converted with a single ``cv2.cvtColor`` call
+and pairwise distances are (..., K, K) matrices rather than Python loops.
+Palettes with fewer than K colors are padded and described by a boolean
+``mask`` (see ``pack_palettes``).
+
+Two harmony scores are computed per palette:
+
+* ``hue_harmony`` - the rule-based score ``ColorAnalyzer`` has always
+  reported, from the mean circular hue distance between colors mapped to
+  monochromatic / analogous / triadic / complementary bands. It is computed
+  exactly as the per-color version did, on OpenCV's uint8 half-degree hues
+  with uint8 (wrapping) subtraction, so scores do not change; see
+  ``legacy_hue_distance_matrix``.
+* ``delta_e_harmony`` - 1 minus the percentage-weighted mean CIE76 deltaE
+  between colors, over 100 (black to white) and clipped to 0-1. Unlike hue
+  it accounts for lightness and saturation, so a palette of greys or of one
+  hue at very different lightness is not scored as monochromatic.
+
+``benchmarks/bench_palette.py`` compares this with the per-color
+implementation it replaced.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Colors (most common first) taken into account by the harmony scores
+HARMONY_MAX_COLORS = 5
+
+# deltaE between black and white, used to bring deltaE into 0-1
+_MAX_DELTA_E = 100.0
+
+
+def _convert(colors, code: int) -> np.ndarray:
+    colors = np.asarray(colors, dtype=np.float32)
+    if colors.size == 0:
+        return colors.copy()
+    converted = cv2.cvtColor((colors / 255.0).reshape(-1, 1, 3), code)
+    return converted.reshape(colors.shape)
+
+
+def to_hsv(colors) -> np.ndarray:
+    """(..., 3) RGB -> HSV with hue in degrees [0, 360) and saturation, value in 0-1"""
+    return _convert(colors, cv2.COLOR_RGB2HSV)
+
+
+def to_lab(colors) -> np.ndarray:
+    """(..., 3) RGB -> CIELAB (L in 0-100)"""
+    return _convert(colors, cv2.COLOR_RGB2Lab)
+
+
+def hue_distance_matrix(hues: np.ndarray) -> np.ndarray:
+    """(..., K) hues in degrees -> (..., K, K) circular distances in [0, 180]"""
+    diff = np.abs(hues[..., :, None] - hues[..., None, :])
+    return np.minimum(diff, 360.0 - diff)
+
+
+def opencv_hues(colors) -> np.ndarray:
+    """(..., 3) RGB -> OpenCV's uint8 hue in half degrees [0, 180)"""
+    colors = np.asarray(colors)
+    rgb = np.clip(np.rint(colors), 0, 255).astype(np.uint8)
+    if rgb.size == 0:
+        return np.zeros(colors.shape[:-1], np.uint8)
+    return cv2.cvtColor(rgb.reshape(-1, 1, 3), cv2.COLOR_RGB2HSV)[..., 0].reshape(colors.shape[:-1])
+
+
+def legacy_hue_distance_matrix(hues: np.ndarray) -> np.ndarray:
+    """(..., K) OpenCV half-degree hues -> (..., K, K) hue distances as hue_harmony has always measured them
+
+    That is ``min(|a - b|, 180 - |a - b|)`` evaluated in uint8: the
+    subtraction wraps modulo 256, so the values are neither degrees nor
+    bounded by 180. Kept as is so harmony scores stay comparable over time.
+    """
+    hues = np.asarray(hues, np.int64)
+    diff = (hues[..., :, None] - hues[..., None, :]) % 256
+    return np.minimum(diff, (180 - diff) % 256)
+
+
+def delta_e_matrix(lab: np.ndarray) -> np.ndarray:
+    """(..., K, 3) CIELAB -> (..., K, K) CIE76 deltaE"""
+    return np.linalg.norm(lab[..., :, None, :] - lab[..., None, :, :], axis=-1)
+
+
+def pack_palettes(
+    palettes: Sequence[Sequence[Sequence[float]]],
+    percentages: Optional[Sequence[Sequence[float]]] = None,
+    max_colors: int = HARMONY_MAX_COLORS,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Ragged palettes -> (colors (P, K, 3), weights (P, K), mask (P, K)), keeping the first max_colors"""
+    k = min(max_colors, max((len(palette) for palette in palettes), default=0))
+    colors = np.zeros((len(palettes), k, 3), np.float32)
+    weights = np.zeros((len(palettes), k), np.float64)
+    mask = np.zeros((len(palettes), k), bool)
+    for i, palette in enumerate(palettes):
+        n = min(len(palette), k)
+        if n:
+            colors[i, :n] = np.asarray(palette, np.float32)[:n]
+            weights[i, :n] = percentages[i][:n] if percentages is not None else 1.0
+            mask[i, :n] = True
+    return colors, weights, mask
+
+
+def _pair_weights(weights: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """(..., K, K) weights of the distinct valid color pairs (upper triangle)"""
+    k = mask.shape[-1]
+    weights = np.where(mask, weights, 0.0)
+    return weights[..., :, None] * weights[..., None, :] * np.triu(np.ones((k, k), bool), 1)
+
+
+def _pair_mean(matrix: np.ndarray, pair_weights: np.ndarray) -> np.ndarray:
+    total = pair_weights.sum(axis=(-2, -1))
+    return (matrix * pair_weights).sum(axis=(-2, -1)) / np.where(total > 0, total, 1.0)
+
+
+def hue_harmony(mean_hue_distance: np.ndarray) -> np.ndarray:
+    """Rule-based harmony score from the mean of legacy_hue_distance_matrix"""
+    d = mean_hue_distance
+    return np.select(
+        [d < 30, d < 60, d <= 90, (d >= 120) & (d <= 180)],
+        [
+            0.9,   # Monochromatic
+            0.85,  # Analogous
+            0.8,   # Triadic
+            0.75,  # Complementary
+        ],
+        0.6,  # Complex
+    )
+
+
+def score_palettes(
+    colors: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+    mask: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """Harmony scores and distance summaries for (..., K, 3) palettes
+
+    ``weights`` are the colors' pixel percentages (only ``delta_e_harmony``
+    uses them; hue harmony weighs every pair equally, as it always has).
+    Palettes with fewer than two colors score 0.
+    """
+    colors = np.asarray(colors, np.float32)
+    if mask is None:
+        mask = np.ones(colors.shape[:-1], bool)
+    if weights is None:
+        weights = np.ones(colors.shape[:-1], np.float64)
+    multi_color = mask.sum(axis=-1) >= 2
+
+    hue_distances = hue_distance_matrix(to_hsv(colors)[..., 0])
+    legacy_hue_distances = legacy_hue_distance_matrix(opencv_hues(colors))
+    delta_e = delta_e_matrix(to_lab(colors))
+
+    equal_pairs = _pair_weights(np.ones_like(weights), mask)
+    mean_hue_distance = _pair_mean(hue_distances, equal_pairs)
+    mean_delta_e = _pair_mean(delta_e, equal_pairs)
+    weighted_delta_e = _pair_mean(delta_e, _pair_weights(weights, mask))
+    min_delta_e = np.where(equal_pairs > 0, delta_e, np.inf).min(axis=(-2, -1), initial=np.inf)
+
+    return {
+        "hue_harmony": np.where(multi_color, hue_harmony(_pair_mean(legacy_hue_distances, equal_pairs)), 0.0),
+        "delta_e_harmony": np.where(multi_color, 1.0 - np.clip(weighted_delta_e / _MAX_DELTA_E, 0.0, 1.0), 0.0),
+        "mean_hue_distance": np.where(multi_color, mean_hue_distance, 0.0),
+        "mean_delta_e": np.where(multi_color, mean_delta_e, 0.0),
+        "min_delta_e": np.where(multi_color, min_delta_e, 0.0),
+    }
+
+
+def palette_hex(colors: np.ndarray) -> list:
+    """(K, 3) integer RGB -> '#rrggbb' strings"""
+    packed = (colors[:, 0].astype(np.int64) << 16) | (colors[:, 1].astype(np.int64) << 8) | colors[:, 2]
+    return [f"#{value:06x}" for value in packed.tolist()]
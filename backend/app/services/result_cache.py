@@ -0,0 +1,320 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+from app.core.config import settings
+from app.services.text_rules import text_rules
+from app.services.text_scoring import text_scorer
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change to the analyzers changes their output, so stale
+# cached results are not served after a deploy
+ANALYSIS_ENGINE_VERSION = "4"
+
+# Every setting the analyzers read that changes what they return; all of
+# them are part of the cache key
+ANALYSIS_SETTINGS = (
+    "COLOR_ANALYSIS_MAX_SIDE",
+    "DOMINANT_COLOR_STRATEGY",
+    "DOMINANT_COLOR_SAMPLE_SIZE",
+    "DOMINANT_COLOR_HISTOGRAM_BITS",
+    "TILED_MEMORY_BUDGET",
+    "OCR_LANGUAGES",
+    "OCR_ENGINE_STRATEGY",
+    "OCR_ROI_ENABLED",
+    "OCR_DETECT_MAX_SIDE",
+    "OCR_RACE_MIN_CONFIDENCE",
+    "OCR_FUSE_IOU",
+)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_MAX_REMEMBERED_HASHES = 10_000
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MemoryTier:
+    def __init__(self, max_entries: int, max_bytes: int, ttl: int = 0):
+        """In-process LRU tier holding serialized results
+
+        Entries expire ttl seconds after they were stored here, as in the
+        persistent tiers, so a result promoted from one of them is not served
+        on long after it expired there.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                self._bytes -= len(entry[1])
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[key] = (time.time(), value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SqliteTier:
+    def __init__(self, path: str, max_entries: int, ttl: int):
+        """Persistent on-disk tier, evicting least recently used rows"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+class RedisTier:
+    def __init__(self, url: str, ttl: int, prefix: str = "analysis:"):
+        """Shared tier on Redis; eviction is left to the server's maxmemory policy"""
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("RESULT_CACHE_BACKEND=redis requires the 'redis' package")
+        self.url = url
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value.decode()
+
+    def set(self, key: str, value: str):
+        self._client.set(self.prefix + key, value, ex=self.ttl or None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "url": self.url,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+class ResultCache:
+    def __init__(self, memory: Optional[MemoryTier], persistent=None, enabled: bool = True):
+        """Analysis results keyed by image content hash and analysis parameters"""
+        self.enabled = enabled
+        self.memory = memory
+        self.persistent = persistent
+        self._hashes: "OrderedDict[str, tuple]" = OrderedDict()
+        self._hash_lock = threading.Lock()
+
+    def content_hash(self, path: str) -> str:
+        """Content hash of a file, memoized by path, size and mtime"""
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._hash_lock:
+            known = self._hashes.get(path)
+            if known is not None and known[0] == signature:
+                self._hashes.move_to_end(path)
+                return known[1]
+
+        content_hash = hash_file(path)
+        self.remember_hash(path, content_hash)
+        return content_hash
+
+    def remember_hash(self, path: str, content_hash: str):
+        """Record a hash computed elsewhere (e.g. while the upload was streamed)"""
+        stat = os.stat(path)
+        with self._hash_lock:
+            self._hashes[path] = ((stat.st_size, stat.st_mtime_ns), content_hash)
+            self._hashes.move_to_end(path)
+            while len(self._hashes) > _MAX_REMEMBERED_HASHES:
+                self._hashes.popitem(last=False)
+
+    def analysis_key(
+        self,
+        content_hash: str,
+        n_colors: int,
+        business_type: str,
+        analysis_types: List[str],
+    ) -> str:
+        """Cache key for a full analysis: content, parameters and engine versions"""
+        params = {
+            "content": content_hash,
+            "n_colors": n_colors,
+            "business_type": business_type,
+            "analysis_types": sorted(set(analysis_types)),
+            "engine": ANALYSIS_ENGINE_VERSION,
+            "settings": {name: getattr(settings, name) for name in ANALYSIS_SETTINGS},
+        }
+        if "text" in analysis_types:
+            # Which OCR tokens are kept, and how they are cleaned, depends on the
+            # (hot-reloadable) keyword lists and the cleanup/noise rules
+            params["text_keywords"] = text_scorer.digest
+            params["text_rules"] = text_rules.digest
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        value = self.memory.get(key) if self.memory else None
+        if value is None and self.persistent is not None:
+            try:
+                value = self.persistent.get(key)
+            except Exception as e:
+                self.persistent.errors += 1
+                logger.warning("Result cache read failed: %s", e)
+                value = None
+            if value is not None and self.memory is not None:
+                self.memory.set(key, value)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        serialized = json.dumps(value)
+        if self.memory is not None:
+            self.memory.set(key, serialized)
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, serialized)
+            except Exception as e:
+                self.persistent.errors += 1
+                logger.warning("Result cache write failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        tiers = [tier.stats() for tier in (self.memory, self.persistent) if tier is not None]
+        return {"enabled": self.enabled, "tiers": tiers}
+
+
+def create_result_cache() -> ResultCache:
+    memory = MemoryTier(settings.RESULT_CACHE_MAX_ENTRIES, settings.RESULT_CACHE_MAX_BYTES, settings.RESULT_CACHE_TTL)
+    backend = settings.RESULT_CACHE_BACKEND
+    persistent = None
+    if backend == "sqlite":
+        persistent = SqliteTier(
+            settings.RESULT_CACHE_SQLITE_PATH,
+            settings.RESULT_CACHE_PERSISTENT_MAX_ENTRIES,
+            settings.RESULT_CACHE_TTL,
+        )
+    elif backend == "redis":
+        persistent = RedisTier(settings.REDIS_URL, settings.RESULT_CACHE_TTL)
+    elif backend != "memory":
+        raise ValueError(f"Unknown RESULT_CACHE_BACKEND {backend!r}")
+    return ResultCache(memory, persistent, enabled=settings.RESULT_CACHE_ENABLED)
+
+
+result_cache = create_result_cache()
@@ -1,20 +1,6 @@
-import numpy as np
-import cv2
-from PIL import Image
-import re
-from typing import List, Optional
-import torch
-
-# Fix PIL compatibility issue for EasyOCR
-import PIL.Image
-if not hasattr(PIL.Image, 'ANTIALIAS'):
-    PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
-
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-except ImportError:
-    EASYOCR_AVAILABLE = False
+import asyncio
+import logging
+from typing import Dict, List, Optional, Union
 
 try:
     import pytesseract
@@ -22,187 +8,210 @@ try:
 except ImportError:
     TESSERACT_AVAILABLE = False
 
+from app.core.config import settings
+from app.core.executor import analysis_executor
+from app.core.log import trace_level
+from app.core.timing import timed
 from app.models.schemas import TextDetectionResult
+from app.services.decoded_image import DecodedImage, decode_async
+from app.services.model_registry import model_registry, EASYOCR_AVAILABLE
+from app.services.text_regions import box_iou, page_to_image, polygon_box, stack_regions, text_regions
+from app.services.text_rules import text_rules
+from app.services.text_scoring import text_scorer
+
+logger = logging.getLogger(__name__)
+
+# sequential: EasyOCR, Tesseract only if it found nothing
+# parallel-fuse: both engines at once, overlapping boxes merged by IoU
+# race: both engines at once, first confident result wins
+ENGINE_STRATEGIES = ("sequential", "parallel-fuse", "race")
+
+
+def _merge_timings(timings: Optional[Dict[str, float]], engine_timings: Optional[Dict[str, float]]):
+    if timings is None or not engine_timings:
+        return
+    for stage, seconds in engine_timings.items():
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
 
 class TextDetector:
-    def __init__(self, use_gpu=True):
-        """Initialize text detector with OCR engines"""
-        self.use_gpu = use_gpu and torch.cuda.is_available()
-        self.easyocr_reader = None
-        
-        if EASYOCR_AVAILABLE:
-            try:
-                self.easyocr_reader = easyocr.Reader(['en'], gpu=self.use_gpu, verbose=False)
-                print("EasyOCR loaded and ready")
-            except Exception as e:
-                print(f"WARNING: EasyOCR initialization failed: {e}")
-                self.easyocr_reader = None
+    def __init__(self, use_gpu: Optional[bool] = None, languages: Optional[List[str]] = None):
+        """Initialize text detector; OCR models are loaded lazily via the shared registry"""
+        self.use_gpu = use_gpu
+        self.languages = languages
         
         self.min_confidence = 0.3  # Lowered from 0.6 to catch more text
         self.min_length = 1        # Lowered from 2 to catch single characters
     
+    @property
+    def easyocr_reader(self):
+        """Shared EasyOCR reader (loaded on first use, None if unavailable)"""
+        return model_registry.get_easyocr_reader(self.languages, self.use_gpu)
+    
     def calculate_text_quality(self, text: str, business_type: str = "General") -> float:
         """Calculate text quality with business-specific keywords"""
-        if not text or len(text.strip()) < 1:  # Changed from 2 to 1
-            return 0.0
-        
-        text = text.strip()
-        score = 50.0
-        
-        # Length check
-        if 3 <= len(text) <= 25:
-            score += 15
-        elif len(text) > 40:
-            score -= 20
-        
-        # Character composition
-        letters = len(re.findall(r'[a-zA-Z]', text))
-        digits = len(re.findall(r'[0-9]', text))
-        
-        if letters > 0:
-            letter_ratio = letters / len(text)
-            if letter_ratio >= 0.6:
-                score += 25
-            elif letter_ratio < 0.3:
-                score -= 20
-        
-        # Business-specific keywords bonus
-        business_keywords = {
-            'Retail': [
-                'store', 'shop', 'market', 'boutique', 'outlet', 'mall', 'plaza',
-                'sale', 'discount', 'off', 'price', 'deal', 'offer', 'special',
-                'open', 'closed', 'hours', 'till', 'until', 'am', 'pm',
-                'cash', 'card', 'payment', 'checkout', 'register', 'receipt',
-                'new', 'fresh', 'organic', 'local', 'imported', 'premium',
-                'clothing', 'fashion', 'apparel', 'shoes', 'accessories',
-                'electronics', 'phone', 'computer', 'tech', 'gadget'
-            ],
-            'Restaurant': [
-                'cafe', 'restaurant', 'kitchen', 'bakery', 'house', 'grill',
-                'breakfast', 'lunch', 'dinner', 'open', 'closed', 'hours',
-                'menu', 'food', 'cuisine', 'falafel', 'alabama', 'hills',
-                'mediterranean', 'shawerma', 'delivery', 'takeout'
-            ],
-            'Salon': [
-                'salon', 'spa', 'beauty', 'hair', 'nails', 'massage', 'facial',
-                'barbershop', 'barber', 'stylist', 'hairdresser', 'manicure', 'pedicure',
-                'cut', 'color', 'style', 'treatment', 'wellness', 'relax',
-                'appointment', 'book', 'booking', 'shampoo', 'conditioner'
-            ]
-        }
-        
-        # General keywords that apply to all business types
-        general_keywords = [
-            'open', 'closed', 'hours', 'welcome', 'thank', 'visit', 'service',
-            'quality', 'customer', 'staff', 'manager', 'phone', 'call'
-        ]
-        
-        keyword_bonus = 0
-        text_lower = text.lower()
-        
-        # Check business-specific keywords
-        if business_type in business_keywords:
-            for keyword in business_keywords[business_type]:
-                if keyword in text_lower:
-                    keyword_bonus += 12
-        
-        # Check general keywords
-        for keyword in general_keywords:
-            if keyword in text_lower:
-                keyword_bonus += 8
-        
-        score += min(keyword_bonus, 35)  # Max 35 bonus points
-        
-        return max(0.0, min(100.0, score)) / 100.0  # Normalize to 0-1
+        return text_scorer.score(text, business_type)
+    
+    def calculate_text_quality_batch(self, texts: List[str], business_type: str = "General") -> List[float]:
+        """Text quality of many texts in one call"""
+        return text_scorer.score_many(texts, business_type)
     
     def is_meaningful_text(self, text: str) -> bool:
-        """Check if text is meaningful"""
-        if not text or len(text.strip()) < 2:
-            return False
-        
-        text = text.strip()
-        
-        # Basic quality check - lowered threshold
-        if self.calculate_text_quality(text) < 0.2:  # Lowered from 0.4 to 0.2
-            return False
-        
-        # Check for noise patterns
-        noise_patterns = [
-            r'^[^a-zA-Z0-9]+$',        # Only symbols
-            r'^[a-zA-Z]{1,2}$',        # Too short
-            r'^(.)\1{2,}$',            # Repeated characters
-            r'[)(\[\]{}|\\\/]{3,}',    # Multiple brackets
-        ]
-        
-        for pattern in noise_patterns:
-            if re.search(pattern, text):
-                return False
-        
-        return True
+        """Check if text is meaningful (see text_rules.NOISE_RULES)"""
+        return text_rules.is_meaningful(text)
     
-    def clean_text(self, text: str) -> str:
-        """Clean extracted text"""
-        if not text:
-            return ""
-        
-        # Basic cleaning
-        cleaned = ' '.join(text.split())
-        cleaned = cleaned.strip('.,;:!?()[]{}"\'-_=+|\\/')
+    def clean_text(self, text: str, business_type: str = "General") -> str:
+        """Clean extracted text and apply OCR corrections"""
+        return text_rules.clean(text, business_type)
+    
+    def extract_text_easyocr(
+        self,
+        image,
+        business_type: str = "General",
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[TextDetectionResult]:
+        """Extract text using EasyOCR"""
+        reader = self.easyocr_reader
+        if not reader:
+            logger.warning("EasyOCR reader not initialized")
+            return []
         
-        # Simple OCR error corrections
-        cleaned = re.sub(r'\b0([a-zA-Z])', r'O\1', cleaned)
-        cleaned = re.sub(r'([a-zA-Z])0\b', r'\1O', cleaned)
+        image = DecodedImage.ensure(image)
+        try:
+            if settings.OCR_ROI_ENABLED:
+                easyocr_results = self._readtext_roi(reader, [image], timings)[0]
+            else:
+                with timed(timings, "ocr_easyocr"):
+                    easyocr_results = reader.readtext(image.rgb)
+        except Exception as e:
+            logger.warning("EasyOCR error: %s", e)
+            return []
         
-        return cleaned.strip()
+        return self._filter_easyocr_results(easyocr_results, business_type)
     
-    def extract_text_easyocr(self, image, business_type: str = "General") -> List[TextDetectionResult]:
-        """Extract text using EasyOCR"""
+    def _readtext_roi(self, reader, images: List[DecodedImage], timings: Optional[Dict[str, float]] = None):
+        """Two-stage EasyOCR: detect on downscaled images, recognize crops at native resolution
+        
+        Images must share one shape; they are detected in a single batch.
+        Returns raw (bbox, text, confidence) lists in full-resolution coordinates.
+        """
+        with timed(timings, "ocr_detect"):
+            small = [image.downscaled(settings.OCR_DETECT_MAX_SIDE) for image in images]
+            if len(small) == 1:
+                horizontal_lists, free_lists = reader.detect(small[0].rgb)
+            else:
+                # detect() only reformats single images; a batch goes in pre-formatted
+                # (easyocr is installed whenever there is a reader)
+                from easyocr.utils import reformat_input_batched
+                batch, _ = reformat_input_batched([view.rgb for view in small])
+                horizontal_lists, free_lists = reader.detect(batch, reformat=False)
+        
+        # Recognize on the grayscale readtext() would have made: easyocr's own
+        # reformat_input, which converts the RGB array with BGR2GRAY
+        from easyocr.utils import reformat_input
+
         results = []
+        with timed(timings, "ocr_recognize"):
+            for image, view, horizontal, free in zip(images, small, horizontal_lists, free_lists):
+                scale_x, scale_y = image.width / view.width, image.height / view.height
+                # Horizontal boxes are [x_min, x_max, y_min, y_max]; free boxes are 4 points
+                horizontal = [
+                    [int(x_min * scale_x), int(x_max * scale_x), int(y_min * scale_y), int(y_max * scale_y)]
+                    for x_min, x_max, y_min, y_max in horizontal
+                ]
+                free = [[[int(x * scale_x), int(y * scale_y)] for x, y in box] for box in free]
+                if not horizontal and not free:
+                    results.append([])
+                    continue
+                _, gray = reformat_input(image.rgb)
+                results.append(reader.recognize(
+                    gray,
+                    horizontal_list=horizontal,
+                    free_list=free,
+                    batch_size=settings.OCR_BATCH_SIZE
+                ))
+        return results
+    
+    def _filter_easyocr_results(self, easyocr_results, business_type: str = "General") -> List[TextDetectionResult]:
+        """Keep confident, meaningful EasyOCR detections
+
+        Each raw detection's fate is logged only at DEBUG level or when this
+        call is picked by LOG_TRACE_SAMPLE_RATE.
+        """
+        results = []
+        trace = trace_level(logger)
+        if trace is not None:
+            logger.log(trace, "EasyOCR raw results: %d items", len(easyocr_results))
+        
+        confident = []
+        for detection in easyocr_results:
+            if detection[2] > self.min_confidence:
+                confident.append(detection)
+            elif trace is not None:
+                logger.log(trace, "Rejected %r: confidence %.3f <= %s", detection[1], detection[2], self.min_confidence)
+        
+        verdicts = text_rules.check_many([text for _, text, _ in confident], business_type, self.min_length)
+        for (bbox, text, confidence), (cleaned, rejected_by) in zip(confident, verdicts):
+            if rejected_by is not None:
+                if trace is not None:
+                    logger.log(trace, "Rejected %r (cleaned to %r): %s", text, cleaned, rejected_by)
+                continue
+            
+            # Convert bbox to flat list of coordinates
+            flat_bbox = [int(coord) for point in bbox for coord in point]
+            results.append(TextDetectionResult(
+                text=cleaned,
+                confidence=float(confidence),
+                bounding_box=flat_bbox
+            ))
+            if trace is not None:
+                logger.log(trace, "Accepted %r as %r (confidence %.3f)", text, cleaned, confidence)
+        
+        return results
+    
+    def extract_text_easyocr_batch(self, images: List[DecodedImage], business_type: str = "General") -> List[List[TextDetectionResult]]:
+        """Extract text from many images with batched EasyOCR inference
         
-        if not self.easyocr_reader:
-            print("EasyOCR reader not initialized")
+        EasyOCR can only batch images of identical size, so images are grouped
+        by shape; each group is a single readtext_batched call.
+        """
+        results: List[List[TextDetectionResult]] = [[] for _ in images]
+        
+        reader = self.easyocr_reader
+        if not reader:
+            logger.warning("EasyOCR reader not initialized")
             return results
         
-        try:
-            easyocr_results = self.easyocr_reader.readtext(np.array(image))
-            print(f"EasyOCR raw results: {len(easyocr_results)} items")
-            
-            for (bbox, text, confidence) in easyocr_results:
-                print(f"Raw text: '{text}' (confidence: {confidence:.3f})")
-                
-                if confidence > self.min_confidence:
-                    print(f"  - Passed confidence check (>{self.min_confidence})")
-                    cleaned = self.clean_text(text)
-                    print(f"  - Cleaned text: '{cleaned}'")
-                    
-                    if cleaned and len(cleaned) >= self.min_length:
-                        print(f"  - Passed length check (>={self.min_length})")
-                        
-                        if self.is_meaningful_text(cleaned):
-                            print(f"  - Passed meaningful text check")
-                            # Convert bbox to flat list of coordinates
-                            flat_bbox = [int(coord) for point in bbox for coord in point]
-                            
-                            results.append(TextDetectionResult(
-                                text=cleaned,
-                                confidence=float(confidence),
-                                bounding_box=flat_bbox
-                            ))
-                            print(f"  - Added to results!")
-                        else:
-                            quality_score = self.calculate_text_quality(cleaned, business_type)
-                            print(f"  - Failed meaningful text check (quality: {quality_score:.3f})")
-                    else:
-                        print(f"  - Failed length check (len={len(cleaned) if cleaned else 0})")
+        groups = {}
+        for index, image in enumerate(images):
+            groups.setdefault(image.rgb.shape, []).append(index)
+        
+        for indices in groups.values():
+            try:
+                if settings.OCR_ROI_ENABLED:
+                    batch_results = self._readtext_roi(reader, [images[index] for index in indices])
+                elif len(indices) == 1:
+                    batch_results = [reader.readtext(images[indices[0]].rgb)]
                 else:
-                    print(f"  - Failed confidence check ({confidence:.3f} <= {self.min_confidence})")
-                    
-        except Exception as e:
-            print(f"EasyOCR error: {e}")
+                    batch_results = reader.readtext_batched(
+                        [images[index].rgb for index in indices],
+                        batch_size=settings.OCR_BATCH_SIZE
+                    )
+            except Exception as e:
+                logger.warning("EasyOCR error: %s", e)
+                continue
+            
+            for index, easyocr_results in zip(indices, batch_results):
+                results[index] = self._filter_easyocr_results(easyocr_results, business_type)
         
         return results
     
-    def extract_text_tesseract(self, image, business_type: str = "General") -> List[TextDetectionResult]:
+    def extract_text_tesseract(
+        self,
+        image,
+        business_type: str = "General",
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[TextDetectionResult]:
         """Extract text using Tesseract OCR"""
         results = []
         
@@ -210,62 +219,236 @@ class TextDetector:
             return results
         
         try:
-            # Convert PIL image to OpenCV format
-            image_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            image = DecodedImage.ensure(image)
+            
+            regions = None
+            if settings.OCR_ROI_ENABLED:
+                with timed(timings, "ocr_regions"):
+                    regions = text_regions(image.gray, image.downscaled(settings.OCR_DETECT_MAX_SIDE).gray)
+                if not regions:
+                    return results
             
-            # Get detailed OCR data
-            data = pytesseract.image_to_data(image_cv, output_type=pytesseract.Output.DICT)
+            with timed(timings, "ocr_tesseract"):
+                if regions is None:
+                    # Whole frame; OpenCV (BGR) view is cached on the decoded image
+                    page, offsets = image.bgr, None
+                else:
+                    # Candidate regions at native resolution, stacked into one page
+                    page, offsets = stack_regions(image.gray, regions)
+                
+                # Get detailed OCR data
+                data = pytesseract.image_to_data(page, output_type=pytesseract.Output.DICT)
             
+            confident = []
             for i in range(len(data['text'])):
                 text = data['text'][i].strip()
                 confidence = float(data['conf'][i]) / 100.0  # Normalize to 0-1
-                
                 if confidence > self.min_confidence and text:
-                    cleaned = self.clean_text(text)
-                    if cleaned and len(cleaned) >= self.min_length and self.is_meaningful_text(cleaned):
-                        # Extract bounding box
-                        x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
-                        bbox = [x, y, x + w, y, x + w, y + h, x, y + h]  # Convert to 4-point format
-                        
-                        results.append(TextDetectionResult(
-                            text=cleaned,
-                            confidence=confidence,
-                            bounding_box=bbox
-                        ))
+                    confident.append((i, text, confidence))
+            
+            verdicts = text_rules.check_many([text for _, text, _ in confident], business_type, self.min_length)
+            for (i, _, confidence), (cleaned, rejected_by) in zip(confident, verdicts):
+                if rejected_by is not None:
+                    continue
+                # Extract bounding box
+                x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
+                if offsets is not None:
+                    x, y = page_to_image(offsets, x, y, h)
+                bbox = [x, y, x + w, y, x + w, y + h, x, y + h]  # Convert to 4-point format
+                
+                results.append(TextDetectionResult(
+                    text=cleaned,
+                    confidence=confidence,
+                    bounding_box=bbox
+                ))
         except Exception as e:
-            print(f"Tesseract error: {e}")
+            logger.warning("Tesseract error: %s", e)
         
         return results
     
-    async def detect_text_comprehensive(self, image_path: str, business_type: str = "General") -> List[TextDetectionResult]:
-        """Comprehensive text detection using available OCR engines"""
-        print(f"Starting text detection for {image_path}, business_type: {business_type}")
-        
+    async def detect_text_comprehensive(
+        self,
+        image: Union[str, DecodedImage],
+        business_type: str = "General",
+        timings: Optional[Dict[str, float]] = None,
+        strategy: Optional[str] = None
+    ) -> List[TextDetectionResult]:
+        """Comprehensive text detection using available OCR engines
+        
+        ``strategy`` is one of ENGINE_STRATEGIES (default OCR_ENGINE_STRATEGY).
+        When a timings dict is passed, seconds spent per OCR stage are added to it.
+        """
+        strategy = self._resolve_strategy(strategy)
+        image = await decode_async(image)
+        # OCR inference releases the GIL, so it runs on the executor's thread pool
+        if strategy == "sequential":
+            return await analysis_executor.run_in_thread(self.detect_text_sync, image, business_type, timings)
+        
+        engines = self._available_engines()
+        if not engines:
+            logger.warning("No OCR engines available")
+            return []
+        
+        # Each engine times into its own dict: a race loser keeps running after
+        # the winner has returned, and must not touch the caller's timings
+        tasks = {}
+        for extract in engines:
+            engine_timings = {} if timings is not None else None
+            task = asyncio.ensure_future(analysis_executor.run_in_thread(extract, image, business_type, engine_timings))
+            tasks[task] = engine_timings
+        if strategy == "race":
+            return await self._race(tasks, timings)
+        result_lists = await asyncio.gather(*tasks)
+        for engine_timings in tasks.values():
+            _merge_timings(timings, engine_timings)
+        return self._fuse_results(result_lists)
+    
+    def _resolve_strategy(self, strategy: Optional[str]) -> str:
+        strategy = strategy or settings.OCR_ENGINE_STRATEGY
+        if strategy not in ENGINE_STRATEGIES:
+            raise ValueError(f"Unknown OCR engine strategy {strategy!r}, expected one of {list(ENGINE_STRATEGIES)}")
+        return strategy
+    
+    def _available_engines(self):
+        """Extract functions of the installed engines, preferred engine first"""
+        engines = []
+        if EASYOCR_AVAILABLE:
+            engines.append(self.extract_text_easyocr)
+        if TESSERACT_AVAILABLE:
+            engines.append(self.extract_text_tesseract)
+        return engines
+    
+    def _is_confident(self, results: List[TextDetectionResult]) -> bool:
+        return any(result.confidence >= settings.OCR_RACE_MIN_CONFIDENCE for result in results)
+    
+    async def _race(self, tasks, timings: Optional[Dict[str, float]] = None) -> List[TextDetectionResult]:
+        """Return the first engine result with a confident detection, else fuse them all
+
+        tasks maps each engine's task to its own timings dict. An engine that
+        fails drops out of the race; it only fails if every engine does.
+        """
+        finished = []
+        errors = []
+        pending = set(tasks)
         try:
-            image = Image.open(image_path).convert('RGB')
-            print(f"Image loaded successfully: {image.size}")
-        except Exception as e:
-            raise Exception(f"Cannot open image {image_path}: {e}")
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        results = task.result()
+                    except Exception as e:
+                        logger.warning("OCR engine failed, waiting for the others: %s", e)
+                        errors.append(e)
+                        continue
+                    if self._is_confident(results):
+                        _merge_timings(timings, tasks[task])
+                        return self._fuse_results([results])
+                    finished.append((results, tasks[task]))
+        finally:
+            # A running OCR call can't be interrupted; it finishes in the
+            # background and its result is dropped
+            for task in pending:
+                task.cancel()
+
+        if not finished:
+            raise errors[0]
+        for _, engine_timings in finished:
+            _merge_timings(timings, engine_timings)
+        return self._fuse_results([results for results, _ in finished])
+    
+    def _fuse_results(self, result_lists: List[List[TextDetectionResult]]) -> List[TextDetectionResult]:
+        """Merge engine results: of boxes overlapping by OCR_FUSE_IOU or more, keep the most confident"""
+        kept = []
+        kept_boxes = []
+        candidates = [result for results in result_lists for result in results]
+        for result in sorted(candidates, key=lambda x: x.confidence, reverse=True):
+            box = polygon_box(result.bounding_box)
+            if all(box_iou(box, other) < settings.OCR_FUSE_IOU for other in kept_boxes):
+                kept.append(result)
+                kept_boxes.append(box)
+        return kept
+    
+    def detect_text_sync(
+        self,
+        image: Union[str, DecodedImage],
+        business_type: str = "General",
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[TextDetectionResult]:
+        """Blocking implementation of detect_text_comprehensive"""
+        image = DecodedImage.ensure(image)
+        logger.debug(
+            "Text detection for %s (%dx%d), business_type: %s",
+            image.path, image.width, image.height, business_type
+        )
         
         all_results = []
         
         # Try EasyOCR first (usually better accuracy)
-        if self.easyocr_reader:
-            print("Using EasyOCR for text detection...")
-            easyocr_results = self.extract_text_easyocr(image, business_type)
-            print(f"EasyOCR found {len(easyocr_results)} results")
+        if EASYOCR_AVAILABLE:
+            easyocr_results = self.extract_text_easyocr(image, business_type, timings)
+            logger.debug("EasyOCR found %d results", len(easyocr_results))
             all_results.extend(easyocr_results)
         else:
-            print("EasyOCR not available")
+            logger.debug("EasyOCR not available")
+        
+        return self._finalize_results(image, all_results, business_type, timings)
+    
+    def detect_text_batch_sync(self, images: List[DecodedImage], business_type: str = "General") -> List[List[TextDetectionResult]]:
+        """Blocking batched text detection: one EasyOCR pass over all images"""
+        if EASYOCR_AVAILABLE:
+            batch_results = self.extract_text_easyocr_batch(images, business_type)
+        else:
+            batch_results = [[] for _ in images]
+        
+        return [
+            self._finalize_results(image, results, business_type)
+            for image, results in zip(images, batch_results)
+        ]
+    
+    async def detect_text_batch(
+        self,
+        images: List[Union[str, DecodedImage]],
+        business_type: str = "General",
+        strategy: Optional[str] = None
+    ) -> List[List[TextDetectionResult]]:
+        """Detect text in several images, batching OCR inference across them"""
+        strategy = self._resolve_strategy(strategy)
+        images = await asyncio.gather(*[decode_async(image) for image in images])
+        if strategy == "sequential" or not (EASYOCR_AVAILABLE and TESSERACT_AVAILABLE):
+            return await analysis_executor.run_in_thread(self.detect_text_batch_sync, images, business_type)
+        
+        # Tesseract reads each image while EasyOCR works through the batch
+        easyocr_results, *tesseract_results = await asyncio.gather(
+            analysis_executor.run_in_thread(self.extract_text_easyocr_batch, images, business_type),
+            *[analysis_executor.run_in_thread(self.extract_text_tesseract, image, business_type) for image in images]
+        )
+        combined = []
+        for easyocr, tesseract in zip(easyocr_results, tesseract_results):
+            if strategy == "race" and self._is_confident(easyocr):
+                combined.append(self._fuse_results([easyocr]))
+            elif strategy == "race" and self._is_confident(tesseract):
+                combined.append(self._fuse_results([tesseract]))
+            else:
+                combined.append(self._fuse_results([easyocr, tesseract]))
+        return combined
+    
+    def _finalize_results(
+        self,
+        image: DecodedImage,
+        all_results: List[TextDetectionResult],
+        business_type: str,
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[TextDetectionResult]:
+        """Fall back to Tesseract when EasyOCR found nothing, then deduplicate"""
+        all_results = list(all_results)
         
         # If no results from EasyOCR, try Tesseract
         if not all_results and TESSERACT_AVAILABLE:
-            print("No EasyOCR results, trying Tesseract...")
-            tesseract_results = self.extract_text_tesseract(image, business_type)
-            print(f"Tesseract found {len(tesseract_results)} results")
+            tesseract_results = self.extract_text_tesseract(image, business_type, timings)
+            logger.debug("No EasyOCR results, Tesseract found %d", len(tesseract_results))
             all_results.extend(tesseract_results)
         elif not all_results:
-            print("No OCR engines available or produced results")
+            logger.debug("No OCR engines available or produced results")
         
         # Remove duplicates and sort by confidence
         unique_results = []
@@ -276,8 +459,10 @@ class TextDetector:
                 seen_texts.add(result.text.lower())
                 unique_results.append(result)
         
-        print(f"Final unique results: {len(unique_results)}")
-        for result in unique_results:
-            print(f"  - '{result.text}' (confidence: {result.confidence:.2f})")
+        logger.debug("Final unique results: %d", len(unique_results))
+        trace = trace_level(logger)
+        if trace is not None:
+            for result in unique_results:
+                logger.log(trace, "Result %r (confidence %.2f)", result.text, result.confidence)
         
-        return unique_results
\ No newline at end of file
+        return unique_results
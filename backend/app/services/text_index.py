@@ -0,0 +1,211 @@
+"""Full-text index of the OCR results of analyzed uploads.
+
+Every detection (cleaned text, confidence and bounding box) of a catalogued
+upload is stored in SEARCH_DB_PATH as it comes out of OCR, keyed by image id
+and the business type it was read for, and indexed by an SQLite FTS5 table
+kept in sync by triggers. A search is an FTS5 ``MATCH`` filtered by
+business type and confidence, newest images first or ranked by BM25; it
+never opens an image or runs OCR.
+
+Re-indexing an image replaces its detections for that business type, and
+is skipped when they are unchanged (a cache hit indexes nothing new).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from app.core.config import settings
+from app.models.schemas import TextDetectionResult
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS text_detections (
+    id INTEGER PRIMARY KEY,
+    image_id TEXT NOT NULL,
+    business_type TEXT NOT NULL,
+    text TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    bounding_box TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS text_detections_image ON text_detections (image_id, business_type);
+
+CREATE TABLE IF NOT EXISTS text_images (
+    image_id TEXT NOT NULL,
+    business_type TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    PRIMARY KEY (image_id, business_type)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS text_fts USING fts5(
+    text,
+    content='text_detections',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS text_detections_insert AFTER INSERT ON text_detections BEGIN
+    INSERT INTO text_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS text_detections_delete AFTER DELETE ON text_detections BEGIN
+    INSERT INTO text_fts (text_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def match_expression(query: str) -> str:
+    """Plain search words -> FTS5 query matching detections containing all of them
+
+    Words are quoted, so FTS5 operators and punctuation are taken literally;
+    a word ending in ``*`` matches as a prefix.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*") and len(word) > 1
+        word = word.rstrip("*") if prefix else word
+        terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if not terms:
+        raise ValueError("query has no search terms")
+    return " ".join(terms)
+
+
+def _digest(detections: Sequence[TextDetectionResult]) -> str:
+    payload = json.dumps([[d.text, d.confidence, d.bounding_box] for d in detections])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class TextIndex:
+    def __init__(self, db_path: str):
+        """OCR detections of analyzed uploads, persisted and full-text indexed"""
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def add(self, image_id: str, business_type: str, detections: Sequence[TextDetectionResult]) -> bool:
+        """Replace an image's detections for a business type; False if they were already indexed"""
+        digest = _digest(detections)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM text_images WHERE image_id = ? AND business_type = ?",
+                (image_id, business_type)
+            ).fetchone()
+            if row is not None and row[0] == digest:
+                return False
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM text_detections WHERE image_id = ? AND business_type = ?",
+                    (image_id, business_type)
+                )
+                self._conn.executemany(
+                    "INSERT INTO text_detections (image_id, business_type, text, confidence, bounding_box) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (image_id, business_type, d.text, d.confidence, json.dumps(d.bounding_box))
+                        for d in detections if d.text
+                    ]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO text_images (image_id, business_type, digest, indexed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (image_id, business_type, digest, time.time())
+                )
+        return True
+
+    def remove(self, image_id: str) -> bool:
+        """Drop an image's detections for every business type"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM text_detections WHERE image_id = ?", (image_id,))
+            removed = self._conn.execute("DELETE FROM text_images WHERE image_id = ?", (image_id,)).rowcount
+        return removed > 0
+
+    def search(
+        self,
+        query: str,
+        business_type: Optional[str] = None,
+        min_confidence: float = 0.0,
+        limit: int = 20,
+        offset: int = 0,
+        sort: str = "recent"
+    ) -> List[Dict]:
+        """Images with a detection containing every word of query
+
+        Each result carries its matching detections (text, confidence,
+        bounding box). ``recent`` lists the most recently indexed images
+        first and reads matches only until the page is full, so it costs the
+        same however many detections match; ``relevance`` ranks images by
+        their best BM25 match, which scores every match.
+        """
+        filters = "text_fts MATCH ? AND d.confidence >= ?"
+        params: List = [match_expression(query), min_confidence]
+        if business_type is not None:
+            filters += " AND d.business_type = ?"
+            params.append(business_type)
+        matching = (
+            "SELECT d.image_id, d.business_type, d.text, d.confidence, d.bounding_box{rank} "
+            f"FROM text_fts JOIN text_detections d ON d.id = text_fts.rowid WHERE {filters}"
+        )
+
+        results: Dict[tuple, Dict] = {}
+
+        def add(image_id, business, text, confidence, bounding_box):
+            results[(image_id, business)]["detections"].append(
+                {"text": text, "confidence": confidence, "bounding_box": json.loads(bounding_box)}
+            )
+
+        with self._lock:
+            if sort == "relevance":
+                matching = matching.format(rank=", bm25(text_fts) AS rank")
+                # bm25() can't be aggregated directly; rank the matches first
+                images = self._conn.execute(
+                    f"WITH matching AS MATERIALIZED ({matching}) "
+                    "SELECT image_id, business_type, min(rank) AS best FROM matching "
+                    "GROUP BY image_id, business_type ORDER BY best, image_id LIMIT ? OFFSET ?",
+                    params + [limit, offset]
+                ).fetchall()
+                if not images:
+                    return []
+                for image_id, business, best in images:
+                    results[(image_id, business)] = {
+                        "image_id": image_id, "business_type": business, "score": -best, "detections": []
+                    }
+                image_ids = sorted({image_id for image_id, _, _ in images})
+                rows = self._conn.execute(
+                    f"{matching} AND d.image_id IN ({', '.join('?' * len(image_ids))}) ORDER BY rank",
+                    params + image_ids
+                )
+                for image_id, business, text, confidence, bounding_box, _ in rows:
+                    if (image_id, business) in results:
+                        add(image_id, business, text, confidence, bounding_box)
+                return list(results.values())
+
+            # An image's detections are inserted together, so its matches
+            # arrive next to each other in rowid order
+            rows = self._conn.execute(f"{matching.format(rank='')} ORDER BY text_fts.rowid DESC", params)
+            for image_id, business, text, confidence, bounding_box in rows:
+                if (image_id, business) not in results:
+                    if len(results) == offset + limit:
+                        break
+                    results[(image_id, business)] = {
+                        "image_id": image_id, "business_type": business, "score": None, "detections": []
+                    }
+                add(image_id, business, text, confidence, bounding_box)
+            rows.close()
+        return list(results.values())[offset:]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            images, indexed = self._conn.execute("SELECT count(DISTINCT image_id), count(*) FROM text_images").fetchone()
+            detections = self._conn.execute("SELECT count(*) FROM text_detections").fetchone()[0]
+        return {"images": images, "image_business_types": indexed, "detections": detections}
+
+
+# Process-wide index of analyzed uploads' OCR text
+text_index = TextIndex(settings.SEARCH_DB_PATH)
@@ -0,0 +1,147 @@
+"""Cheap text-region detection for two-stage OCR.
+
+``find_text_regions`` runs on a downscaled grayscale image and returns
+candidate text boxes. Text lines are dense clusters of strong, short edges:
+a morphological gradient picks the edges, Otsu separates them from smooth
+background, and a wide closing kernel joins the characters of a line into
+one blob. Blobs that are too small, too sparse or shaped nothing like a line
+of text are dropped.
+
+The recognizer then only sees these regions, cropped from the full
+resolution image. ``stack_regions`` packs the crops into one strip so an
+engine that pays a fixed cost per call (Tesseract starts a process per
+image) runs once per image, not once per region.
+"""
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x0, y0, x1, y1
+
+# Above this share of the frame, cropping saves nothing
+MAX_REGION_COVERAGE = 0.6
+MAX_REGIONS = 64
+
+# White margin around each crop on a stacked page
+STACK_GAP = 16
+
+
+def find_text_regions(gray: np.ndarray, min_height: int = 6) -> List[Box]:
+    """Candidate text boxes in a (downscaled) uint8 grayscale image"""
+    height, width = gray.shape[:2]
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    otsu, _ = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Strong object borders push Otsu above low-contrast lettering; cap the
+    # threshold at a few times the noise floor
+    threshold = min(otsu, max(24.0, 4.0 * float(np.median(gradient))))
+    _, edges = cv2.threshold(gradient, threshold, 255, cv2.THRESH_BINARY)
+
+    # Long straight edges are object and block borders, never glyph strokes
+    for size in ((max(15, width // 20), 1), (1, max(15, height // 20))):
+        edges = cv2.subtract(edges, cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, size)))
+    # ...and drop the one-pixel remnants they leave behind
+    edges = cv2.morphologyEx(edges, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+
+    # Join the characters of a line; the kernel grows with the image width
+    kernel_width = max(9, width // 80)
+    lines = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_width, 1)))
+
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < min_height or w < min_height or h > height * 0.5:
+            continue
+        # Words are rarely much taller than wide, and dense with edge pixels
+        fill = cv2.countNonZero(edges[y:y + h, x:x + w]) / float(w * h)
+        if w < h * 0.3 or not 0.08 <= fill <= 0.95:
+            continue
+        boxes.append((x, y, x + w, y + h))
+    return boxes
+
+
+def merge_boxes(boxes: List[Box], pad: int = 0) -> List[Box]:
+    """Pad boxes and merge the ones that overlap"""
+    boxes = [(x0 - pad, y0 - pad, x1 + pad, y1 + pad) for x0, y0, x1, y1 in boxes]
+    merged = True
+    while merged:
+        merged = False
+        result: List[Box] = []
+        for box in sorted(boxes):
+            for i, other in enumerate(result):
+                if box[0] <= other[2] and other[0] <= box[2] and box[1] <= other[3] and other[1] <= box[3]:
+                    result[i] = (min(box[0], other[0]), min(box[1], other[1]),
+                                 max(box[2], other[2]), max(box[3], other[3]))
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return boxes
+
+
+def scale_boxes(boxes: List[Box], scale_x: float, scale_y: float, width: int, height: int) -> List[Box]:
+    """Map boxes from the detection image to a (width, height) image, clipped to its bounds"""
+    return [
+        (max(0, int(x0 * scale_x)), max(0, int(y0 * scale_y)),
+         min(width, int(np.ceil(x1 * scale_x))), min(height, int(np.ceil(y1 * scale_y))))
+        for x0, y0, x1, y1 in boxes
+    ]
+
+
+def text_regions(gray_full: np.ndarray, gray_small: np.ndarray) -> Optional[List[Box]]:
+    """Merged full-resolution regions, or None when the whole frame should be read"""
+    height, width = gray_full.shape[:2]
+    small_height, small_width = gray_small.shape[:2]
+    boxes = merge_boxes(find_text_regions(gray_small), pad=2)
+    boxes = scale_boxes(boxes, width / small_width, height / small_height, width, height)
+
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+    if len(boxes) > MAX_REGIONS or area > MAX_REGION_COVERAGE * width * height:
+        return None
+    return boxes
+
+
+def stack_regions(gray: np.ndarray, boxes: List[Box], gap: int = STACK_GAP) -> Tuple[np.ndarray, List[Tuple[int, Box]]]:
+    """Stack crops vertically on a white page; returns the page and each crop's top offset on it"""
+    strip_width = max(x1 - x0 for x0, _, x1, _ in boxes) + 2 * gap
+    strip_height = sum(y1 - y0 for _, y0, _, y1 in boxes) + gap * (len(boxes) + 1)
+    strip = np.full((strip_height, strip_width), 255, dtype=np.uint8)
+
+    offsets = []
+    top = gap
+    for box in boxes:
+        x0, y0, x1, y1 = box
+        strip[top:top + y1 - y0, gap:gap + x1 - x0] = gray[y0:y1, x0:x1]
+        offsets.append((top, box))
+        top += y1 - y0 + gap
+    return strip, offsets
+
+
+def page_to_image(offsets: List[Tuple[int, Box]], x: int, y: int, h: int, gap: int = STACK_GAP) -> Tuple[int, int]:
+    """Map a word's top-left corner on a stacked page back to image coordinates"""
+    center = y + h / 2
+    top, (x0, y0, _, _) = offsets[0]
+    for region_top, region in offsets:
+        if region_top > center:
+            break
+        top, (x0, y0, _, _) = region_top, region
+    return x - gap + x0, y - top + y0
+
+
+def polygon_box(points: List[int]) -> Box:
+    """Axis-aligned box around a flat [x1, y1, x2, y2, ...] polygon"""
+    xs, ys = points[0::2], points[1::2]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def box_iou(a: Box, b: Box) -> float:
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
@@ -0,0 +1,191 @@
+"""Cleanup and noise-filter rules for OCR tokens, compiled once.
+
+Rules are declared as data (``CORRECTION_RULES``, ``NOISE_RULES``) and
+compiled when a ``TextRules`` is built: all noise patterns become one
+alternation of named groups, so rejecting a token is a single regex search
+whose ``lastgroup`` names the rule that fired, and the character-level OCR
+corrections become one substitution pass.
+
+Business-specific correction dictionaries (whole words, case insensitive,
+``"General"`` applying to every business type) are read from
+``TEXT_CORRECTIONS_PATH`` and compiled into one word alternation per
+business type; a business type without entries costs nothing.
+
+Every rule that rejects or rewrites a token is counted; ``stats()`` returns
+the counters for tuning the rules against real traffic.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.services.text_scoring import GENERAL, text_scorer
+
+# Punctuation stripped from both ends of a token
+STRIP_CHARS = '.,;:!?()[]{}"\'-_=+|\\/'
+
+# Character-level OCR corrections: name, pattern, replacement
+CORRECTION_RULES = [
+    ("zero_before_letter", r'\b0(?=[a-zA-Z])', 'O'),   # 0PEN -> OPEN
+    ("zero_after_letter", r'(?<=[a-zA-Z])0\b', 'O'),    # STUDI0 -> STUDIO
+]
+
+# Tokens matching any of these are noise: name, pattern
+NOISE_RULES = [
+    ("only_symbols", r'^[^a-zA-Z0-9]+$'),
+    ("short_word", r'^[a-zA-Z]{1,2}$'),
+    ("repeated_character", r'^(?P<repeated>.)(?P=repeated){2,}$'),
+    ("bracket_run", r'[)(\[\]{}|\\\/]{3,}'),
+]
+
+# Tokens scoring below this (General keywords) are noise
+MIN_QUALITY = 0.2
+MIN_MEANINGFUL_LENGTH = 2
+
+
+class TextVerdict(NamedTuple):
+    text: str                           # Cleaned token
+    rejected_by: Optional[str] = None   # Name of the rule that filtered it out, None if kept
+
+
+def _compile_alternation(rules) -> "re.Pattern":
+    return re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern, *_ in rules))
+
+
+def _compile_dictionary(corrections: Dict[str, str]) -> Optional["re.Pattern"]:
+    if not corrections:
+        return None
+    # Longest first, so an entry isn't shadowed by one of its prefixes
+    words = sorted(corrections, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, words)) + r")\b", re.IGNORECASE)
+
+
+class TextRules:
+    def __init__(self, corrections: Optional[Dict[str, Dict[str, str]]] = None):
+        """Compiled cleanup and filter rules, with optional per-business correction dictionaries"""
+        self._replacements = {name: replacement for name, _, replacement in CORRECTION_RULES}
+        self._corrections = _compile_alternation(CORRECTION_RULES)
+        self._noise = _compile_alternation(NOISE_RULES)
+
+        corrections = {business: dict(entries) for business, entries in (corrections or {}).items()}
+        general = {word.lower(): fix for word, fix in corrections.pop(GENERAL, {}).items()}
+        self._dictionaries = {
+            business: {**general, **{word.lower(): fix for word, fix in entries.items()}}
+            for business, entries in corrections.items()
+        }
+        self._dictionaries[GENERAL] = general
+        self._dictionary_patterns = {
+            business: _compile_dictionary(entries) for business, entries in self._dictionaries.items()
+        }
+
+        # Identifies everything the rules were compiled from, for cache keys
+        self.digest = hashlib.sha256(json.dumps([
+            CORRECTION_RULES, NOISE_RULES, STRIP_CHARS, MIN_QUALITY, MIN_MEANINGFUL_LENGTH, self._dictionaries
+        ], sort_keys=True).encode()).hexdigest()[:16]
+
+        self._hits = Counter()
+        self._lock = threading.Lock()
+
+    def _clean(self, text: str, business_type: str, hits: Counter) -> str:
+        if not text:
+            return ""
+        cleaned = ' '.join(text.split()).strip(STRIP_CHARS)
+
+        replacements = self._replacements
+
+        def correct(match) -> str:
+            hits[match.lastgroup] += 1
+            return replacements[match.lastgroup]
+
+        cleaned = self._corrections.sub(correct, cleaned)
+
+        pattern = self._dictionary_patterns.get(business_type, self._dictionary_patterns[GENERAL])
+        if pattern is not None:
+            dictionary = self._dictionaries.get(business_type, self._dictionaries[GENERAL])
+            cleaned, count = pattern.subn(lambda match: dictionary[match.group(0).lower()], cleaned)
+            if count:
+                hits["dictionary"] += count
+
+        return cleaned.strip()
+
+    def _rejection(self, text: str) -> Optional[str]:
+        """Name of the first filter rule a cleaned token fails, or None if it is meaningful"""
+        text = text.strip()
+        if len(text) < MIN_MEANINGFUL_LENGTH:
+            return "too_short"
+        match = self._noise.search(text)
+        if match is not None:
+            # The rule's own group closes last, so lastgroup is its name
+            return match.lastgroup
+        if text_scorer.score(text) < MIN_QUALITY:
+            return "low_quality"
+        return None
+
+    def _record(self, hits: Counter):
+        if hits:
+            with self._lock:
+                self._hits.update(hits)
+
+    def clean(self, text: str, business_type: str = GENERAL) -> str:
+        """Collapse whitespace, strip punctuation and apply OCR corrections"""
+        hits = Counter()
+        cleaned = self._clean(text, business_type, hits)
+        self._record(hits)
+        return cleaned
+
+    def is_meaningful(self, text: str) -> bool:
+        if not text:
+            return False
+        rejected_by = self._rejection(text)
+        if rejected_by is not None:
+            self._record(Counter({rejected_by: 1}))
+        return rejected_by is None
+
+    def check_many(self, texts: Iterable[str], business_type: str = GENERAL, min_length: int = 1) -> List[TextVerdict]:
+        """Clean and filter a whole OCR result list, counting rule hits once per batch"""
+        hits = Counter()
+        verdicts = []
+        for text in texts:
+            cleaned = self._clean(text, business_type, hits)
+            if not cleaned or len(cleaned) < min_length:
+                rejected_by = "min_length"
+            else:
+                rejected_by = self._rejection(cleaned)
+            if rejected_by is not None:
+                hits[rejected_by] += 1
+            verdicts.append(TextVerdict(cleaned, rejected_by))
+        self._record(hits)
+        return verdicts
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = dict(self._hits)
+        return {
+            "correction_rules": [name for name, _, _ in CORRECTION_RULES],
+            "noise_rules": [name for name, _ in NOISE_RULES],
+            "dictionary_entries": {business: len(entries) for business, entries in self._dictionaries.items()},
+            "digest": self.digest,
+            "hits": hits,
+        }
+
+
+def load_text_rules(path: Optional[str] = None) -> TextRules:
+    """Rules with the correction dictionaries of a JSON file ({business type: {word: fix}})"""
+    corrections = None
+    if path:
+        with open(path) as f:
+            corrections = json.load(f)
+        if not isinstance(corrections, dict) or not all(
+            isinstance(entries, dict) and all(isinstance(fix, str) for fix in entries.values())
+            for entries in corrections.values()
+        ):
+            raise ValueError(f"{path}: expected an object mapping business types to {{word: correction}} objects")
+    return TextRules(corrections)
+
+
+# Process-wide rules shared by every TextDetector
+text_rules = load_text_rules(settings.TEXT_CORRECTIONS_PATH)
@@ -0,0 +1,287 @@
+"""Keyword-based quality scoring of OCR text.
+
+The score ``TextDetector.calculate_text_quality`` has always returned: 0.5,
+plus or minus points for length and the share of ASCII letters, plus a
+bonus for every distinct keyword the text contains (as a substring, case
+insensitive) - 12 points for a keyword of the business type, 8 for a general
+one, both for a keyword in both lists, at most 35 in total.
+
+Each business type's vocabulary (its own keywords and the general ones) is
+compiled once into an Aho-Corasick automaton, flattened into a transition
+table, so finding every keyword in a token is one dict lookup per character
+instead of one substring search per keyword.
+
+Keyword lists can be overridden from a JSON file (``TEXT_KEYWORDS_PATH``)
+mapping business types, and ``"General"``, to lists of keywords; business
+types the file doesn't mention keep their built-in list. The file is checked
+for changes at most every ``TEXT_KEYWORDS_RELOAD_INTERVAL`` seconds and a new
+scorer swapped in when it changed, without restarting the server.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import string
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GENERAL = "General"
+
+BUSINESS_KEYWORDS: Dict[str, List[str]] = {
+    'Retail': [
+        'store', 'shop', 'market', 'boutique', 'outlet', 'mall', 'plaza',
+        'sale', 'discount', 'off', 'price', 'deal', 'offer', 'special',
+        'open', 'closed', 'hours', 'till', 'until', 'am', 'pm',
+        'cash', 'card', 'payment', 'checkout', 'register', 'receipt',
+        'new', 'fresh', 'organic', 'local', 'imported', 'premium',
+        'clothing', 'fashion', 'apparel', 'shoes', 'accessories',
+        'electronics', 'phone', 'computer', 'tech', 'gadget'
+    ],
+    'Restaurant': [
+        'cafe', 'restaurant', 'kitchen', 'bakery', 'house', 'grill',
+        'breakfast', 'lunch', 'dinner', 'open', 'closed', 'hours',
+        'menu', 'food', 'cuisine', 'falafel', 'alabama', 'hills',
+        'mediterranean', 'shawerma', 'delivery', 'takeout'
+    ],
+    'Salon': [
+        'salon', 'spa', 'beauty', 'hair', 'nails', 'massage', 'facial',
+        'barbershop', 'barber', 'stylist', 'hairdresser', 'manicure', 'pedicure',
+        'cut', 'color', 'style', 'treatment', 'wellness', 'relax',
+        'appointment', 'book', 'booking', 'shampoo', 'conditioner'
+    ]
+}
+
+# Keywords that apply to all business types
+GENERAL_KEYWORDS: List[str] = [
+    'open', 'closed', 'hours', 'welcome', 'thank', 'visit', 'service',
+    'quality', 'customer', 'staff', 'manager', 'phone', 'call'
+]
+
+BUSINESS_KEYWORD_BONUS = 12
+GENERAL_KEYWORD_BONUS = 8
+MAX_KEYWORD_BONUS = 35
+
+_ASCII_LETTERS = string.ascii_letters.encode()
+
+
+class KeywordAutomaton:
+    def __init__(self, weights: Dict[str, float]):
+        """Aho-Corasick automaton over lowercase keywords, each with a weight
+
+        ``matched_weight`` walks a text once and sums the weights of the
+        distinct keywords occurring in it, overlapping matches included.
+        """
+        keywords = [keyword for keyword in weights if keyword]
+        self.keywords = keywords
+        self.weights = [weights[keyword] for keyword in keywords]
+
+        # Trie: goto[state] maps a character to the next state
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[int]] = [[]]
+        for index, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto[state][char] = following
+                    goto.append({})
+                    output.append([])
+                state = following
+            output[state].append(index)
+
+        # Breadth-first: failure links, inherited outputs and the full
+        # transition table (a state's table is its failure state's table
+        # overridden by its own trie edges)
+        fail = [0] * len(goto)  # Children of the root fail to the root
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        for state in queue:
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            output[state] = output[state] + output[fail[state]]
+            for char, following in goto[state].items():
+                fail[following] = delta[fail[state]].get(char, 0)
+                queue.append(following)
+
+        self._delta = delta
+        self._output = [tuple(indices) for indices in output]
+
+    def matches(self, text: str) -> set:
+        """Indices of the keywords found in a lowercase text"""
+        delta = self._delta
+        output = self._output
+        found = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def matched_weight(self, text: str) -> float:
+        weights = self.weights
+        return sum(weights[index] for index in self.matches(text))
+
+
+class TextScorer:
+    def __init__(
+        self,
+        business_keywords: Dict[str, Sequence[str]],
+        general_keywords: Sequence[str],
+        source: Optional[str] = None
+    ):
+        """Compiled keyword vocabularies, one automaton per business type"""
+        self.business_keywords = {business: list(keywords) for business, keywords in business_keywords.items()}
+        self.general_keywords = list(general_keywords)
+        self.source = source
+        self.loaded_at = time.time()
+        # Identifies the vocabulary (not the load), so equal files give equal digests in every process
+        self.digest = hashlib.sha256(json.dumps(
+            [self.business_keywords, self.general_keywords], sort_keys=True
+        ).encode()).hexdigest()[:16]
+
+        general = self._weights({}, self.general_keywords, GENERAL_KEYWORD_BONUS)
+        self._general = KeywordAutomaton(general)
+        self._automata = {
+            business: KeywordAutomaton(self._weights(dict(general), keywords, BUSINESS_KEYWORD_BONUS))
+            for business, keywords in self.business_keywords.items()
+        }
+
+    @staticmethod
+    def _weights(weights: Dict[str, float], keywords: Iterable[str], bonus: float) -> Dict[str, float]:
+        for keyword in {keyword.lower() for keyword in keywords}:
+            weights[keyword] = weights.get(keyword, 0) + bonus
+        return weights
+
+    def score(self, text: str, business_type: str = GENERAL) -> float:
+        """Text quality in 0-1"""
+        if not text:
+            return 0.0
+        text = text.strip()
+        if not text:
+            return 0.0
+
+        score = 50.0
+
+        # Length check
+        length = len(text)
+        if 3 <= length <= 25:
+            score += 15
+        elif length > 40:
+            score -= 20
+
+        # Character composition
+        # (UTF-8 bytes of other characters are never ASCII letters)
+        encoded = text.encode("utf-8", "ignore")
+        letters = len(encoded) - len(encoded.translate(None, _ASCII_LETTERS))
+        if letters > 0:
+            letter_ratio = letters / length
+            if letter_ratio >= 0.6:
+                score += 25
+            elif letter_ratio < 0.3:
+                score -= 20
+
+        automaton = self._automata.get(business_type, self._general)
+        score += min(automaton.matched_weight(text.lower()), MAX_KEYWORD_BONUS)
+
+        return max(0.0, min(100.0, score)) / 100.0
+
+    def score_many(self, texts: Iterable[str], business_type: str = GENERAL) -> List[float]:
+        """Scores of many texts against one business type's vocabulary"""
+        score = self.score
+        return [score(text, business_type) for text in texts]
+
+    def stats(self) -> Dict:
+        return {
+            "source": self.source or "built-in",
+            "loaded_at": self.loaded_at,
+            "digest": self.digest,
+            "general_keywords": len(self.general_keywords),
+            "business_keywords": {business: len(keywords) for business, keywords in self.business_keywords.items()},
+        }
+
+
+def load_scorer(path: Optional[str] = None) -> TextScorer:
+    """Scorer from the built-in keyword lists, overridden by a JSON file if given"""
+    business_keywords = dict(BUSINESS_KEYWORDS)
+    general_keywords = GENERAL_KEYWORDS
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        if not isinstance(overrides, dict) or not all(
+            isinstance(keywords, list) and all(isinstance(keyword, str) for keyword in keywords)
+            for keywords in overrides.values()
+        ):
+            raise ValueError(f"{path}: expected an object mapping business types to lists of keywords")
+        general_keywords = overrides.pop(GENERAL, general_keywords)
+        business_keywords.update(overrides)
+    return TextScorer(business_keywords, general_keywords, source=path)
+
+
+class ReloadingTextScorer:
+    def __init__(self, path: Optional[str], check_interval: float):
+        """The current TextScorer, rebuilt when the keyword file changes
+
+        The file's mtime is looked at no more than once per check_interval
+        seconds, so scoring a token normally costs one clock read on top of
+        the scoring itself. A file that fails to load keeps the previous
+        scorer in place.
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = self._file_mtime()
+        self._scorer = load_scorer(path if self._mtime is not None else None)
+        self._next_check = time.monotonic() + check_interval
+
+    def _file_mtime(self) -> Optional[int]:
+        if not self.path:
+            return None
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self, force: bool = True) -> TextScorer:
+        """Rebuild the scorer if the keyword file changed (always, if force)"""
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            mtime = self._file_mtime()
+            if force or mtime != self._mtime:
+                try:
+                    self._scorer = load_scorer(self.path if mtime is not None else None)
+                    logger.info("Text scoring keywords loaded from %s", self._scorer.source or "built-in lists")
+                except (OSError, ValueError) as e:
+                    logger.warning("Keeping previous text scoring keywords, %s failed to load: %s", self.path, e)
+                self._mtime = mtime
+            return self._scorer
+
+    @property
+    def scorer(self) -> TextScorer:
+        if self.path and self.check_interval >= 0 and time.monotonic() >= self._next_check:
+            return self.reload(force=False)
+        return self._scorer
+
+    @property
+    def digest(self) -> str:
+        """Digest of the current vocabulary (changes when a reload changes the keywords)"""
+        return self.scorer.digest
+
+    def score(self, text: str, business_type: str = GENERAL) -> float:
+        return self.scorer.score(text, business_type)
+
+    def score_many(self, texts: Iterable[str], business_type: str = GENERAL) -> List[float]:
+        return self.scorer.score_many(texts, business_type)
+
+    def stats(self) -> Dict:
+        return {**self.scorer.stats(), "path": self.path, "check_interval": self.check_interval}
+
+
+# Process-wide scorer shared by every TextDetector
+text_scorer = ReloadingTextScorer(settings.TEXT_KEYWORDS_PATH, settings.TEXT_KEYWORDS_RELOAD_INTERVAL)
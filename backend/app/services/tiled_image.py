@@ -0,0 +1,161 @@
+"""Tiled access to large uncompressed images through a memory map.
+
+Decoding a 100 MP BMP or TIFF with PIL holds the whole image in PIL's own
+buffer (4 bytes per pixel) and then again as a NumPy array. For formats
+that store raw pixel rows - uncompressed BMP, TIFF and PPM - PIL's header
+parse already says where every strip of rows starts in the file, so the
+pixels can be read straight from a memory map instead, one band of rows at
+a time, and the file never has to be fully resident.
+
+``TiledImage.read`` builds a full or downscaled RGB buffer from bands (one
+allocation, the size of the output). ``TiledImage.bands`` lets color
+statistics and histogram dominant colors be accumulated band by band at
+native resolution, with memory bounded by TILED_MEMORY_BUDGET. Compressed
+files are not mappable and keep the regular PIL decode.
+"""
+
+import os
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.services.decoded_image import fit_size
+
+# PIL raw mode -> (bytes per pixel, byte positions of R, G, B)
+_RAW_MODES = {
+    "RGB": (3, (0, 1, 2)),
+    "BGR": (3, (2, 1, 0)),
+    "RGBX": (4, (0, 1, 2)),
+    "RGBA": (4, (0, 1, 2)),
+    "BGRX": (4, (2, 1, 0)),
+    "BGRA": (4, (2, 1, 0)),
+    "L": (1, (0, 0, 0)),
+}
+
+# Bands larger than this gain nothing, whatever the budget
+_MAX_BAND_BYTES = 16 * 1024 * 1024
+
+
+class _Strip(NamedTuple):
+    y0: int  # First image row
+    y1: int  # One past the last image row
+    offset: int  # File offset of the strip's first stored row
+    stride: int  # Bytes per stored row, including padding
+    bottom_up: bool  # Rows stored last row first (BMP)
+
+
+class TiledImage:
+    """A raw image file read as bands of RGB rows from a memory map"""
+
+    def __init__(self, path: str, size: Tuple[int, int], format: str, channels: int, rawmode: str, strips: List[_Strip]):
+        self.path = path
+        self.width, self.height = size
+        self.format = format
+        self.channels = channels  # Bands of the source file
+        self.rawmode = rawmode
+        self.strips = strips
+
+    @classmethod
+    def open(cls, path: str) -> Optional["TiledImage"]:
+        """A reader for the file, or None if its pixels are not stored as raw rows"""
+        try:
+            with Image.open(path) as img:
+                size, format, channels, tiles = img.size, img.format, len(img.getbands()), img.tile
+        except Exception:
+            return None
+
+        strips = []
+        rawmode = None
+        for tile in tiles:
+            codec, (x0, y0, x1, y1), offset, args = tile
+            if isinstance(args, str):
+                args = (args, 0, 1)
+            if codec != "raw" or (x0, x1) != (0, size[0]) or args[0] not in _RAW_MODES:
+                return None
+            if rawmode not in (None, args[0]):
+                return None
+            rawmode = args[0]
+            stride = args[1] or size[0] * _RAW_MODES[rawmode][0]
+            orientation = args[2] if len(args) > 2 else 1
+            strips.append(_Strip(y0, y1, offset, stride, orientation < 0))
+        if not strips:
+            return None
+
+        # A truncated file would fault in the middle of a band
+        file_size = os.path.getsize(path)
+        if any(strip.offset + (strip.y1 - strip.y0) * strip.stride > file_size for strip in strips):
+            return None
+        return cls(path, size, format, channels, rawmode, sorted(strips))
+
+    @classmethod
+    def open_over_budget(cls, path: str, max_side: Optional[int], budget: Optional[int] = None) -> Optional["TiledImage"]:
+        """A reader, if the file is mappable and its RGB buffer at max_side would exceed the budget"""
+        tiled = cls.open(path)
+        if tiled is None:
+            return None
+        width, height = fit_size((tiled.width, tiled.height), max_side)
+        return tiled if width * height * 3 > (budget or settings.TILED_MEMORY_BUDGET) else None
+
+    def band_rows(self, budget: Optional[int] = None) -> int:
+        """Rows per band: a quarter of the budget (at most 16 MB), leaving room for per-band temporaries"""
+        budget = budget or settings.TILED_MEMORY_BUDGET
+        return max(1, min(budget // 4, _MAX_BAND_BYTES) // (self.width * 3))
+
+    def max_side_within(self, budget: Optional[int] = None) -> int:
+        """Longest side of the largest downscaled copy that fits in a quarter of the budget"""
+        budget = budget or settings.TILED_MEMORY_BUDGET
+        scale = min(1.0, np.sqrt(budget / 4 / (self.width * self.height * 3)))
+        return max(1, int(max(self.width, self.height) * scale))
+
+    def bands(self, rows: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """(first row, (rows, W, 3) uint8 RGB) for consecutive bands of the image"""
+        rows = rows or self.band_rows()
+        bytes_per_pixel, channels = _RAW_MODES[self.rawmode]
+        with open(self.path, "rb") as f:
+            for y0 in range(0, self.height, rows):
+                y1 = min(y0 + rows, self.height)
+                band = np.empty((y1 - y0, self.width, 3), np.uint8)
+                for strip in self.strips:
+                    top, bottom = max(y0, strip.y0), min(y1, strip.y1)
+                    if top >= bottom:
+                        continue
+                    # Stored rows of this strip that hold image rows [top, bottom)
+                    if strip.bottom_up:
+                        first, last = strip.y1 - bottom, strip.y1 - top
+                    else:
+                        first, last = top - strip.y0, bottom - strip.y0
+                    # Mapped only while copied, so finished bands don't stay resident
+                    stored = np.memmap(
+                        f, dtype=np.uint8, mode="r",
+                        offset=strip.offset + first * strip.stride,
+                        shape=(last - first, strip.stride)
+                    )
+                    pixels = stored[:, :self.width * bytes_per_pixel].reshape(last - first, self.width, bytes_per_pixel)
+                    if strip.bottom_up:
+                        pixels = pixels[::-1]
+                    band[top - y0:bottom - y0] = pixels[:, :, channels]
+                    del stored, pixels
+                yield y0, band
+
+    def read(self, max_side: Optional[int] = None) -> np.ndarray:
+        """The image as (H, W, 3) uint8 RGB, area-downscaled to max_side, assembled band by band"""
+        width, height = fit_size((self.width, self.height), max_side)
+        if (width, height) == (self.width, self.height):
+            rgb = np.empty((self.height, self.width, 3), np.uint8)
+            for y0, band in self.bands():
+                rgb[y0:y0 + len(band)] = band
+            return rgb
+
+        # Area resampling is separable: shrink each band's width, then the full-height column strip.
+        # Bands are a quarter as tall here since they are widened to float32
+        columns = np.empty((self.height, width, 3), np.float32)
+        for y0, band in self.bands(max(1, self.band_rows() // 4)):
+            columns[y0:y0 + len(band)] = cv2.resize(
+                band.astype(np.float32), (width, len(band)), interpolation=cv2.INTER_AREA
+            )
+        rgb = cv2.resize(columns, (width, height), interpolation=cv2.INTER_AREA)
+        return np.clip(np.rint(rgb), 0, 255).astype(np.uint8)
+
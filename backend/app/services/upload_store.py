@@ -0,0 +1,147 @@
+import hashlib
+import os
+import uuid
+from typing import NamedTuple, Optional
+
+import aiofiles
+from PIL import Image
+
+from app.core.config import settings
+from app.core.executor import analysis_executor
+from app.services.blob_store import BlobStore, blob_store
+
+# Leading bytes of each accepted format
+_MAGIC_NUMBERS = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"BM", "BMP"),
+    (b"II*\x00", "TIFF"),
+    (b"MM\x00*", "TIFF"),
+)
+
+EXTENSION_FORMATS = {
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+    ".png": "PNG",
+    ".bmp": "BMP",
+    ".tif": "TIFF",
+    ".tiff": "TIFF",
+}
+
+
+class UploadRejectedError(ValueError):
+    """The upload is not an acceptable image; mapped to HTTP 400"""
+
+
+class UploadTooLargeError(UploadRejectedError):
+    """The upload crossed MAX_UPLOAD_SIZE; mapped to HTTP 413"""
+
+
+class StoredUpload(NamedTuple):
+    file_id: str
+    path: str
+    size: int
+    content_hash: str  # SHA-256 of the bytes, computed while copying
+    format: str
+    width: int
+    height: int
+    channels: int
+    duplicate_of: Optional[str] = None  # Earlier upload with identical bytes
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """Image format from the file's magic number, or None"""
+    for magic, format in _MAGIC_NUMBERS:
+        if header.startswith(magic):
+            return format
+    return None
+
+
+def _read_header(path: str):
+    """Width, height and channels of an image file, after parsing its headers and
+    chunk structure (no pixel decode) to reject truncated or bogus files"""
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            channels = len(img.getbands())
+            img.verify()
+    except Exception as e:
+        raise UploadRejectedError(f"Cannot read image header: {e}")
+    return width, height, channels
+
+
+async def save_upload(
+    source,
+    extension: str,
+    upload_dir: Optional[str] = None,
+    max_size: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    store: Optional[BlobStore] = None,
+) -> StoredUpload:
+    """Copy an upload to UPLOAD_DIR/<file_id><extension> in fixed-size chunks
+
+    ``source`` is anything with an async ``read(n)`` (e.g. UploadFile). The
+    bytes are hashed while they are copied to a temporary file, which is
+    handed to the blob store only once the whole body has been checked, so
+    readers never see a partial upload. Bytes already stored under the same
+    hash are not stored again. Memory use is one chunk per upload however
+    large the file. The content must be in the format its extension names.
+    """
+    store = store or blob_store
+    upload_dir = upload_dir or store.upload_dir
+    max_size = max_size or settings.MAX_UPLOAD_SIZE
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    incoming_dir = os.path.join(upload_dir, ".incoming")
+    os.makedirs(incoming_dir, exist_ok=True)
+
+    file_id = str(uuid.uuid4())
+    temp_path = os.path.join(incoming_dir, f"{file_id}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    format = None
+    try:
+        async with aiofiles.open(temp_path, 'wb') as f:
+            while True:
+                chunk = await source.read(chunk_size)
+                if not chunk:
+                    break
+                if format is None:
+                    format = sniff_image_format(chunk)
+                    if format is None:
+                        raise UploadRejectedError("File content is not a supported image format")
+                    if EXTENSION_FORMATS.get(extension.lower()) != format:
+                        raise UploadRejectedError(f"File content is {format}, not the {extension} its name claims")
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(f"File exceeds maximum allowed size {max_size}")
+                digest.update(chunk)
+                await f.write(chunk)
+
+        if format is None:
+            raise UploadRejectedError("Empty file")
+
+        # Both touch the disk (store.add also the blob database); keep them off the event loop
+        width, height, channels = await analysis_executor.run_in_thread(_read_header, temp_path)
+
+        content_hash = digest.hexdigest()
+        final_path, duplicate_of = await analysis_executor.run_in_thread(
+            store.add, file_id, temp_path, content_hash, extension
+        )
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return StoredUpload(
+        file_id=file_id,
+        path=final_path,
+        size=size,
+        content_hash=content_hash,
+        format=format,
+        width=width,
+        height=height,
+        channels=channels,
+        duplicate_of=duplicate_of,
+    )
@@ -0,0 +1,112 @@
+"""Measure exact and IVF color-similarity search over synthetic palettes.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_color_search --images 100000 1000000
+
+Palettes are drawn around a few thousand random "themes" (3-6 colors each,
+jittered by a few RGB units, random percentages) so that, as in a real
+catalog, similar palettes exist. For every size the index is filled in bulk
+and the IVF built; ``--queries`` palettes are then searched exactly and with
+each ``--nprobe``, reporting milliseconds per query (p50, p95) and recall -
+the share of the exact top-k the approximate search also returned.
+
+Nothing is written outside a temporary directory.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.color_index import VECTOR_DIM, PaletteIndex, palette_vectors
+from app.services.palette_analytics import pack_palettes
+
+THEMES = 2000
+JITTER = 8.0
+
+
+def make_vectors(count: int, seed: int = 0, chunk: int = 50_000) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    themes = [rng.integers(0, 256, size=(rng.integers(3, 7), 3)) for _ in range(THEMES)]
+    vectors = np.empty((count, VECTOR_DIM), np.float32)
+    for offset in range(0, count, chunk):
+        palettes, percentages = [], []
+        for _ in range(min(chunk, count - offset)):
+            theme = themes[rng.integers(THEMES)]
+            palettes.append(np.clip(theme + rng.normal(0, JITTER, theme.shape), 0, 255))
+            percentages.append(rng.dirichlet(np.ones(len(theme))) * 100)
+        vectors[offset:offset + len(palettes)] = palette_vectors(*pack_palettes(palettes, percentages, max_colors=6))
+    return vectors
+
+
+def _percentiles(seconds):
+    milliseconds = np.asarray(seconds) * 1000
+    return {"p50_ms": float(np.percentile(milliseconds, 50)), "p95_ms": float(np.percentile(milliseconds, 95))}
+
+
+def run(counts, queries: int, k: int, nprobes):
+    results = []
+    for count in counts:
+        vectors = make_vectors(count)
+        query_vectors = make_vectors(queries, seed=1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            index = PaletteIndex(os.path.join(directory, "search.sqlite3"), ivf_min_vectors=count + 1, nprobe=1)
+            start = time.perf_counter()
+            index.add_many([str(i) for i in range(count)], vectors)
+            add_seconds = time.perf_counter() - start
+            index.rebuild()
+            stats = index.stats()
+
+            exact, exact_seconds = [], []
+            for query in query_vectors:
+                start = time.perf_counter()
+                _, matches = index.search(query, k, mode="exact")
+                exact_seconds.append(time.perf_counter() - start)
+                exact.append({image_id for image_id, _ in matches})
+
+            result = {
+                "images": count,
+                "k": k,
+                "vector_bytes": stats["vector_bytes"],
+                "bulk_add_seconds": add_seconds,
+                "ivf_lists": stats["ivf"]["lists"],
+                "ivf_build_seconds": stats["ivf"]["build_seconds"],
+                "exact": _percentiles(exact_seconds),
+                "approximate": {},
+            }
+            for nprobe in nprobes:
+                seconds, recall = [], []
+                for query, expected in zip(query_vectors, exact):
+                    start = time.perf_counter()
+                    _, matches = index.search(query, k, mode="approximate", nprobe=nprobe)
+                    seconds.append(time.perf_counter() - start)
+                    recall.append(len(expected & {image_id for image_id, _ in matches}) / max(len(expected), 1))
+                result["approximate"][nprobe] = {**_percentiles(seconds), "recall": float(np.mean(recall))}
+
+        results.append(result)
+        print(json.dumps(result))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.images, args.queries, args.k, args.nprobe)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
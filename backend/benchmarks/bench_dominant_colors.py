@@ -0,0 +1,93 @@
+"""Compare dominant color backends for speed and accuracy.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_dominant_colors --sizes 640x480 1600x1200
+
+Accuracy is the percentage-weighted CIE76 deltaE between each color of the
+``exact`` palette and its closest color in the backend's palette.
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from app.services.dominant_colors import STRATEGIES, extract_palette
+
+
+def synthetic_photo(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Photo-like RGB image: smooth gradient background, flat color blocks and sensor noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    start, end = rng.uniform(40, 220, (2, 3))
+    t = ((x / width + y / height) / 2)[..., None]
+    image = start * (1 - t) + end * t
+
+    for _ in range(6):
+        x0, y0 = rng.integers(0, width * 3 // 4), rng.integers(0, height * 3 // 4)
+        w, h = rng.integers(width // 8, width // 3), rng.integers(height // 8, height // 3)
+        image[y0:y0 + h, x0:x0 + w] = rng.uniform(0, 255, 3)
+
+    image += rng.normal(0, 6, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def to_lab(colors: np.ndarray) -> np.ndarray:
+    rgb = (np.asarray(colors, dtype=np.float32) / 255.0).reshape(-1, 1, 3)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2Lab).reshape(-1, 3)
+
+
+def palette_delta_e(reference, reference_pct, candidate) -> float:
+    distances = np.linalg.norm(to_lab(reference)[:, None, :] - to_lab(candidate)[None, :, :], axis=2)
+    return float(np.average(distances.min(axis=1), weights=reference_pct))
+
+
+def run(sizes, n_colors: int, repeats: int, n_images: int, strategies):
+    results = []
+    for width, height in sizes:
+        images = [synthetic_photo(width, height, seed) for seed in range(n_images)]
+        references = [extract_palette(rgb, n_colors, "exact") for rgb in images]
+        for strategy in strategies:
+            seconds, delta_e = [], []
+            for rgb, (ref_colors, ref_pct) in zip(images, references):
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    colors, _ = extract_palette(rgb, n_colors, strategy)
+                    timings.append(time.perf_counter() - start)
+                seconds.append(min(timings))
+                delta_e.append(palette_delta_e(ref_colors, ref_pct, colors))
+            results.append({
+                "size": f"{width}x{height}",
+                "strategy": strategy,
+                "seconds": float(np.mean(seconds)),
+                "delta_e_mean": float(np.mean(delta_e)),
+                "delta_e_max": float(np.max(delta_e)),
+            })
+            print(json.dumps(results[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1600x1200"])
+    parser.add_argument("--n-colors", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--images", type=int, default=3, help="Synthetic images per size")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=STRATEGIES)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    sizes = [tuple(int(v) for v in size.lower().split("x")) for size in args.sizes]
+
+    results = run(sizes, args.n_colors, args.repeats, args.images, args.strategies)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
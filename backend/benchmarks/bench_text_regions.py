@@ -0,0 +1,172 @@
+"""Measure two-stage (region of interest) OCR against full-frame OCR.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_text_regions --sizes 1600x1200 3000x2000
+
+Synthetic storefront images get a few words rendered at random sizes.
+``region_recall`` is the share of words whose ink is at least 95% inside
+the detected regions, and ``region_area`` the share of the frame handed to
+the recognizer. With an OCR engine installed, every image is also read
+full-frame and with OCR_ROI_ENABLED, reporting latency and how many of the
+full-frame words the ROI pipeline still finds (``ocr_roi_word_recall``).
+With EasyOCR, the images of a size are also read as one batch
+(``readtext_batched`` against batched ROI detection,
+``ocr_roi_batch_word_recall``). ``within_tolerance`` is false, and the
+command exits non-zero, when either recall is below ``--min-recall``.
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.decoded_image import DecodedImage
+from app.services.model_registry import EASYOCR_AVAILABLE
+from app.services.text_detector import TESSERACT_AVAILABLE, TextDetector
+from app.services.text_regions import text_regions
+
+from benchmarks.bench_dominant_colors import synthetic_photo
+
+WORDS = [
+    "OPEN", "SALE 50% OFF", "Bakery & Cafe", "Hair Salon", "Mon-Fri 9am-6pm",
+    "WELCOME", "Fresh Bread", "Call 555-0199", "Nail Spa", "Grand Opening",
+]
+
+
+def synthetic_storefront(
+    width: int, height: int, seed: int = 0, n_words: int = 4
+) -> Tuple[np.ndarray, List[np.ndarray], List[str]]:
+    """Photo-like image with rendered words; returns the image, one ink mask per word and the words"""
+    rng = np.random.default_rng(seed)
+    image = synthetic_photo(width, height, seed).copy()
+    masks, texts = [], []
+    for _ in range(n_words):
+        text = WORDS[rng.integers(len(WORDS))]
+        scale = rng.uniform(0.6, 4.0) * width / 1600
+        thickness = max(1, int(scale * 2))
+        (text_width, text_height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        x = int(rng.integers(0, max(1, width - text_width)))
+        y = int(rng.integers(text_height + 5, max(text_height + 6, height - baseline - 5)))
+        color = (255, 255, 255) if image[y, x].mean() < 128 else (0, 0, 0)
+        cv2.putText(image, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness, cv2.LINE_AA)
+
+        mask = np.zeros((height, width), np.uint8)
+        cv2.putText(mask, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+        masks.append(mask > 0)
+        texts.append(text)
+    return image, masks, texts
+
+
+def region_stats(image: DecodedImage, masks: List[np.ndarray]) -> Tuple[float, int, float, float]:
+    """(seconds, words covered, area share, used full frame) for one image"""
+    start = time.perf_counter()
+    regions = text_regions(image.gray, image.downscaled(settings.OCR_DETECT_MAX_SIDE).gray)
+    seconds = time.perf_counter() - start
+    if regions is None:
+        return seconds, len(masks), 1.0, 1.0
+
+    selected = np.zeros((image.height, image.width), bool)
+    for x0, y0, x1, y1 in regions:
+        selected[y0:y1, x0:x1] = True
+    covered = sum(1 for mask in masks if selected[mask].mean() >= 0.95)
+    return seconds, covered, float(selected.mean()), 0.0
+
+
+def ocr_stats(detector: TextDetector, image: DecodedImage, roi: bool) -> Tuple[float, set]:
+    settings.OCR_ROI_ENABLED = roi
+    start = time.perf_counter()
+    results = detector.detect_text_sync(image)
+    return time.perf_counter() - start, {result.text.lower() for result in results}
+
+
+def ocr_batch_words(detector: TextDetector, images: List[DecodedImage], roi: bool) -> List[set]:
+    settings.OCR_ROI_ENABLED = roi
+    results = detector.extract_text_easyocr_batch(images)
+    return [{result.text.lower() for result in image_results} for image_results in results]
+
+
+def run(sizes, n_images: int, min_recall: float):
+    detector = TextDetector() if EASYOCR_AVAILABLE or TESSERACT_AVAILABLE else None
+    roi_setting = settings.OCR_ROI_ENABLED
+    results = []
+    for width, height in sizes:
+        seconds, covered, words, area, full_frame = [], 0, 0, [], 0.0
+        ocr_full, ocr_roi, found, kept = [], [], 0, 0
+        batch = []
+        for seed in range(n_images):
+            rgb, masks, _ = synthetic_storefront(width, height, seed)
+            batch.append(rgb)
+            image = DecodedImage(rgb)
+            elapsed, hits, share, full = region_stats(image, masks)
+            seconds.append(elapsed)
+            covered += hits
+            words += len(masks)
+            area.append(share)
+            full_frame += full
+
+            if detector is not None:
+                elapsed, full_words = ocr_stats(detector, DecodedImage(rgb), roi=False)
+                ocr_full.append(elapsed)
+                elapsed, roi_words = ocr_stats(detector, DecodedImage(rgb), roi=True)
+                ocr_roi.append(elapsed)
+                found += len(full_words)
+                kept += len(full_words & roi_words)
+
+        result = {
+            "size": f"{width}x{height}",
+            "detect_max_side": settings.OCR_DETECT_MAX_SIDE,
+            "region_seconds": float(np.mean(seconds)),
+            "region_recall": covered / max(words, 1),
+            "region_area": float(np.mean(area)),
+            "full_frame_fallbacks": int(full_frame),
+        }
+        if detector is not None:
+            result.update({
+                "ocr_full_seconds": float(np.mean(ocr_full)),
+                "ocr_roi_seconds": float(np.mean(ocr_roi)),
+                "ocr_roi_word_recall": kept / max(found, 1),
+            })
+            recalls = [result["ocr_roi_word_recall"]]
+            if EASYOCR_AVAILABLE:
+                full_batch = ocr_batch_words(detector, [DecodedImage(rgb) for rgb in batch], roi=False)
+                roi_batch = ocr_batch_words(detector, [DecodedImage(rgb) for rgb in batch], roi=True)
+                batch_found = sum(len(words) for words in full_batch)
+                batch_kept = sum(len(full & roi) for full, roi in zip(full_batch, roi_batch))
+                result["ocr_roi_batch_word_recall"] = batch_kept / max(batch_found, 1)
+                recalls.append(result["ocr_roi_batch_word_recall"])
+            result["within_tolerance"] = min(recalls) >= min_recall
+        results.append(result)
+        print(json.dumps(result))
+    settings.OCR_ROI_ENABLED = roi_setting
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["1600x1200", "3000x2000"])
+    parser.add_argument("--images", type=int, default=20, help="Synthetic images per size")
+    parser.add_argument("--detect-max-side", type=int, default=settings.OCR_DETECT_MAX_SIDE)
+    parser.add_argument("--min-recall", type=float, default=0.95,
+                        help="Lowest acceptable share of full-frame words the ROI pipeline finds")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    settings.OCR_DETECT_MAX_SIDE = args.detect_max_side
+    sizes = [tuple(int(v) for v in size.lower().split("x")) for size in args.sizes]
+
+    results = run(sizes, args.images, args.min_recall)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if not all(result.get("within_tolerance", True) for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Measure OCR text search over a synthetic index.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_text_search --images 10000 100000
+
+Every image gets ``--detections`` OCR lines of 1-4 words, drawn from the
+text-scoring keywords (common words) and a long tail of rare ones, with
+random confidences and business types. Queries are timed for a common word,
+a common word with business type and confidence filters, a rare word and a
+prefix matching many words, in both ``recent`` and ``relevance`` order.
+
+On 50k images (400k detections) ``recent`` answers every query in under
+half a millisecond, since it stops reading matches once the page is full;
+``relevance`` scores every match, so its cost grows with the number of
+matching detections (under 1 ms for the rare word, 35-55 ms for the common
+word and the prefix). Indexing costs about 1 ms per image.
+
+Nothing is written outside a temporary directory.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.models.schemas import TextDetectionResult
+from app.services.text_index import TextIndex
+from app.services.text_scoring import BUSINESS_KEYWORDS, GENERAL_KEYWORDS
+
+RARE_WORDS = 5000
+
+QUERIES = [
+    ("common", "open", {}),
+    ("filtered", "open", {"business_type": "Salon", "min_confidence": 0.9}),
+    ("rare", "w4999", {}),
+    ("prefix", "w12*", {}),
+]
+
+
+def make_detections(rng: random.Random, count: int):
+    vocabulary = [keyword for keywords in BUSINESS_KEYWORDS.values() for keyword in keywords] + GENERAL_KEYWORDS
+    rare = [f"w{i}" for i in range(RARE_WORDS)]
+    detections = []
+    for _ in range(count):
+        words = [rng.choice(vocabulary) if rng.random() < 0.3 else rng.choice(rare) for _ in range(rng.randint(1, 4))]
+        box = [rng.randint(0, 1000), rng.randint(0, 1000), rng.randint(10, 200), rng.randint(10, 60)]
+        detections.append(TextDetectionResult(text=" ".join(words), confidence=rng.random(), bounding_box=box))
+    return detections
+
+
+def run(counts, detections_per_image: int, repeats: int):
+    results = []
+    for count in counts:
+        rng = random.Random(0)
+        with tempfile.TemporaryDirectory() as directory:
+            index = TextIndex(os.path.join(directory, "search.sqlite3"))
+            start = time.perf_counter()
+            for i in range(count):
+                index.add(f"image-{i}", rng.choice(list(BUSINESS_KEYWORDS)), make_detections(rng, detections_per_image))
+            result = {
+                "images": count,
+                "detections": count * detections_per_image,
+                "index_ms_per_image": (time.perf_counter() - start) / count * 1000,
+                "queries": {},
+            }
+            for name, query, filters in QUERIES:
+                for sort in ("recent", "relevance"):
+                    seconds = []
+                    for _ in range(repeats):
+                        start = time.perf_counter()
+                        found = index.search(query, sort=sort, **filters)
+                        seconds.append(time.perf_counter() - start)
+                    result["queries"][f"{name}/{sort}"] = {
+                        "p50_ms": statistics.median(seconds) * 1000,
+                        "max_ms": max(seconds) * 1000,
+                        "images": len(found),
+                    }
+        results.append(result)
+        print(json.dumps(result))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, nargs="+", default=[10000])
+    parser.add_argument("--detections", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.images, args.detections, args.repeats)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Reproducible synthetic image corpus for the benchmark suite.
+
+Images are storefront-like photos (``bench_text_regions.synthetic_storefront``)
+with a few words rendered on them, generated from a seed so every run and
+every commit benchmarks the same pixels. They are written to disk in the
+chosen format so the decode path is measured as well.
+"""
+
+import os
+from typing import List, NamedTuple, Sequence, Tuple
+
+from PIL import Image
+
+from benchmarks.bench_text_regions import synthetic_storefront
+
+FORMATS = {"jpeg": ".jpg", "png": ".png", "bmp": ".bmp", "tiff": ".tif"}
+
+
+class CorpusImage(NamedTuple):
+    name: str
+    path: str
+    width: int
+    height: int
+    words: List[str]  # Text rendered on the image (OCR ground truth)
+
+
+def build_corpus(
+    directory: str,
+    sizes: Sequence[Tuple[int, int]],
+    per_size: int,
+    format: str = "jpeg",
+    seed: int = 0,
+) -> List[CorpusImage]:
+    """Generate ``per_size`` images at each (width, height) into directory"""
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for width, height in sizes:
+        for index in range(per_size):
+            rgb, _, words = synthetic_storefront(width, height, seed + index)
+            name = f"storefront_{width}x{height}_{seed + index}"
+            path = os.path.join(directory, name + FORMATS[format])
+            Image.fromarray(rgb).save(path, **({"quality": 90} if format == "jpeg" else {}))
+            corpus.append(CorpusImage(name, path, width, height, words))
+    return corpus
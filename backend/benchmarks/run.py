@@ -0,0 +1,307 @@
+"""Benchmark suite for the analysis services.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --sizes 640x480 1600x1200 --images 5 --output results.json
+    python -m benchmarks.run --output new.json --compare results.json
+
+Every suite runs over the same synthetic corpus (``benchmarks/corpus.py``)
+and reports, per image size:
+
+* ``latency`` - seconds per call (mean, p50, p95) and ``throughput`` in
+  images per second at ``--concurrency`` calls in flight (untimed
+  reference work between calls is excluded);
+* ``stages`` - mean and p95 seconds of each stage the services report
+  (``AnalysisResult.timings`` and the OCR stage timings);
+* ``peak_rss_bytes`` - peak resident memory of this process during the
+  suite (worker processes are not included);
+* ``accuracy`` - color: deltas against a native-resolution analysis of
+  the same image; text: share of the rendered words the OCR found.
+
+Suites:
+
+* ``color`` - ``ColorAnalyzer.analyze_comprehensive`` on the file;
+* ``text`` - ``TextDetector.detect_text_comprehensive`` (skipped without an
+  OCR engine);
+* ``analysis`` - ``ImageAnalyzer.analyze_image`` end to end, with the
+  result cache disabled.
+
+The suite functions take a ``benchmark`` callable with the signature of
+pytest-benchmark's fixture (``benchmark(function, *args)`` returns the
+function's result and records its time), so they can be driven by that
+plugin as well as by this CLI. Results are JSON; ``--compare`` adds the
+change of every metric against an earlier run.
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.executor import analysis_executor
+from app.services.color_analyzer import ColorAnalyzer
+from app.services.image_analyzer import ImageAnalyzer
+from app.services.model_registry import EASYOCR_AVAILABLE
+from app.services.result_cache import result_cache
+from app.services.text_detector import TESSERACT_AVAILABLE, TextDetector
+
+from benchmarks.bench_dominant_colors import palette_delta_e
+from benchmarks.corpus import FORMATS, CorpusImage, build_corpus
+
+OCR_AVAILABLE = EASYOCR_AVAILABLE or TESSERACT_AVAILABLE
+
+
+class Benchmark:
+    """Times calls like pytest-benchmark's ``benchmark`` fixture, awaiting coroutine functions"""
+
+    def __init__(self, concurrency: int = 1):
+        self.seconds: List[float] = []
+        self.busy = 0.0  # Wall time with at least one timed call in flight
+        self._slots = asyncio.Semaphore(concurrency)
+        self._in_flight = 0
+        self._busy_since = 0.0
+
+    async def __call__(self, function: Callable, *args, **kwargs) -> Any:
+        async with self._slots:
+            start = time.perf_counter()
+            if self._in_flight == 0:
+                self._busy_since = start
+            self._in_flight += 1
+            try:
+                result = function(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+            finally:
+                end = time.perf_counter()
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self.busy += end - self._busy_since
+            self.seconds.append(end - start)
+            return result
+
+
+def reset_peak_rss():
+    """Start a new peak-RSS window (Linux); elsewhere the peak is since process start"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean": float(np.mean(values)),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+    }
+
+
+def word_recall(words: List[str], found: List[str]) -> float:
+    """Share of the rendered words' tokens that appear in the OCR output"""
+    expected = [token for word in words for token in word.lower().split()]
+    tokens = {token for text in found for token in text.lower().split()}
+    return sum(token in tokens for token in expected) / max(len(expected), 1)
+
+
+async def bench_color(benchmark: Benchmark, corpus: List[CorpusImage]) -> Dict[str, Any]:
+    analyzer = ColorAnalyzer()
+    results = await asyncio.gather(*[benchmark(analyzer.analyze_comprehensive, image.path) for image in corpus])
+
+    # Reference: the same analysis at native resolution (not timed)
+    deltas: Dict[str, List[float]] = {"palette_delta_e": [], "brightness": [], "saturation": [], "temperature": []}
+    for image, result in zip(corpus, results):
+        reference = await analyzer.analyze_comprehensive(image.path, max_side=0)
+        deltas["palette_delta_e"].append(palette_delta_e(
+            [color.rgb for color in reference.dominant_colors],
+            [color.percentage for color in reference.dominant_colors],
+            [color.rgb for color in result.dominant_colors],
+        ))
+        deltas["brightness"].append(abs(result.brightness - reference.brightness))
+        deltas["saturation"].append(abs(result.saturation - reference.saturation))
+        deltas["temperature"].append(abs(result.color_temperature - reference.color_temperature))
+    return {"accuracy": {f"{name}_mean": float(np.mean(values)) for name, values in deltas.items()}}
+
+
+async def bench_text(benchmark: Benchmark, corpus: List[CorpusImage]) -> Dict[str, Any]:
+    if not OCR_AVAILABLE:
+        return {"skipped": "no OCR engine installed"}
+    detector = TextDetector()
+    timings = [{} for _ in corpus]
+    results = await asyncio.gather(*[
+        benchmark(detector.detect_text_comprehensive, image.path, "General", stage_timings)
+        for image, stage_timings in zip(corpus, timings)
+    ])
+    recall = [word_recall(image.words, [r.text for r in result]) for image, result in zip(corpus, results)]
+    return {"stage_timings": timings, "accuracy": {"word_recall": float(np.mean(recall))}}
+
+
+async def bench_analysis(benchmark: Benchmark, corpus: List[CorpusImage]) -> Dict[str, Any]:
+    analyzer = ImageAnalyzer()
+    analysis_types = ["color", "text"] if OCR_AVAILABLE else ["color"]
+    results = await asyncio.gather(*[
+        benchmark(analyzer.analyze_image, image.name, image.path, None, analysis_types) for image in corpus
+    ])
+    accuracy = {}
+    if OCR_AVAILABLE:
+        recall = [
+            word_recall(image.words, [r.text for r in result.text_detection or []])
+            for image, result in zip(corpus, results)
+        ]
+        accuracy["word_recall"] = float(np.mean(recall))
+    return {"stage_timings": [result.timings for result in results], "accuracy": accuracy}
+
+
+SUITES = {
+    "color": bench_color,
+    "text": bench_text,
+    "analysis": bench_analysis,
+}
+
+
+async def run_suite(name: str, corpus: List[CorpusImage], rounds: int, concurrency: int) -> Dict[str, Any]:
+    suite = SUITES[name]
+    # Warm-up: worker pools, OCR models
+    await suite(Benchmark(), corpus[:1])
+
+    reset_peak_rss()
+    benchmark = Benchmark(concurrency)
+    outcome: Dict[str, Any] = {}
+    stage_timings: List[Dict[str, float]] = []
+    for _ in range(rounds):
+        outcome = await suite(benchmark, corpus)
+        stage_timings.extend(outcome.pop("stage_timings", []))
+        if "skipped" in outcome:
+            return outcome
+
+    stages = {}
+    for stage in sorted({stage for timings in stage_timings for stage in timings}):
+        values = [timings[stage] for timings in stage_timings if stage in timings]
+        stages[stage] = {"mean": float(np.mean(values)), "p95": float(np.percentile(values, 95))}
+
+    return {
+        "calls": len(benchmark.seconds),
+        "latency": summarize(benchmark.seconds),
+        "throughput": len(benchmark.seconds) / benchmark.busy,
+        "stages": stages,
+        "peak_rss_bytes": peak_rss(),
+        **outcome,
+    }
+
+
+def metadata(args) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "corpus": {"sizes": args.sizes, "images": args.images, "format": args.format, "seed": args.seed},
+        "rounds": args.rounds,
+        "concurrency": args.concurrency,
+        "ocr_engines": {"easyocr": EASYOCR_AVAILABLE, "tesseract": TESSERACT_AVAILABLE},
+        "settings": {
+            name: getattr(settings, name)
+            for name in (
+                "COLOR_ANALYSIS_MAX_SIDE", "DOMINANT_COLOR_STRATEGY", "DOMINANT_COLOR_HISTOGRAM_BITS",
+                "OCR_ROI_ENABLED", "OCR_DETECT_MAX_SIDE", "OCR_ENGINE_STRATEGY", "OCR_LANGUAGES",
+            )
+        },
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Relative change of timing/memory metrics and absolute change of accuracy, per suite and size"""
+    previous = {(entry["suite"], entry["size"]): entry for entry in baseline}
+    changes = []
+    for entry in results:
+        before = previous.get((entry["suite"], entry["size"]))
+        if before is None or "latency" not in entry or "latency" not in before:
+            continue
+        change = {
+            "suite": entry["suite"],
+            "size": entry["size"],
+            "latency_mean": entry["latency"]["mean"] / before["latency"]["mean"] - 1,
+            "latency_p95": entry["latency"]["p95"] / before["latency"]["p95"] - 1,
+            "throughput": entry["throughput"] / before["throughput"] - 1,
+            "peak_rss_bytes": entry["peak_rss_bytes"] / before["peak_rss_bytes"] - 1,
+        }
+        for metric, value in entry.get("accuracy", {}).items():
+            if metric in before.get("accuracy", {}):
+                change[f"accuracy.{metric}"] = value - before["accuracy"][metric]
+        changes.append(change)
+    return changes
+
+
+async def run(args) -> Dict[str, Any]:
+    sizes = [tuple(int(v) for v in size.lower().split("x")) for size in args.sizes]
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="bench-corpus-")
+    result_cache.enabled = False
+
+    results = []
+    for width, height in sizes:
+        corpus = build_corpus(corpus_dir, [(width, height)], args.images, args.format, args.seed)
+        for name in args.suites:
+            entry = {"suite": name, "size": f"{width}x{height}", **await run_suite(name, corpus, args.rounds, args.concurrency)}
+            results.append(entry)
+            print(json.dumps(entry))
+    return {"meta": metadata(args), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1600x1200"])
+    parser.add_argument("--images", type=int, default=5, help="Corpus images per size")
+    parser.add_argument("--format", default="jpeg", choices=FORMATS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--suites", nargs="+", default=list(SUITES), choices=SUITES)
+    parser.add_argument("--rounds", type=int, default=1, help="Passes over the corpus per suite")
+    parser.add_argument("--concurrency", type=int, default=1, help="Calls in flight at once")
+    parser.add_argument("--corpus-dir", help="Write the corpus here instead of a temporary directory")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier --output file to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report["results"], json.load(f)["results"])
+        for change in report["comparison"]:
+            print(json.dumps(change))
+    analysis_executor.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()